@@ -0,0 +1,6 @@
+# The public API is imported lazily, so that the command line (see localperf.cli) starts without importing numpy
+def __getattr__(name):
+    if name in ["bench", "BenchResult"]:
+        from localperf.core import bench
+        return getattr(bench, name)
+    raise AttributeError(f"module 'localperf' has no attribute '{name}'")
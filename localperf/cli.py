@@ -0,0 +1,77 @@
+"""This module contains the localperf command : each benchmark of the package is a subcommand, e.g. localperf cpu --plot
+is the same as python -m localperf.cpu --plot. Only the module of the subcommand is imported, so that the command starts fast
+and the heavy libraries (torch, jax) are only imported by the benchmarks that need them.
+"""
+
+import importlib.util
+import runpy
+import subprocess
+import sys
+from argparse import ArgumentParser, RawDescriptionHelpFormatter, REMAINDER
+from typing import Dict, List, Tuple
+
+
+# The module and the description of each subcommand
+commands : Dict[str, Tuple[str, str]] = {
+    "cpu" : ("localperf.cpu", "speed of the CPU on a workload"),
+    "parallel" : ("localperf.parallel", "speed-up of a parallelization library"),
+    "bench-libs" : ("localperf.parallel_benchmark", "comparison of the parallelization libraries"),
+    "scheduling" : ("localperf.scheduling", "scheduling of heterogeneous tasks"),
+    "oversubscription" : ("localperf.oversubscription", "split of the cores into processes and BLAS threads"),
+    "memory" : ("localperf.memory", "memory bandwidth and cache latency"),
+    "io" : ("localperf.io", "disk and file I/O"),
+    "ipc" : ("localperf.ipc", "inter-process communication"),
+    "torch" : ("localperf.gpu_torch", "torch on the CPU and the GPU"),
+    "torch-cpu" : ("localperf.torch_cpu", "torch CPU inference throughput"),
+    "dataloader" : ("localperf.dataloader", "torch DataLoader input pipeline"),
+    "jax" : ("localperf.gpu_jax", "JAX on the CPU and the GPU, compilation and startup"),
+    "jax-cpu" : ("localperf.jax_cpu", "JAX vmap batching and multi-device scaling on the CPU"),
+    "startup" : ("localperf.startup", "startup time of the localperf command"),
+    "compare" : ("localperf.compare", "comparison of two recorded runs"),
+}
+
+# The subcommands run by localperf all, with the library they require (None if they only require the dependencies of localperf)
+all_commands : List[Tuple[str, str]] = [("cpu", None), ("parallel", None), ("bench-libs", None), ("torch", "torch"), ("jax", "jax")]
+
+
+def run_command(command : str, list_args : List[str]):
+    """Run the module of a subcommand as a script (as with python -m), with the given command line arguments."""
+    module, _ = commands[command]
+    sys.argv = [f"localperf {command}"] + list_args
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+def run_all(list_args : List[str]) -> int:
+    """Run the benchmarks of all_commands one after the other, each in its own process, with the given (common) command line arguments.
+    The benchmarks whose library is not installed are skipped. Returns the number of benchmarks that failed."""
+    n_failures = 0
+    for command, library in all_commands:
+        if library is not None and importlib.util.find_spec(library) is None:
+            print(f"WARNING : {library} is not installed. Skipping localperf {command}.")
+            continue
+        print(f"\n##### localperf {command} #####\n", flush=True)
+        if subprocess.run([sys.executable, "-m", commands[command][0]] + list_args).returncode != 0:
+            print(f"WARNING : localperf {command} failed.")
+            n_failures += 1
+    return n_failures
+
+
+def main():
+    parser = ArgumentParser(
+        prog="localperf",
+        description="Measure the performance of python on this machine. Run localperf <command> --help for the arguments of a command.",
+        epilog="commands:\n" + "\n".join(f"  {command:<18}{description}" for command, (_, description) in commands.items())
+            + f"\n  {'all':<18}{', '.join(command for command, _ in all_commands)} one after the other, with the same (common) arguments",
+        formatter_class=RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=list(commands) + ["all"], metavar="command", help="The benchmark to run, see below")
+    parser.add_argument("args", nargs=REMAINDER, help="The arguments of the command")
+    args = parser.parse_args()
+
+    if args.command == "all":
+        sys.exit(1 if run_all(args.args) > 0 else 0)
+    run_command(args.command, args.args)
+
+
+if __name__ == "__main__":
+    main()
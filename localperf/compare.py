@@ -0,0 +1,63 @@
+import socket
+import sys
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.results import load_run, load_previous_runs, compare_runs
+from localperf.core.machine import machine_identity_keys
+from localperf.core.config import default_threshold_compare, default_n_bootstrap, default_n_baselines_compare
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser(description="Compare a recorded run of a benchmark with one or several baseline runs and detect the regressions. Exits with code 1 if there is a regression.")
+    parser.add_argument("baselines", type=str, nargs="+", help="Baseline runs: their JSON files, their run ids in --db, or latest for the last run of --db "
+                        "and previous for the --n_baselines runs before it. Several baseline runs give the run-to-run noise, which is used as the threshold if it is larger")
+    parser.add_argument("candidate", type=str, help="Candidate run: its JSON file, its run id in --db, or latest for the last run of --db")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database of the runs. Required unless both runs are JSON files")
+    parser.add_argument("--suite", type=str, default=None, help="Only consider the runs of this suite (e.g. cpu) for latest and previous. Default: all suites")
+    parser.add_argument("--same_machine", action="store_true", default=False, help="Only consider the runs on this machine for latest and previous. Default: all machines")
+    parser.add_argument("--threshold", type=float, default=default_threshold_compare, help=f"Relative change of the median time under which a measure is considered unchanged. Default: {default_threshold_compare}")
+    parser.add_argument("--n_baselines", type=int, default=default_n_baselines_compare, help=f"Number of runs before the latest one used as baselines for previous. Default: {default_n_baselines_compare}")
+    parser.add_argument("--n_bootstrap", type=int, default=default_n_bootstrap, help=f"Number of bootstrap resamples of the confidence intervals of the ratios. Default: {default_n_bootstrap}")
+
+    args = parser.parse_args()
+
+    hostname = socket.gethostname() if args.same_machine else None
+    list_baselines = []
+    for run in args.baselines:
+        if run == "previous":
+            if args.db is None:
+                raise ValueError("previous requires the results database, please give it with --db")
+            list_baselines += load_previous_runs(args.db, args.n_baselines, args.suite, hostname)
+        else:
+            list_baselines.append(load_run(run, args.db, args.suite, hostname))
+    candidate = load_run(args.candidate, args.db, args.suite, hostname)
+    for baseline in list_baselines:
+        print(f"Baseline:  {baseline['run_id']} ({baseline['suite']}, {baseline['timestamp']}, {baseline['machine']['hostname']})")
+    print(f"Candidate: {candidate['run_id']} ({candidate['suite']}, {candidate['timestamp']}, {candidate['machine']['hostname']})")
+    for baseline in list_baselines:
+        list_differences = [key for key in machine_identity_keys if key in baseline["machine"] and key in candidate["machine"] and baseline["machine"][key] != candidate["machine"][key]]
+        if len(list_differences) > 0:
+            print(f"WARNING : the runs {baseline['run_id']} and {candidate['run_id']} were made on different machines or software: " + ", ".join(
+                f"{key} {baseline['machine'].get(key)} -> {candidate['machine'].get(key)}" for key in list_differences))
+    if len(list_baselines) == 1:
+        print("WARNING : with a single baseline run, the run-to-run noise is unknown and only --threshold separates it from the regressions. "
+              "Give several baseline runs, or record a few runs of the baseline code and use previous, to avoid false regressions.")
+
+    list_comparisons = compare_runs(list_baselines, candidate, args.threshold, args.n_bootstrap)
+    if len(list_comparisons) == 0:
+        print("No common measures between the runs.")
+        sys.exit(0)
+    title = None
+    for comparison in list_comparisons:
+        if comparison["title"] != title:
+            title = comparison["title"]
+            print(f"\n{title}\ninput\tbaseline_time\tcandidate_time\tratio\tci_95%\tn_baselines\trun_to_run_noise\tstatus")
+        print(f"{comparison['input']}\t{comparison['baseline_time']:.2e}\t{comparison['candidate_time']:.2e}\t{comparison['ratio']:.3f}\t"
+              f"[{comparison['ci_low']:.3f}, {comparison['ci_high']:.3f}]\t{comparison['n_baselines']}\t{comparison['run_to_run_noise']:.1%}\t{comparison['status']}")
+
+    n_regressions = sum(comparison["status"] == "regression" for comparison in list_comparisons)
+    n_improvements = sum(comparison["status"] == "improvement" for comparison in list_comparisons)
+    print(f"\n{len(list_comparisons)} measures compared: {n_regressions} regressions, {n_improvements} improvements (threshold {args.threshold:.0%}).")
+    sys.exit(1 if n_regressions > 0 else 0)
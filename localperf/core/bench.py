@@ -0,0 +1,131 @@
+"""This module contains the public benchmarking API : bench measures the time taken by any function for several input sizes,
+and fits the measures with complexity models to estimate its fixed overhead, its cost per item and its empirical complexity class.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from localperf.core.measuring import measure_time, measure_time_adaptive
+from localperf.core.complexity import complexity_models, fit_complexity, get_best_complexity
+from localperf.core.utils import get_results_as_string
+from localperf.core.config import default_n_measures_bench, default_log2_min_size_bench, default_log2_max_size_bench
+
+
+default_sizes_bench = [2**k for k in range(default_log2_min_size_bench, default_log2_max_size_bench + 1)]
+
+
+@dataclass
+class BenchResult:
+    """The result of bench : the measured times for each size, and the fit of the complexity models.
+
+    Attributes:
+        name (str): the name of the benchmarked function.
+        sizes (List[int]): the input sizes.
+        mean_time (List[float]): the mean time taken by the function, for each size.
+        std_time (List[float]): the std of the time taken by the function, for each size.
+        complexity (str): the complexity class that fits the measures best, a key of complexity_models.
+        fixed_overhead (float): the fixed overhead of a call in seconds, in the model of the complexity class.
+        per_item_cost (float): the cost in seconds of one unit of the complexity class (e.g. one item for O(n)).
+        fits (Dict[str, Dict[str, float]]): the fit of each complexity model, see fit_complexity_model.
+    """
+    name : str
+    sizes : List[int]
+    mean_time : List[float]
+    std_time : List[float]
+    complexity : str
+    fixed_overhead : float
+    per_item_cost : float
+    fits : Dict[str, Dict[str, float]] = field(repr=False)
+
+    def check_complexity(self, max_complexity : str):
+        """Raise an AssertionError if the complexity class of the measures is worse than max_complexity, e.g. to catch an accidental O(n^2)."""
+        list_models = list(complexity_models)
+        if max_complexity not in complexity_models:
+            raise ValueError(f"Unknown complexity model: {max_complexity}. Please choose one of {list_models}")
+        if list_models.index(self.complexity) > list_models.index(max_complexity):
+            raise AssertionError(f"{self.name} is {self.complexity}, which is worse than the expected {max_complexity}:\n{self}")
+
+    def __str__(self) -> str:
+        string = f"Benchmark of {self.name}\n"
+        string += get_results_as_string(self.sizes, self.mean_time, self.std_time)
+        string += f"complexity\t{self.complexity}\nfixed_overhead\t{self.fixed_overhead:.2e}\nper_item_cost\t{self.per_item_cost:.2e}\n"
+        string += "relative_error\t" + "\t".join(f"{model}={fit['relative_error']:.2e}" for model, fit in self.fits.items()) + "\n"
+        return string
+
+
+def bench(
+        func : Callable = None,
+        sizes : List[int] = default_sizes_bench,
+        setup : Callable[[int], Any] = None,
+        n_measures : int = default_n_measures_bench,
+        adaptive : bool = False,
+        max_complexity : str = None,
+        name : str = None,
+        show_progress_bar : bool = False,
+        ):
+    """Measure the time taken by a function for several input sizes, and fit the measures with complexity models.
+
+    It can also be used as a decorator, which leaves the function unchanged and adds it a bench method running the benchmark:
+    `@bench(sizes=[10, 100, 1000])` then `my_function.bench()`. The parentheses are required, even without arguments (`@bench()`):
+    a bare `@bench` is the call bench(my_function), which runs the benchmark at once and replaces the function by its BenchResult.
+
+    Args:
+        func (Callable): the function to benchmark. It is called with setup(size), or with the size itself if setup is None.
+        sizes (List[int], optional): the input sizes, at least 1. Defaults to the powers of 2 from 2^4 to 2^14.
+        setup (Callable[[int], Any], optional): A function generating the input of func for a given size. It is called before each measure
+            and is not measured. Defaults to None.
+        n_measures (int, optional): The number of measures for each size. Defaults to default_n_measures_bench.
+        adaptive (bool, optional): Use an adaptive number of measures, see measure_time_adaptive. The input is then generated once per size
+            and reused by every call, so func must not modify it. n_measures is ignored. Defaults to False.
+        max_complexity (str, optional): If given, an AssertionError is raised if the complexity class of func is worse, see BenchResult.check_complexity.
+            Defaults to None.
+        name (str, optional): The name of the benchmark. Defaults to the name of func.
+        show_progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+
+    Returns:
+        BenchResult: the measures and the fit of the complexity models. If func is None, the decorator.
+    """
+    kwargs = dict(sizes=sizes, setup=setup, n_measures=n_measures, adaptive=adaptive, max_complexity=max_complexity, name=name, show_progress_bar=show_progress_bar)
+    if func is None:
+        def decorator(func : Callable) -> Callable:
+            func.bench = lambda : bench(func, **kwargs)
+            return func
+        return decorator
+
+    # The input generated by setup before each measure is stored here, so that only the call of func is measured
+    dict_input = {}
+    def setup_input(size : int):
+        dict_input[size] = setup(size) if setup is not None else size
+
+    if adaptive:
+        for size in sizes:
+            setup_input(size)
+        list_mean_time, list_std_time, _, _ = measure_time_adaptive(
+            func = lambda size : func(dict_input[size]),
+            list_inputs = sizes,
+            show_progress_bar = show_progress_bar,
+            )
+    else:
+        list_mean_time, list_std_time, _ = measure_time(
+            func = lambda size : func(dict_input[size]),
+            list_inputs = sizes,
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            setup = setup_input,
+            )
+
+    fits = fit_complexity(sizes, list_mean_time)
+    complexity = get_best_complexity(fits)
+    result = BenchResult(
+        name = name if name is not None else getattr(func, "__name__", repr(func)),
+        sizes = list(sizes),
+        mean_time = [float(mean_time) for mean_time in list_mean_time],
+        std_time = [float(std_time) for std_time in list_std_time],
+        complexity = complexity,
+        fixed_overhead = fits[complexity]["fixed_overhead"],
+        per_item_cost = fits[complexity]["per_item_cost"],
+        fits = fits,
+    )
+    if max_complexity is not None:
+        result.check_complexity(max_complexity)
+    return result
@@ -0,0 +1,66 @@
+"""This module contains the models of time complexity (O(1), O(log n), O(n), O(n log n) and O(n^2)) and their fit on measured times,
+which gives the empirical complexity class of a function, its fixed overhead and its cost per item.
+"""
+
+import numpy as np
+from typing import Callable, Dict, List
+
+
+complexity_models : Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "O(1)" : lambda n : np.zeros_like(n),
+    "O(log n)" : lambda n : np.log2(n),
+    "O(n)" : lambda n : n,
+    "O(n log n)" : lambda n : n * np.log2(n),
+    "O(n^2)" : lambda n : n ** 2,
+}
+
+
+def fit_complexity_model(list_sizes : List[int], list_time : List[float], model : str) -> Dict[str, float]:
+    """Fit the model T(n) = fixed_overhead + per_item_cost * f(n) of a complexity class on measured times, with non-negative parameters.
+
+    The fit is a least squares on the relative errors, so that the small sizes (short times) weigh as much as the large ones.
+
+    Args:
+        list_sizes (List[int]): the sizes n of the measures. They must be at least 1.
+        list_time (List[float]): the measured times.
+        model (str): the complexity class, a key of complexity_models.
+
+    Returns:
+        Dict[str, float]: the fitted fixed_overhead and per_item_cost, and the relative_error (root mean square of the relative residuals).
+    """
+    if model not in complexity_models:
+        raise ValueError(f"Unknown complexity model: {model}. Please choose one of {list(complexity_models)}")
+    n = np.array(list_sizes, dtype=float)
+    t = np.array(list_time, dtype=float)
+    f = complexity_models[model](n)
+    # Candidate fits: both parameters, the overhead only and the cost per item only. The best one with non-negative parameters is kept
+    list_candidates = [(np.mean(1 / t) / np.mean(1 / t ** 2), 0.0)]
+    if np.any(f > 0):
+        (a, b), *_ = np.linalg.lstsq(np.stack([1 / t, f / t], axis=1), np.ones_like(t), rcond=None)
+        list_candidates.append((a, b))
+        list_candidates.append((0.0, np.sum(f / t) / np.sum((f / t) ** 2)))
+    best_fit = None
+    for a, b in list_candidates:
+        if a < 0 or b < 0:
+            continue
+        relative_error = np.sqrt(np.mean(((a + b * f - t) / t) ** 2))
+        if best_fit is None or relative_error < best_fit["relative_error"]:
+            best_fit = {"fixed_overhead" : float(a), "per_item_cost" : float(b), "relative_error" : float(relative_error)}
+    return best_fit
+
+
+def fit_complexity(list_sizes : List[int], list_time : List[float]) -> Dict[str, Dict[str, float]]:
+    """Fit every complexity model on measured times, see fit_complexity_model. Returns the fit of each model."""
+    return {model : fit_complexity_model(list_sizes, list_time, model) for model in complexity_models}
+
+
+def get_best_complexity(dict_fits : Dict[str, Dict[str, float]], relative_tolerance : float = 0.5, absolute_tolerance : float = 0.02) -> str:
+    """Return the complexity class that fits the measures best. A simpler class is preferred to a more complex one if its relative error
+    is at most (1 + relative_tolerance) times the best one plus absolute_tolerance, since a more complex model can always fit the noise a bit better."""
+    list_models = list(complexity_models)
+    best_model = min(list_models, key=lambda model : dict_fits[model]["relative_error"])
+    max_error = (1 + relative_tolerance) * dict_fits[best_model]["relative_error"] + absolute_tolerance
+    for model in list_models[: list_models.index(best_model)]:
+        if dict_fits[model]["relative_error"] <= max_error:
+            return model
+    return best_model
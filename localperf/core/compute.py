@@ -2,12 +2,12 @@
 """
 
 from argparse import ArgumentParser
+from functools import lru_cache
 from time import time, perf_counter
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Callable, List, Any, Tuple
+from typing import Callable, List, Any, Tuple, Dict
 
-from localperf.core.config import data_size
+from localperf.core.config import data_size, matmul_size, memory_workload_size, default_workload
 
 def treat_one_data():
     """Compute the sum of the first n integers.
@@ -18,11 +18,110 @@ def treat_one_data():
         sum_x += i
     return sum_x
 
-def compute(n_data : int):
+def treat_one_data_numpy():
+    """Compute the sum of the first n integers with numpy, i.e. the vectorized equivalent of treat_one_data.
+    The cost unit is one vectorized sum over data_size integers."""
+    return np.arange(data_size).sum()
+
+def treat_one_data_closed_form():
+    """Compute the sum of the first n integers with the closed form formula n(n-1)/2.
+    The cost unit is a constant number of operations, this is the baseline of the overhead of calling a workload."""
+    return data_size * (data_size - 1) // 2
+
+def treat_one_data_allocation():
+    """Build and discard data_size small lists and dicts.
+    The cost unit is data_size allocations (and deallocations) of small python objects."""
+    sum_x = 0
+    for i in range(data_size):
+        list_x = [i, i + 1]
+        dict_x = {"x" : list_x}
+        sum_x += len(dict_x["x"])
+    return sum_x
+
+def treat_one_data_string():
+    """Format, join, split and parse data_size integers as strings.
+    The cost unit is the processing of a text of data_size words."""
+    text = " ".join(f"word{i}" for i in range(data_size))
+    return sum(int(word[4:]) for word in text.upper().lower().split(" "))
+
+def treat_one_data_branchy():
+    """Sum data_size pseudo-random integers, with a different operation depending on their value.
+    The cost unit is data_size unpredictable branches in pure python."""
+    sum_x = 0
+    for i in range(data_size):
+        x = (i * 7919) % 1009
+        if x % 3 == 0:
+            sum_x += x // 3
+        elif x % 2 == 0:
+            sum_x -= x
+        else:
+            sum_x += 3 * x + 1
+    return sum_x
+
+def treat_one_data_sorting():
+    """Sort a list of data_size pseudo-random integers.
+    The cost unit is one O(data_size log(data_size)) sort of python integers."""
+    return sorted((i * 7919) % data_size for i in range(data_size))
+
+@lru_cache(maxsize=1)
+def get_matmul_matrix() -> np.ndarray:
+    """Return the random matrix of the matmul workload, generated once per process."""
+    return np.random.default_rng(0).random((matmul_size, matmul_size))
+
+@lru_cache(maxsize=1)
+def get_memory_array() -> Tuple[np.ndarray, np.random.Generator]:
+    """Return the array of memory_workload_size floats of the memory workload and the generator of its indices, created once per process."""
+    return np.ones(memory_workload_size), np.random.default_rng(0)
+
+def treat_one_data_memory():
+    """Sum data_size floats read at random positions of an array larger than the caches, which is bound by the latency of the memory.
+    The cost unit is data_size random reads from the main memory."""
+    array, rng = get_memory_array()
+    return array[rng.integers(0, len(array), data_size)].sum()
+
+def treat_one_data_matmul():
+    """Multiply a matrix of matmul_size x matmul_size floats by itself with numpy, which runs on the thread pool of its BLAS library.
+    The cost unit is one matrix product, i.e. 2 * matmul_size^3 floating point operations."""
+    matrix = get_matmul_matrix()
+    return matrix @ matrix
+
+
+workloads : Dict[str, Callable[[], Any]] = {}
+
+def register_workload(name : str, func : Callable[[], Any]):
+    """Register a workload, so that it can be used by its name in every benchmark.
+
+    Args:
+        name (str): the name of the workload.
+        func (Callable[[], Any]): the treatment of one data, taking no argument. Its docstring should define the cost unit.
+            It is sent to the workers of the parallel benchmarks, so it must be picklable, e.g. defined at the top level of a module
+            (or of the script, with the libraries that pickle the functions of __main__ by value, like joblib and loky, or that fork the workers).
+    """
+    workloads[name] = func
+
+def get_workload(workload : str) -> Callable[[], Any]:
+    """Return the treatment of one data of the given workload."""
+    if workload not in workloads:
+        raise ValueError(f"Unknown workload: {workload}. Please choose one of {list(workloads)}")
+    return workloads[workload]
+
+register_workload("python_loop", treat_one_data)
+register_workload("numpy", treat_one_data_numpy)
+register_workload("closed_form", treat_one_data_closed_form)
+register_workload("allocation", treat_one_data_allocation)
+register_workload("string", treat_one_data_string)
+register_workload("branchy", treat_one_data_branchy)
+register_workload("sorting", treat_one_data_sorting)
+register_workload("memory", treat_one_data_memory)
+register_workload("matmul", treat_one_data_matmul)
+
+
+def compute(n_data : int, workload : str = default_workload):
     """Compute iteratively.
     Complexity is O(n_data) = BaseComplexity * n_data"""
+    treat_one = get_workload(workload)
     for _ in range(n_data):
-        treat_one_data()
+        treat_one()
 
 
 def treat_batch(model : "torch.nn.Module", batch : "torch.Tensor", device : "torch.cuda.device"):
@@ -1,5 +1,31 @@
 # Common config
 data_size = 1000
+default_workload = "python_loop"
+matmul_size = 256
+# Number of float64 of the array of the memory workload (64 MB), larger than the caches of most CPUs
+memory_workload_size = 2**23
+
+# Adaptive measurement config
+default_n_warmup = 1
+default_min_sample_time = 0.01
+default_target_relative_ci = 0.05
+default_max_time_per_input = 10.0
+default_min_measures = 5
+default_max_measures = 1000
+default_n_bootstrap = 1000
+# The confidence interval is recomputed each time the number of samples has grown by this factor (at least by one sample)
+ci_check_growth = 1.1
+
+# Instrumentation config
+default_sampling_interval = 0.05
+
+# Profiling config
+default_sampling_interval_profile = 0.001
+min_stack_time_profile = 1e-6
+
+# Isolation config
+# The time of a point is extrapolated from the previous points of its sweep only if at least this number of them were measured
+min_points_prediction_isolation = 3
 
 # CPU config
 default_n_measures_cpu = 10
@@ -8,15 +34,78 @@ default_log_n_data_cpu = 4
 # Multiprocessing config
 default_n_measures_parallel = 10
 default_log_n_data_parallel = 4
-default_log2_n_process_parallel = 3
-supported_libs = ["joblib", "mp", "ray"] 
+
+# Memory config
+default_n_measures_memory = 10
+default_log2_min_array_size_memory = 20
+default_log2_max_array_size_memory = 26
+default_log2_min_working_set_memory = 12
+default_log2_max_working_set_memory = 28
+default_n_steps_memory = 10**6
+
+# I/O config
+default_n_measures_io = 5
+default_log2_file_size_io = 26
+default_log2_min_block_size_io = 12
+default_log2_max_block_size_io = 20
+default_n_fsync_io = 100
+default_log2_n_process_io = 3
+
+# IPC config
+default_n_measures_ipc = 10
+default_log2_min_payload_size_ipc = 3
+default_log2_max_payload_size_ipc = 27
+default_log2_step_payload_size_ipc = 2
+joblib_max_nbytes_ipc = "1M"
+
+# Scheduling config
+default_n_measures_scheduling = 5
+default_log_n_tasks_scheduling = 3
+default_mean_task_size_scheduling = 10
+pareto_shape_scheduling = 1.5
+
+# Thread oversubscription config
+default_n_measures_oversubscription = 5
+default_n_tasks_oversubscription = 64
+
+# Startup config
+default_n_measures_startup = 5
+
+# Bench API config
+default_n_measures_bench = 10
+default_log2_min_size_bench = 4
+default_log2_max_size_bench = 14
+
+# Results comparison config
+default_threshold_compare = 0.05
+default_n_baselines_compare = 5
 
 # Torch config
 default_n_measures_torch = 10
 default_log_n_data_torch = 6
 n_neurons_torch_model = 10
 
+# Torch CPU config
+default_n_measures_torch_cpu = 10
+default_log2_max_batch_size_torch_cpu = 10
+default_width_torch_cpu = 256
+default_depth_torch_cpu = 4
+
+# Torch DataLoader config
+default_n_measures_dataloader = 3
+default_n_items_dataloader = 2048
+default_log2_item_size_dataloader = 16
+default_decode_cost_dataloader = 1
+default_batch_sizes_dataloader = [16, 64]
+saturation_tolerance_dataloader = 0.05
+
 # JAX config
 default_n_measures_jax = 20
 default_log_n_data_jax = 6
-n_data_jax = 1000
\ No newline at end of file
+n_data_jax = 1000
+default_n_startups_jax = 3
+
+# JAX CPU config
+default_n_measures_jax_cpu = 10
+default_log_n_data_jax_cpu = 4
+default_n_matrices_jax_cpu = 64
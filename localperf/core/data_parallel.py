@@ -0,0 +1,161 @@
+"""This module contains the data parallel workload : a large numpy array split between the workers, each one reducing its chunk.
+The array is shared with the workers with one of several sharing modes, which allows to measure the cost of moving real data to the workers.
+"""
+
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from localperf.core.config import data_size
+from localperf.core.ipc_kernels import attach_shared_memory
+
+
+sharing_modes = ["pickle", "shared_memory", "memmap", "ray"]
+
+
+@lru_cache(maxsize=1)
+def get_data_array(n_data : int) -> np.ndarray:
+    """Return the array of n_data data, each data being data_size float64. Only the last array is cached."""
+    return np.random.default_rng(0).random(n_data * data_size)
+
+
+def reduce_array(array : np.ndarray) -> float:
+    """Reduce an array, i.e. treat the data of the array. Complexity is O(len(array))."""
+    return np.sqrt(array).sum()
+
+
+def get_private_memory() -> int:
+    """Return the private (anonymous) resident memory of the current process in bytes, which excludes the shared memory segments
+    and the mapped files, read from /proc/self/status (linux only). Returns None if it can't be read."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def get_worker_private_memory(_ : Any = None) -> int:
+    """Return the private memory of the calling worker, see get_private_memory. This is the task sent to idle workers, its argument is ignored."""
+    return get_private_memory()
+
+
+# The shared memory segments and memory mapped files opened by each worker, so that they are opened once
+opened_arrays_cache : Dict[Any, np.ndarray] = {}
+
+
+def get_chunk(sharing : str, handle : Any, start : int, stop : int) -> np.ndarray:
+    """Return the chunk [start, stop) of a shared array, from the worker side."""
+    if sharing == "pickle":
+        return handle
+    elif sharing == "shared_memory":
+        name, size = handle
+        if name not in opened_arrays_cache:
+            opened_arrays_cache.clear()
+            shm = attach_shared_memory(name)
+            opened_arrays_cache[name] = (shm, np.ndarray((size,), dtype=np.float64, buffer=shm.buf))
+        return opened_arrays_cache[name][1][start:stop]
+    elif sharing == "memmap":
+        path, size = handle
+        if path not in opened_arrays_cache:
+            opened_arrays_cache.clear()
+            opened_arrays_cache[path] = np.memmap(path, dtype=np.float64, mode="r", shape=(size,))
+        return opened_arrays_cache[path][start:stop]
+    elif sharing == "ray":
+        import ray
+        return ray.get(handle)[start:stop]
+    else:
+        raise ValueError(f"Unknown sharing mode: {sharing}. Please choose one of {sharing_modes}")
+
+
+def reduce_chunk(task : Tuple[str, Any, int, int]) -> Tuple[float, int, int]:
+    """Reduce one chunk of a shared array. This is the task sent to the workers.
+
+    Args:
+        task (Tuple[str, Any, int, int]): the sharing mode, the handle of the shared array (or the chunk itself if pickled), and the start and stop of the chunk.
+
+    Returns:
+        Tuple[float, int, int]: the reduction of the chunk, the pid of the worker and its private memory in bytes while holding the chunk.
+    """
+    chunk = get_chunk(*task)
+    value = reduce_array(chunk)
+    return value, os.getpid(), get_private_memory()
+
+
+class SharedArray:
+    """An array shared with the workers of a pool with a given sharing mode.
+
+    pickle: each chunk is pickled and copied to the worker at each call.
+    shared_memory: the array is copied once in a multiprocessing.shared_memory segment, the workers attach to it and read it in place.
+    memmap: the array is written once in a temporary file, the workers read it through np.memmap.
+    ray: the array is put once in the object store of ray, the workers read it in place (zero-copy, read-only). Requires the ray backend.
+    """
+
+    def __init__(self, array : np.ndarray, sharing : str):
+        self.array = array
+        self.sharing = sharing
+        if sharing == "pickle":
+            self.handle = None
+        elif sharing == "shared_memory":
+            from multiprocessing import shared_memory
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)[:] = array
+            self.handle = (self.shm.name, len(array))
+        elif sharing == "memmap":
+            self.dir = tempfile.mkdtemp(prefix="localperf_memmap_")
+            path = self.dir + "/array.dat"
+            memmap = np.memmap(path, dtype=np.float64, mode="w+", shape=(max(1, len(array)),))
+            memmap[:len(array)] = array
+            memmap.flush()
+            del memmap
+            self.handle = (path, len(array))
+        elif sharing == "ray":
+            try:
+                import ray
+            except ImportError:
+                raise ImportError("Please install ray with: pip install ray")
+            if not ray.is_initialized():
+                ray.init()
+            self.handle = ray.put(array)
+        else:
+            raise ValueError(f"Unknown sharing mode: {sharing}. Please choose one of {sharing_modes}")
+
+    def get_tasks(self, n_process : int, chunksize : int = None) -> List[Tuple[str, Any, int, int]]:
+        """Split the array into tasks of chunksize data (data_size elements each), or into n_process tasks if chunksize is None."""
+        n_elements = len(self.array)
+        n_elements_per_task = -(-n_elements // n_process) if chunksize is None else chunksize * data_size
+        n_elements_per_task = max(1, n_elements_per_task)
+        list_tasks = []
+        for start in range(0, n_elements, n_elements_per_task):
+            stop = min(start + n_elements_per_task, n_elements)
+            if self.sharing == "pickle":
+                list_tasks.append((self.sharing, self.array[start:stop], 0, stop - start))
+            else:
+                list_tasks.append((self.sharing, self.handle, start, stop))
+        return list_tasks
+
+    def close(self):
+        """Free the shared resources of the array."""
+        if self.sharing == "shared_memory":
+            self.shm.close()
+            self.shm.unlink()
+        elif self.sharing == "memmap":
+            shutil.rmtree(self.dir, ignore_errors=True)
+        elif self.sharing == "ray":
+            self.handle = None
+
+
+def get_peak_private_memory(list_results : List[Tuple[float, int, int]], idle_memory : int = 0) -> int:
+    """Return the sum over the workers of their maximal private memory above idle_memory (the private memory of an idle worker,
+    see get_idle_private_memory), from the results of reduce_chunk. Returns None if it is unknown."""
+    dict_memory = {}
+    for _, pid, memory in list_results:
+        if memory is None or idle_memory is None:
+            return None
+        dict_memory[pid] = max(dict_memory.get(pid, 0), memory - idle_memory)
+    return sum(max(0, memory) for memory in dict_memory.values())
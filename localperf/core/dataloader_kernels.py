@@ -0,0 +1,87 @@
+"""This module contains the kernels of the torch input pipeline benchmark : a synthetic Dataset whose items cost a configurable
+number of data of a workload to decode, loaded by a torch DataLoader with a configurable number of workers, batch size,
+prefetching, persistence of the workers and multiprocessing context.
+torch is imported in the functions and the Dataset is defined at its first use, so that the benchmark can parse its arguments
+(and localperf dataloader --help works) without importing torch.
+"""
+
+from functools import lru_cache
+from typing import List
+
+from localperf.core.compute import get_workload
+from localperf.core.config import default_workload, saturation_tolerance_dataloader
+
+
+@lru_cache(maxsize=None)
+def get_synthetic_dataset_class() -> type:
+    """Return the class of the synthetic dataset, a torch.utils.data.Dataset defined at the first call (see get_synthetic_dataset)."""
+    import torch
+
+    class SyntheticDataset(torch.utils.data.Dataset):
+        """A dataset of n_items items of item_size bytes (float32 tensors), whose decoding costs decode_cost data of the workload
+        (see localperf.core.compute), which simulates the reading and decoding of real samples."""
+
+        def __init__(self, n_items : int, item_size : int, decode_cost : int = 1, workload : str = default_workload):
+            self.n_items = n_items
+            self.item_size = item_size
+            self.decode_cost = decode_cost
+            # The treatment is kept rather than the name of the workload, which the workers may not know if it was registered at runtime
+            self.treat_one = get_workload(workload)
+
+        def __len__(self):
+            return self.n_items
+
+        def __getitem__(self, index : int) -> "torch.Tensor":
+            for _ in range(self.decode_cost):
+                self.treat_one()
+            return torch.ones(max(1, self.item_size // 4), dtype=torch.float32)
+
+    # The class is found by pickle as an attribute of this module, e.g. when the dataset is sent to the workers of a spawn context
+    SyntheticDataset.__module__, SyntheticDataset.__qualname__ = __name__, "SyntheticDataset"
+    return SyntheticDataset
+
+
+def get_synthetic_dataset(n_items : int, item_size : int, decode_cost : int = 1, workload : str = default_workload) -> "torch.utils.data.Dataset":
+    """Return a dataset of n_items items of item_size bytes (float32 tensors), whose decoding costs decode_cost data of the workload
+    (see localperf.core.compute), which simulates the reading and decoding of real samples."""
+    return get_synthetic_dataset_class()(n_items, item_size, decode_cost, workload)
+
+
+# The dataset is defined lazily, so that it is found as an attribute of this module (e.g. by pickle) without importing torch at its import
+def __getattr__(name):
+    if name == "SyntheticDataset":
+        return get_synthetic_dataset_class()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def get_data_loader(
+        dataset : "torch.utils.data.Dataset",
+        num_workers : int,
+        batch_size : int,
+        prefetch_factor : int = 2,
+        persistent_workers : bool = False,
+        context : str = None,
+        pin_memory : bool = False,
+        ) -> "torch.utils.data.DataLoader":
+    """Return a DataLoader of the dataset. The options of the worker processes (prefetch_factor, persistent_workers and the multiprocessing
+    context, None for the default one) are ignored with num_workers=0, where the items are loaded in the main process."""
+    import torch
+    if num_workers == 0:
+        return torch.utils.data.DataLoader(dataset, batch_size=batch_size, shuffle=True, pin_memory=pin_memory)
+    return torch.utils.data.DataLoader(dataset, batch_size=batch_size, shuffle=True, pin_memory=pin_memory, num_workers=num_workers,
+                                       prefetch_factor=prefetch_factor, persistent_workers=persistent_workers, multiprocessing_context=context)
+
+
+def load_epoch(data_loader : "torch.utils.data.DataLoader") -> int:
+    """Load all the batches of one epoch, as a training loop would do without computation. Returns the number of items loaded."""
+    n_items = 0
+    for batch in data_loader:
+        n_items += len(batch)
+    return n_items
+
+
+def get_saturation_index(list_throughput : List[float], tolerance : float = saturation_tolerance_dataloader) -> int:
+    """Return the index of the first throughput within tolerance (relative) of the maximal throughput, i.e. the point
+    from which adding workers does not improve the throughput anymore."""
+    max_throughput = max(list_throughput)
+    return next(i for i, throughput in enumerate(list_throughput) if throughput >= (1 - tolerance) * max_throughput)
@@ -0,0 +1,184 @@
+"""This module contains the instrumentation of the measures : the CPU time, context switches and peak memory of the process
+and its children (from getrusage), and the utilization of each core (from /proc/stat, linux only) during each measured call.
+This allows to check that a benchmark really used all the cores, e.g. that it was not serialized on the GIL.
+"""
+
+import multiprocessing as mp
+from time import perf_counter
+import numpy as np
+from typing import Any, Dict, List
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from localperf.core.config import default_sampling_interval
+from localperf.core.utils import get_pyplot
+
+
+def get_rusage() -> Dict[str, float]:
+    """Return the resource usage of the process and of its terminated children, from resource.getrusage (unix only).
+    The CPU times are in seconds and the peak resident memory in bytes. Returns an empty dict if it is not available."""
+    if resource is None:
+        return {}
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "user_time" : usage_self.ru_utime,
+        "system_time" : usage_self.ru_stime,
+        "children_user_time" : usage_children.ru_utime,
+        "children_system_time" : usage_children.ru_stime,
+        "voluntary_switches" : usage_self.ru_nvcsw + usage_children.ru_nvcsw,
+        "involuntary_switches" : usage_self.ru_nivcsw + usage_children.ru_nivcsw,
+        "peak_rss" : max(usage_self.ru_maxrss, usage_children.ru_maxrss) * 1024,
+    }
+
+
+def read_proc_stat() -> np.ndarray:
+    """Return the busy and total time (in clock ticks) of each core since boot, as an array of shape (n_cores, 2), from /proc/stat (linux only).
+    Returns None if it can't be read."""
+    try:
+        with open("/proc/stat") as f:
+            lines = [line.split() for line in f if line.startswith("cpu") and not line.startswith("cpu ")]
+    except OSError:
+        return None
+    ticks = np.array([[int(value) for value in line[1:]] for line in lines], dtype=float)
+    # The idle and iowait times are the 4th and 5th values, the guest times are already counted in the user times
+    total = ticks[:, :8].sum(axis=1)
+    return np.stack([total - ticks[:, 3] - ticks[:, 4], total], axis=1)
+
+
+def get_core_utilization(stat_start : np.ndarray, stat_end : np.ndarray) -> np.ndarray:
+    """Return the utilization (between 0 and 1) of each core between two readings of /proc/stat."""
+    busy, total = (stat_end - stat_start).T
+    return np.divide(busy, total, out=np.zeros_like(busy), where=total > 0)
+
+
+def sample_core_utilization(connection : Any, sampling_interval : float):
+    """Loop of the process of CoreUtilizationSampler. Reads /proc/stat every sampling_interval seconds until it receives a message
+    from the connection, then sends back the times of the samples and the utilization of each core at each sample."""
+    list_time, list_core_utilization = [], []
+    t_start = perf_counter()
+    stat_previous = read_proc_stat()
+    while not connection.poll(sampling_interval):
+        stat = read_proc_stat()
+        list_time.append(perf_counter() - t_start)
+        list_core_utilization.append(get_core_utilization(stat_previous, stat))
+        stat_previous = stat
+    connection.send((list_time, list_core_utilization))
+
+
+class CoreUtilizationSampler:
+    """A background process reading /proc/stat every sampling_interval seconds, to record the utilization of each core over time.
+    It is a process rather than a thread, so that the pools forked by the benchmark are not forked from a process with threads."""
+
+    def __init__(self, sampling_interval : float = default_sampling_interval):
+        self.sampling_interval = sampling_interval
+        self.list_time = []
+        self.list_core_utilization = []
+
+    def start(self):
+        # /proc/stat is only available on linux, where the sampler can be forked
+        context = mp.get_context("fork")
+        self.connection, connection_process = context.Pipe()
+        self.process = context.Process(target=sample_core_utilization, args=(connection_process, self.sampling_interval), daemon=True)
+        self.process.start()
+        connection_process.close()
+
+    def stop(self):
+        self.connection.send(None)
+        self.list_time, self.list_core_utilization = self.connection.recv()
+        self.process.join()
+        self.connection.close()
+
+
+class ResourceMonitor:
+    """Record the resource usage of each measured call, and report their mean for each input as extra columns.
+    The utilization of each core is also sampled in the background from the first measure, until close is called.
+    The sampling process is started lazily, at the first measure.
+
+    The CPU times of the workers of a pool are counted in the children times only once the workers have terminated,
+    i.e. for pools created at each call. The utilization of the cores is counted whatever the process using them.
+    """
+
+    def __init__(self, sampling_interval : float = default_sampling_interval):
+        self.has_proc_stat = read_proc_stat() is not None
+        self.sampler = CoreUtilizationSampler(sampling_interval) if self.has_proc_stat else None
+        self.dict_measures : Dict[Any, List[Dict[str, float]]] = {}
+        self.is_sampling = False
+
+    def start(self, x_input : Any):
+        """Start monitoring a measure of x_input. Called just before the measured call."""
+        if self.sampler is not None and not self.is_sampling:
+            self.sampler.start()
+            self.is_sampling = True
+        self.stat_start = read_proc_stat()
+        self.rusage_start = get_rusage()
+
+    def stop(self, x_input : Any, elapsed_time : float, n_calls : int = 1):
+        """Stop monitoring a measure of x_input, which lasted elapsed_time seconds for n_calls calls. Called just after the measured call."""
+        rusage_end = get_rusage()
+        stat_end = read_proc_stat()
+
+        measure = {name : (rusage_end[name] - self.rusage_start[name]) / n_calls for name in rusage_end if name != "peak_rss"}
+        if rusage_end:
+            cpu_time = measure["user_time"] + measure["system_time"] + measure["children_user_time"] + measure["children_system_time"]
+            measure["cpu_time_per_wall_time"] = cpu_time * n_calls / elapsed_time if elapsed_time > 0 else 0
+            measure["lifetime_peak_rss_MB"] = rusage_end["peak_rss"] / 1e6
+        if self.has_proc_stat:
+            core_utilization = get_core_utilization(self.stat_start, stat_end)
+            measure["busy_cores"] = core_utilization.sum()
+        self.dict_measures.setdefault(x_input, []).append(measure)
+
+    def get_extra_columns(self, list_inputs : List[Any]) -> Dict[str, List[float]]:
+        """Return the mean over the measures of the resource usage of each input, as extra columns.
+        The measures are then cleared, so that the monitor can be reused for the next benchmark.
+
+        user_time, system_time, children_user_time, children_system_time: the CPU times in seconds of one call.
+        voluntary_switches, involuntary_switches: the context switches of one call (waiting for a resource, or preempted by the scheduler).
+        cpu_time_per_wall_time: the total CPU time divided by the elapsed time, i.e. the number of cores used by the process and its terminated children.
+        lifetime_peak_rss_MB: the peak resident memory of the process or of its largest child since the start of the process (not of the call only,
+            getrusage doesn't reset it): it only tells the memory used by a call when the call raises it.
+        busy_cores: the sum of the utilization of the cores (from /proc/stat) during the call, whatever the process using them.
+        """
+        dict_extra_columns = {}
+        for x_input in list_inputs:
+            list_measures = self.dict_measures.get(x_input, [])
+            for name in (list_measures[0] if list_measures else {}):
+                dict_extra_columns.setdefault(name, []).append(float(np.mean([measure[name] for measure in list_measures])))
+        self.dict_measures = {}
+        return dict_extra_columns
+
+    def close(self):
+        """Stop the background sampling of the utilization of the cores."""
+        if self.is_sampling:
+            self.sampler.stop()
+            self.is_sampling = False
+
+    def build_utilization_figure(self) -> bool:
+        """Build the matplotlib figure of the utilization of each core over time, sampled from the first measure.
+        Returns False if there is no sample to plot."""
+        if self.sampler is None or not self.sampler.list_time:
+            return False
+        plt = get_pyplot()
+        plt.figure("CPU utilization")
+        array_utilization = 100 * np.array(self.sampler.list_core_utilization).T
+        plt.imshow(array_utilization, aspect="auto", interpolation="nearest", vmin=0, vmax=100, cmap="viridis",
+                   extent=(0, self.sampler.list_time[-1], len(array_utilization) - 0.5, -0.5))
+        plt.colorbar(label="Utilization (%)")
+        plt.xlabel("Time since the first measure (s)")
+        plt.ylabel("Core")
+        return True
+
+
+def deal_with_utilization(monitor : ResourceMonitor, do_plot : bool = False, image_filename : str = None):
+    """Stop the background sampling of a monitor and (eventually) plot and save the utilization of the cores over time.
+    The figures of the results are shown along with it, so the last deal_with_results should be called with do_plot=False."""
+    monitor.close()
+    if not do_plot and image_filename is None:
+        return
+    if monitor.build_utilization_figure() and image_filename is not None:
+        get_pyplot().savefig(image_filename)
+    if do_plot:
+        get_pyplot().show()
@@ -0,0 +1,119 @@
+"""This module contains the kernels of the file I/O benchmarks : reading and writing a file by blocks,
+sequentially or at random offsets, with the different read paths of python (buffered read, readinto, mmap, np.memmap and O_DIRECT).
+"""
+
+import mmap
+import os
+import numpy as np
+from typing import List, Tuple
+
+
+read_methods = ["read", "readinto", "mmap", "np.memmap", "direct"]
+access_patterns = ["sequential", "random"]
+
+
+def create_file(path : str, file_size : int, block_size : int = 2**20):
+    """Create a file of file_size random bytes, written by blocks and synced to the disk."""
+    block = os.urandom(min(block_size, file_size))
+    with open(path, "wb") as f:
+        for offset in range(0, file_size, len(block)):
+            f.write(block[: file_size - offset])
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def evict_from_page_cache(path : str):
+    """Ask the kernel to evict the (clean) pages of a file from the page cache, so that the next reads come from the disk.
+    This has no effect on filesystems living in memory (e.g. tmpfs) and on platforms without posix_fadvise."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def get_offsets(file_size : int, block_size : int, pattern : str, seed : int = 0) -> List[int]:
+    """Return the offsets of the file_size // block_size blocks of the file, in order if pattern is "sequential" or shuffled if pattern is "random"."""
+    offsets = list(range(0, file_size - block_size + 1, block_size))
+    if pattern == "random":
+        np.random.default_rng(seed).shuffle(offsets)
+    elif pattern != "sequential":
+        raise ValueError(f"Unknown access pattern: {pattern}. Please choose one of {access_patterns}")
+    return offsets
+
+
+def write_blocks(path : str, block_size : int, offsets : List[int]):
+    """Write one block of block_size bytes at each offset of a file, through the buffered file object of python. The data is not synced to the disk."""
+    block = bytes(block_size)
+    with open(path, "r+b") as f:
+        for offset in offsets:
+            f.seek(offset)
+            f.write(block)
+
+
+def write_block_and_fsync(path : str, block_size : int, n_blocks : int):
+    """Write n_blocks blocks of block_size bytes at the start of a file, syncing the file to the disk after each block.
+    The time per block is the latency of a durable write."""
+    block = bytes(block_size)
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        for i in range(n_blocks):
+            os.pwrite(fd, block, i * block_size)
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_blocks(path : str, method : str, block_size : int, offsets : List[int]):
+    """Read one block of block_size bytes at each offset of a file, with the given read method.
+
+    read: buffered f.read, which allocates a new bytes object for each block.
+    readinto: buffered f.readinto into a preallocated buffer.
+    mmap: copy of each block from a memory mapping of the file into a preallocated buffer.
+    np.memmap: copy of each block from a numpy memory mapping of the file into a preallocated array.
+    direct: os.preadv into a page-aligned buffer, with the file opened with O_DIRECT (bypassing the page cache, linux only).
+    """
+    if method == "read":
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                f.read(block_size)
+    elif method == "readinto":
+        buffer = bytearray(block_size)
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                f.readinto(buffer)
+    elif method == "mmap":
+        buffer = bytearray(block_size)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in offsets:
+                buffer[:] = mm[offset : offset + block_size]
+    elif method == "np.memmap":
+        array = np.memmap(path, dtype=np.uint8, mode="r")
+        buffer = np.empty(block_size, dtype=np.uint8)
+        for offset in offsets:
+            np.copyto(buffer, array[offset : offset + block_size])
+        del array
+    elif method == "direct":
+        if not hasattr(os, "O_DIRECT"):
+            raise OSError("O_DIRECT is not available on this platform")
+        buffer = mmap.mmap(-1, block_size)
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+        try:
+            for offset in offsets:
+                os.preadv(fd, [buffer], offset)
+        finally:
+            os.close(fd)
+            buffer.close()
+    else:
+        raise ValueError(f"Unknown read method: {method}. Please choose one of {read_methods}")
+
+
+def read_blocks_task(args : Tuple[str, int, List[int]]):
+    """Read blocks of a file with readinto, with the arguments (path, block_size, offsets) packed in a tuple so that it can be mapped by a parallel backend."""
+    path, block_size, offsets = args
+    read_blocks(path, "readinto", block_size, offsets)
@@ -0,0 +1,147 @@
+"""This module contains the kernels of the inter-process communication benchmarks : serializing a payload with pickle,
+and sending it to another process through a pipe, a queue, a shared memory segment, joblib or the object store of ray.
+"""
+
+import pickle
+import multiprocessing as mp
+import threading
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from typing import Any, Dict, Tuple
+
+
+# Lock of the temporary replacement of resource_tracker.register in attach_shared_memory, which is global to the process,
+# so that the threads of a thread pool attaching at the same time can't restore the replacement for good
+resource_tracker_lock = threading.Lock()
+
+ipc_methods = ["pickle4", "pickle5_oob", "pipe", "queue", "shared_memory", "joblib_pickle", "joblib_memmap", "ray_put_get", "ray_task"]
+
+
+def get_payload(payload_size : int) -> np.ndarray:
+    """Return a numpy array of payload_size bytes."""
+    return np.ones(payload_size, dtype=np.uint8)
+
+
+def get_nbytes(payload : np.ndarray) -> int:
+    """Return the number of bytes of a payload. Used as the task of the receiving process, so that it touches the payload but does no computation."""
+    return payload.nbytes
+
+
+def pickle_round_trip(payload : Any, protocol : int = 4) -> Any:
+    """Serialize and deserialize a payload with pickle, in-band (the data of numpy arrays is copied into the pickle bytes)."""
+    return pickle.loads(pickle.dumps(payload, protocol=protocol))
+
+
+def pickle_out_of_band_round_trip(payload : Any) -> Any:
+    """Serialize and deserialize a payload with pickle protocol 5 and out-of-band buffers (the data of numpy arrays is not copied)."""
+    buffers = []
+    data = pickle.dumps(payload, protocol=5, buffer_callback=buffers.append)
+    return pickle.loads(data, buffers=buffers)
+
+
+def attach_shared_memory(name : str) -> shared_memory.SharedMemory:
+    """Attach to an existing shared memory segment without registering it to the resource tracker (when python allows it),
+    so that the segment is not unlinked when the attaching process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before python 3.13, the registration is skipped by hand: unregistering afterwards fails when the attaching process
+        # does not share the resource tracker of the creating process (e.g. loky workers)
+        with resource_tracker_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype : None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+def pipe_worker(conn):
+    """Loop of a receiving process. Receives payloads, or ("shm", name, nbytes) handles of shared memory segments, from a connection
+    and answers with their number of bytes, until it receives None."""
+    dict_shm = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        if isinstance(message, tuple) and message[0] == "shm":
+            _, name, nbytes = message
+            if name not in dict_shm:
+                dict_shm[name] = attach_shared_memory(name)
+            payload = np.ndarray((nbytes,), dtype=np.uint8, buffer=dict_shm[name].buf)
+            conn.send(get_nbytes(payload))
+            del payload
+        else:
+            conn.send(get_nbytes(message))
+    for shm in dict_shm.values():
+        shm.close()
+
+
+def queue_worker(queue_in, queue_out):
+    """Loop of a receiving process. Receives payloads from a queue and answers with their number of bytes on another queue, until it receives None."""
+    while True:
+        payload = queue_in.get()
+        if payload is None:
+            break
+        queue_out.put(get_nbytes(payload))
+
+
+def start_pipe_worker() -> Tuple[Any, mp.Process]:
+    """Start a receiving process connected by a pipe. Returns the connection of the parent and the process."""
+    conn_parent, conn_child = mp.Pipe()
+    process = mp.Process(target=pipe_worker, args=(conn_child,), daemon=True)
+    process.start()
+    return conn_parent, process
+
+
+def start_queue_worker() -> Tuple[Any, Any, mp.Process]:
+    """Start a receiving process connected by two queues. Returns the queue to the process, the queue from the process and the process."""
+    queue_in, queue_out = mp.Queue(), mp.Queue()
+    process = mp.Process(target=queue_worker, args=(queue_in, queue_out), daemon=True)
+    process.start()
+    return queue_in, queue_out, process
+
+
+def send_through_pipe(conn, payload : Any) -> int:
+    """Send a payload to the receiving process through a pipe (pickled by the connection) and wait for its answer."""
+    conn.send(payload)
+    return conn.recv()
+
+
+def send_through_queue(queue_in, queue_out, payload : Any) -> int:
+    """Send a payload to the receiving process through a queue (pickled by a feeder thread) and wait for its answer."""
+    queue_in.put(payload)
+    return queue_out.get()
+
+
+def send_through_shared_memory(conn, shm : shared_memory.SharedMemory, payload : np.ndarray) -> int:
+    """Copy a payload into a shared memory segment, then send the handle of the segment to the receiving process through a pipe and wait for its answer.
+    The receiving process reads the payload in place, without copy."""
+    np.ndarray((payload.nbytes,), dtype=np.uint8, buffer=shm.buf)[:] = payload
+    return send_through_pipe(conn, ("shm", shm.name, payload.nbytes))
+
+
+def get_shared_memories(list_payload_size) -> Dict[int, shared_memory.SharedMemory]:
+    """Create one shared memory segment for each payload size."""
+    return {payload_size : shared_memory.SharedMemory(create=True, size=payload_size) for payload_size in list_payload_size}
+
+
+def start_ray():
+    """Import ray and initialize a local runtime if needed. Returns the ray module."""
+    try:
+        import ray
+    except ImportError:
+        raise ImportError("Please install ray with: pip install ray")
+    if not ray.is_initialized():
+        ray.init()
+    return ray
+
+
+def put_get_through_ray(ray, payload : Any) -> Any:
+    """Put a payload in the object store of ray and get it back. Numpy arrays are read in place from the object store, without copy."""
+    return ray.get(ray.put(payload))
+
+
+def send_through_ray_task(ray, get_nbytes_ray, payload : Any) -> int:
+    """Send a payload to a ray task and wait for its answer. Large payloads are put in the object store and read in place by the worker."""
+    return ray.get(get_nbytes_ray.remote(payload))
@@ -0,0 +1,170 @@
+"""This module contains the isolation of the measured points : each point (all the measures of one input) is measured in a new process
+forked from the benchmark, so that no state leaks from a point to the next ones (heap growth, caches, a runtime or thread pools left running),
+with a timeout after which the process and the workers it started are killed, and a time budget for the whole run.
+The time of a point is extrapolated from the growth of the time of the previous points of its sweep with the complexity models,
+and the points that would exceed the timeout or the remaining budget are skipped instead of being measured (unix only).
+"""
+
+import multiprocessing as mp
+import os
+import signal
+from numbers import Number
+from time import perf_counter
+from typing import Any, Callable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from localperf.core.complexity import complexity_models, fit_complexity, get_best_complexity
+from localperf.core.config import min_points_prediction_isolation
+
+
+class PointIsolation(NamedTuple):
+    """The settings of the isolation of the points: the timeout of a point and the time budget of the run in seconds (None for no limit),
+    and the start time of the run."""
+    timeout : float
+    run_budget : float
+    t_start : float
+
+
+# The isolation of the points of the current run, None if the points are measured in the process of the benchmark
+current_isolation : PointIsolation = None
+
+
+def start_isolation(timeout : float = None, run_budget : float = None):
+    """Measure every point of the run (every input of measure_time) in a new process, with a timeout per point and a time budget for the run.
+
+    Args:
+        timeout (float, optional): the maximal time in seconds of the measures of a point. Defaults to None (no timeout).
+        run_budget (float, optional): the maximal time in seconds of the whole run, from this call. Defaults to None (no budget).
+    """
+    global current_isolation
+    if "fork" not in mp.get_all_start_methods():
+        raise ValueError("The isolation of the points requires the fork start method (unix only)")
+    current_isolation = PointIsolation(timeout, run_budget, perf_counter())
+
+
+def is_isolated() -> bool:
+    """Whether the points of the current run are measured in isolation, see start_isolation."""
+    return current_isolation is not None
+
+
+def predict_point_time(list_inputs : List[Any], list_mean_time : List[float], x_input : Any) -> float:
+    """Extrapolate the time of one call for x_input from the mean times of the previous inputs of the sweep, with the complexity model
+    that fits them best. Returns None if it can't be predicted: non-numeric inputs, or less than min_points_prediction_isolation previous measured inputs
+    (the complexity models fit any 2 points, which made the extrapolation skip points from the noise of the smallest ones)."""
+    list_points = [(x, mean_time) for x, mean_time in zip(list_inputs, list_mean_time)
+                   if isinstance(x, Number) and x >= 1 and np.isfinite(mean_time) and mean_time > 0]
+    if not isinstance(x_input, Number) or len(list_points) < min_points_prediction_isolation:
+        return None
+    list_sizes, list_time = zip(*list_points)
+    dict_fits = fit_complexity(list_sizes, list_time)
+    model = get_best_complexity(dict_fits)
+    return dict_fits[model]["fixed_overhead"] + dict_fits[model]["per_item_cost"] * float(complexity_models[model](np.array(float(x_input))))
+
+
+def get_skip_reason(list_inputs : List[Any], list_mean_time : List[float], list_failed_inputs : List[Any], x_input : Any, n_measures : int) -> str:
+    """Return why the point of x_input should be skipped, or None if it should be measured: the budget of the run is exhausted,
+    a smaller point of the sweep timed out or failed (list_failed_inputs), or its extrapolated time exceeds the timeout or the remaining budget.
+    A smaller point skipped by the extrapolation doesn't skip the next ones, which are extrapolated in turn."""
+    if current_isolation.run_budget is not None:
+        remaining_time = current_isolation.run_budget - (perf_counter() - current_isolation.t_start)
+        if remaining_time <= 0:
+            return "the time budget of the run is exhausted"
+    else:
+        remaining_time = None
+    if isinstance(x_input, Number) and any(isinstance(x, Number) and x < x_input for x in list_failed_inputs):
+        return "a smaller point timed out or failed"
+    predicted_time = predict_point_time(list_inputs, list_mean_time, x_input)
+    if predicted_time is not None:
+        predicted_time *= n_measures
+        if current_isolation.timeout is not None and predicted_time > current_isolation.timeout:
+            return f"its measures would take about {predicted_time:.1f} s, more than the timeout of {current_isolation.timeout} s"
+        if remaining_time is not None and predicted_time > remaining_time:
+            return f"its measures would take about {predicted_time:.1f} s, more than the remaining {remaining_time:.1f} s of the time budget"
+    return None
+
+
+def run_point(func : Callable, x_input : Any, n_measures : int, setup : Callable, show_progress_bar : bool, connection : Any):
+    """Measure the point of x_input in the process forked for it and send the measured times, or the error raised, to the benchmark."""
+    # Own process group, so that the workers started by the point are killed with it
+    os.setsid()
+    try:
+        list_time = []
+        iterable = range(n_measures)
+        if show_progress_bar:
+            from tqdm import tqdm
+            iterable = tqdm(iterable, desc=f"Measuring time for {x_input} data")
+        for _ in iterable:
+            if setup is not None:
+                setup(x_input)
+            t_start = perf_counter()
+            func(x_input)
+            list_time.append(perf_counter() - t_start)
+        # The forked process exits without the atexit hooks, that would shut down the workers left by the point and delete their temporary folders
+        from localperf.core.parallel_func import shutdown_loky_executor
+        shutdown_loky_executor()
+        connection.send(list_time)
+    except BaseException as e:
+        connection.send(f"{type(e).__name__}: {e}")
+
+
+def measure_point_isolated(
+        func : Callable,
+        x_input : Any,
+        n_measures : int,
+        setup : Callable = None,
+        show_progress_bar : bool = False,
+        list_inputs : List[Any] = None,
+        list_mean_time : List[float] = None,
+        list_failed_inputs : List[Any] = None,
+        ) -> Tuple[List[float], bool]:
+    """Measure n_measures times func(x_input) in a new process forked for this point, unless it should be skipped (see get_skip_reason).
+    The process and its workers are killed if the measures exceed the timeout. Returns the measured times, or an empty list if the point
+    was skipped, timed out or failed (with a warning), and whether it timed out or failed.
+
+    Args:
+        func (Callable): the function to measure.
+        x_input (Any): the input of the point.
+        n_measures (int): the number of measures of the point.
+        setup (Callable, optional): a function called with the input before each measure, whose time is not measured. Defaults to None.
+        show_progress_bar (bool, optional): whether to show a progress bar. Defaults to False.
+        list_inputs (List[Any], optional): the previous inputs of the sweep, used to extrapolate the time of the point. Defaults to None.
+        list_mean_time (List[float], optional): the mean times of the previous inputs of the sweep (NaN if not measured). Defaults to None.
+        list_failed_inputs (List[Any], optional): the previous inputs of the sweep that timed out or failed. Defaults to None.
+
+    Returns:
+        Tuple[List[float], bool]: the measured times, and whether the point timed out or failed.
+    """
+    skip_reason = get_skip_reason(list_inputs or [], list_mean_time or [], list_failed_inputs or [], x_input, n_measures)
+    if skip_reason is not None:
+        print(f"WARNING : skipping {x_input}, since {skip_reason}.")
+        return [], False
+    # The point is stopped at its timeout, or at the end of the time budget of the run
+    timeout = current_isolation.timeout
+    if current_isolation.run_budget is not None:
+        remaining_time = current_isolation.run_budget - (perf_counter() - current_isolation.t_start)
+        timeout = remaining_time if timeout is None else min(timeout, remaining_time)
+    context = mp.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=run_point, args=(func, x_input, n_measures, setup, show_progress_bar, sender))
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout):
+            result = receiver.recv()
+        else:
+            result = f"timeout after {timeout:.1f} s"
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                process.kill()
+    except EOFError:
+        # The process died without sending its result, e.g. killed by the system
+        process.join()
+        result = f"its process exited with code {process.exitcode}"
+    process.join()
+    receiver.close()
+    if isinstance(result, str):
+        print(f"WARNING : {x_input} was not measured ({result}).")
+        return [], True
+    return result, False
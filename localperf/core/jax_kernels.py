@@ -0,0 +1,200 @@
+"""This module contains the kernels of the JAX benchmarks : a jitted matrix product whose tracing, compilation and first execution are
+timed apart from its steady-state execution, the persistent compilation cache of JAX, and the startup of a new JAX process
+(import, tracing, compilation and first result) with a cold or a warm compilation cache.
+It also contains the batched versions of the matrix product on the CPU: a python loop of the jitted product, vmap on one device,
+and pmap or shard_map across several host devices (see set_host_device_count).
+JAX dispatches its computations asynchronously, so every timed computation waits for its result with block_until_ready.
+jax is imported in the functions, so that the startup of a new process can time its import.
+"""
+
+import os
+from time import perf_counter
+import numpy as np
+from typing import Any, Callable, Dict, List, Tuple
+
+from localperf.core.measuring import measure_time
+
+
+jax_batch_methods = ["loop", "vmap"]
+jax_parallel_methods = ["pmap", "shard_map"]
+
+
+def matmul(X):
+    """Product of a square matrix by itself, the computation of the JAX benchmarks."""
+    return X @ X
+
+
+def get_matrix(n_data : int, device : Any) -> Any:
+    """Return a random square matrix of about n_data elements on a JAX device, generated before the measures."""
+    import jax
+    side = max(1, int(np.sqrt(n_data)))
+    X = jax.device_put(jax.random.normal(jax.random.PRNGKey(0), (side, side)), device)
+    return X.block_until_ready()
+
+
+def compile_function(func : Callable, X : Any) -> Tuple[Callable, Dict[str, float]]:
+    """Jit-compile a function for the shape of X, with the ahead-of-time API of JAX so that the phases are timed apart.
+
+    Returns:
+        Tuple[Callable, Dict[str, float]]: the compiled function, and the times of its phases: trace_time (tracing and lowering to XLA),
+            compile_time (compilation by XLA, or loading from the persistent compilation cache) and first_run_time (first execution).
+    """
+    import jax
+    t_start = perf_counter()
+    # Functions already transformed by jit or pmap are lowered as they are
+    lowered = (func if hasattr(func, "lower") else jax.jit(func)).lower(X)
+    t_traced = perf_counter()
+    compiled = lowered.compile()
+    t_compiled = perf_counter()
+    compiled(X).block_until_ready()
+    t_end = perf_counter()
+    return compiled, {"trace_time" : t_traced - t_start, "compile_time" : t_compiled - t_traced, "first_run_time" : t_end - t_compiled}
+
+
+def enable_compilation_cache(cache_dir : str):
+    """Enable the persistent compilation cache of JAX in cache_dir, for every compilation (by default, JAX only caches the slow ones).
+    Must be called before the first compilation of the process."""
+    import jax
+    jax.config.update("jax_compilation_cache_dir", cache_dir)
+    for name in ["jax_persistent_cache_min_compile_time_secs", "jax_persistent_cache_min_entry_size_bytes"]:
+        try:
+            jax.config.update(name, 0)
+        except AttributeError:
+            # Option of a more recent version of JAX
+            pass
+
+
+def measure_startup(n_data : int, platform : str, cache_dir : str = None, preallocate : bool = True) -> Dict[str, float]:
+    """Measure the startup of a JAX computation in a new process (see run_in_new_process): the import of jax, the generation of the data,
+    the tracing, compilation and first execution of matmul, with the persistent compilation cache in cache_dir if given.
+    With preallocate False, JAX allocates the memory of the GPU on demand instead of preallocating 75% of it at its initialization
+    (XLA_PYTHON_CLIENT_PREALLOCATE=false), which is needed when another process, e.g. the parent benchmark, already holds this memory.
+
+    Returns:
+        Dict[str, float]: the import_time, data_time, trace_time, compile_time and first_run_time, and the total time_to_first_result.
+    """
+    if not preallocate:
+        os.environ["XLA_PYTHON_CLIENT_PREALLOCATE"] = "false"
+    t_start = perf_counter()
+    import jax
+    dict_times = {"import_time" : perf_counter() - t_start}
+    if cache_dir is not None:
+        enable_compilation_cache(cache_dir)
+    t_data = perf_counter()
+    X = get_matrix(n_data, jax.devices(platform)[0])
+    dict_times["data_time"] = perf_counter() - t_data
+    _, dict_compile_times = compile_function(matmul, X)
+    dict_times.update(dict_compile_times)
+    dict_times["time_to_first_result"] = perf_counter() - t_start
+    return dict_times
+
+
+def set_host_device_count(n_devices : int, single_threaded : bool = True) -> str:
+    """Make JAX expose n_devices CPU devices, with the XLA flag --xla_force_host_platform_device_count.
+    Each device of XLA:CPU also runs its operations on a multi-threaded Eigen pool using all the cores, so with single_threaded
+    this pool is disabled (--xla_cpu_multi_thread_eigen=false intra_op_parallelism_threads=1): each device then computes on one thread,
+    and the speed-up across devices measures the data parallelism, not the competition of the pools of every device for the cores.
+    Must be called before the first use of jax, which initializes its backends, i.e. in a new process (see run_in_new_process).
+    Returns the XLA flags set."""
+    xla_flags = f"--xla_force_host_platform_device_count={n_devices}"
+    if single_threaded:
+        xla_flags += " --xla_cpu_multi_thread_eigen=false intra_op_parallelism_threads=1"
+    os.environ["XLA_FLAGS"] = os.environ.get("XLA_FLAGS", "") + " " + xla_flags
+    return xla_flags
+
+
+def get_batch_of_matrices(n_matrices : int, n_data : int, device : Any = None) -> Any:
+    """Return a random batch of n_matrices square matrices of about n_data elements each, of shape (n_matrices, side, side),
+    on a JAX device (the default device if None), generated before the measures."""
+    import jax
+    side = max(1, int(np.sqrt(n_data)))
+    X = jax.random.normal(jax.random.PRNGKey(0), (n_matrices, side, side))
+    return jax.device_put(X, device).block_until_ready() if device is not None else X.block_until_ready()
+
+
+def get_batched_matmul(method : str, X : Any) -> Tuple[Callable, Any]:
+    """Return the product of each matrix of a batch X by itself with a batching method, and its input.
+
+    loop: python loop of the jitted product over the matrices of the batch, given as a list of matrices.
+    vmap: the product vectorized over the batch with vmap, compiled as one XLA computation on one device.
+
+    Returns:
+        Tuple[Callable, Any]: the function, which waits for its result, and its input (built from X before the measures).
+    """
+    import jax
+    if method == "loop":
+        list_X = [X[i] for i in range(X.shape[0])]
+        compiled, _ = compile_function(matmul, list_X[0])
+        def loop_matmul(list_X : List[Any]):
+            return jax.block_until_ready([compiled(X_i) for X_i in list_X])
+        return loop_matmul, list_X
+    elif method == "vmap":
+        compiled, _ = compile_function(jax.vmap(matmul), X)
+        def vmap_matmul(X : Any):
+            return compiled(X).block_until_ready()
+        return vmap_matmul, X
+    else:
+        raise ValueError(f"Unknown batching method: {method}. Please choose one of {jax_batch_methods}")
+
+
+def get_sharded_matmul(method : str, X : Any, devices : List[Any]) -> Tuple[Callable, Any]:
+    """Return the product of each matrix of a batch X by itself, split across devices with a data-parallel method, and its input
+    already split across the devices. The number of matrices of X must be a multiple of the number of devices.
+
+    vmap: the batch on the first device only, vectorized with vmap (the reference without data parallelism).
+    pmap: the batch reshaped to (n_devices, n_matrices / n_devices, side, side), with pmap over the devices of vmap over the matrices.
+    shard_map: the batch sharded along its first axis on a mesh of the devices, with shard_map of vmap inside a jit.
+
+    Returns:
+        Tuple[Callable, Any]: the compiled function and its input. The compilation is not timed.
+    """
+    import jax
+    n_devices = len(devices)
+    if X.shape[0] % n_devices != 0:
+        raise ValueError(f"The number of matrices ({X.shape[0]}) must be a multiple of the number of devices ({n_devices})")
+    if method == "vmap":
+        X = jax.device_put(X, devices[0])
+        func = jax.vmap(matmul)
+    elif method == "pmap":
+        X = jax.device_put_sharded(list(X.reshape((n_devices, -1) + X.shape[1:])), devices)
+        func = jax.pmap(jax.vmap(matmul), devices=devices)
+    elif method == "shard_map":
+        try:
+            from jax import shard_map
+        except ImportError:
+            # Versions of JAX before shard_map was moved out of jax.experimental
+            from jax.experimental.shard_map import shard_map
+        from jax.sharding import Mesh, NamedSharding, PartitionSpec
+        mesh = Mesh(np.array(devices), ("devices",))
+        X = jax.device_put(X, NamedSharding(mesh, PartitionSpec("devices")))
+        func = jax.jit(shard_map(jax.vmap(matmul), mesh=mesh, in_specs=PartitionSpec("devices"), out_specs=PartitionSpec("devices")))
+    else:
+        raise ValueError(f"Unknown data-parallel method: {method}. Please choose one of {['vmap'] + jax_parallel_methods}")
+    compiled, _ = compile_function(func, X)
+    return compiled, X.block_until_ready()
+
+
+def measure_devices_point(
+        n_devices : int,
+        method : str,
+        n_matrices : int,
+        list_n_data : List[int],
+        n_measures : int,
+        single_threaded : bool = True,
+        ) -> Tuple[List[float], List[float], List[List[float]]]:
+    """Measure the product of batches of n_matrices matrices of each n_data split across n_devices host devices with a data-parallel method,
+    each device computing on one thread if single_threaded (see set_host_device_count).
+    Must be run in a new process (see run_in_new_process), since the number of host devices is fixed at the import of jax.
+    Returns the lists of mean and std of the time and the measured times, for each n_data."""
+    set_host_device_count(n_devices, single_threaded)
+    import jax
+    devices = jax.devices("cpu")[:n_devices]
+    dict_compiled = {}
+    for n_data in list_n_data:
+        dict_compiled[n_data] = get_sharded_matmul(method, get_batch_of_matrices(n_matrices, n_data), devices)
+        
+    def sharded_matmul(n_data : int):
+        compiled, X = dict_compiled[n_data]
+        return compiled(X).block_until_ready()
+    
+    return measure_time(func=sharded_matmul, list_inputs=list_n_data, n_measures=n_measures)
@@ -0,0 +1,206 @@
+"""This module contains the fingerprint of the machine : the hardware and software the benchmarks run on, read from local sources
+(/proc, /sys and the installed libraries), which is stored with the results of every run since measures are meaningless without it.
+It also contains the effective number of CPUs, which takes into account the CPU affinity and the cgroup CPU quota of containers.
+"""
+
+import math
+import os
+import platform
+import socket
+import sys
+import sysconfig
+from functools import lru_cache
+from importlib import metadata
+from typing import Any, Dict, List, Optional
+
+
+# Environment variables which set the number of threads of the BLAS and OpenMP runtimes
+thread_environment_variables = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"]
+
+# Keys of the fingerprint which identify the machine and its software, i.e. whose change makes two runs not comparable
+machine_identity_keys = ["hostname", "model", "effective_cpu_count", "total_memory_MB", "python_version", "free_threaded", "numpy", "torch", "jax"]
+
+
+def read_file(path : str) -> Optional[str]:
+    """Return the stripped content of a file, or None if it can't be read."""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def parse_cpu_list(cpu_list : str) -> List[int]:
+    """Parse a list of CPUs in the format of /sys, e.g. "0-3,8,10-11"."""
+    list_cpus = []
+    for part in cpu_list.split(","):
+        if "-" in part:
+            start, stop = part.split("-")
+            list_cpus += list(range(int(start), int(stop) + 1))
+        elif part:
+            list_cpus.append(int(part))
+    return list_cpus
+
+
+def get_cgroup_cpu_quota() -> Optional[float]:
+    """Return the CPU quota of the cgroup of the process in number of CPUs (e.g. 1.5), read from cgroup v2 (cpu.max) or v1 (cpu.cfs_quota_us).
+    Returns None if there is no quota or if it can't be read (e.g. not on linux)."""
+    cpu_max = read_file("/sys/fs/cgroup/cpu.max")
+    if cpu_max is not None:
+        quota, period = cpu_max.split()
+        return None if quota == "max" else int(quota) / int(period)
+    quota, period = read_file("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), read_file("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota is None or period is None or int(quota) <= 0:
+        return None
+    return int(quota) / int(period)
+
+
+def get_available_cpus() -> int:
+    """Return the number of CPUs the process is allowed to run on (its CPU affinity), or the number of logical cores if it is unknown."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@lru_cache(maxsize=1)
+def get_effective_cpu_count() -> int:
+    """Return the number of CPUs the process can actually use: the number of CPUs of its affinity, limited by the cgroup CPU quota (rounded up).
+    This is the number of process to use by default, since more process than the quota only adds throttling, e.g. in containers."""
+    n_cpus = get_available_cpus()
+    quota = get_cgroup_cpu_quota()
+    if quota is not None:
+        n_cpus = min(n_cpus, max(1, math.ceil(quota)))
+    return n_cpus
+
+
+def get_cpu_info() -> Dict[str, Any]:
+    """Return the model, the number of physical and logical cores, the flags and the frequencies of the CPU, read from /proc/cpuinfo and /sys (linux only)."""
+    cpu_info = {"model" : platform.processor() or None, "logical_cores" : os.cpu_count(), "physical_cores" : None, "flags" : None}
+    cpuinfo = read_file("/proc/cpuinfo")
+    if cpuinfo is not None:
+        set_cores = set()
+        physical_id = None
+        for line in cpuinfo.splitlines():
+            key, _, value = line.partition(":")
+            key, value = key.strip(), value.strip()
+            if key == "model name":
+                cpu_info["model"] = value
+            elif key in ["flags", "Features"] and cpu_info["flags"] is None:
+                cpu_info["flags"] = value.split()
+            elif key == "cpu MHz" and "current_frequency_MHz" not in cpu_info:
+                cpu_info["current_frequency_MHz"] = float(value)
+            elif key == "physical id":
+                physical_id = value
+            elif key == "core id":
+                set_cores.add((physical_id, value))
+        cpu_info["physical_cores"] = len(set_cores) or None
+    cpufreq_dir = "/sys/devices/system/cpu/cpu0/cpufreq"
+    cpu_info["frequency_governor"] = read_file(f"{cpufreq_dir}/scaling_governor")
+    for name, filename in [("current_frequency_MHz", "scaling_cur_freq"), ("max_frequency_MHz", "cpuinfo_max_freq")]:
+        frequency = read_file(f"{cpufreq_dir}/{filename}")
+        if frequency is not None:
+            cpu_info[name] = int(frequency) / 1000
+    return cpu_info
+
+
+def get_memory_info() -> Dict[str, Any]:
+    """Return the total memory, the memory limit of the cgroup and the NUMA nodes with their CPUs (linux only)."""
+    memory_info = {"total_memory_MB" : None, "cgroup_memory_limit_MB" : None, "numa_nodes" : {}}
+    meminfo = read_file("/proc/meminfo")
+    if meminfo is not None:
+        for line in meminfo.splitlines():
+            if line.startswith("MemTotal:"):
+                memory_info["total_memory_MB"] = int(line.split()[1]) / 1024
+    memory_limit = read_file("/sys/fs/cgroup/memory.max") or read_file("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    if memory_limit is not None and memory_limit != "max" and int(memory_limit) < 2**60:
+        memory_info["cgroup_memory_limit_MB"] = int(memory_limit) / 2**20
+    node_dir = "/sys/devices/system/node"
+    if os.path.isdir(node_dir):
+        for node in sorted(os.listdir(node_dir)):
+            cpu_list = read_file(f"{node_dir}/{node}/cpulist")
+            if node.startswith("node") and cpu_list is not None:
+                memory_info["numa_nodes"][node] = parse_cpu_list(cpu_list)
+    return memory_info
+
+
+def get_python_info() -> Dict[str, Any]:
+    """Return the version and build of python, and whether it is a free-threaded build and if the GIL is enabled."""
+    is_free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    return {
+        "python_version" : platform.python_version(),
+        "python_implementation" : platform.python_implementation(),
+        "python_build" : " ".join(platform.python_build()),
+        "python_compiler" : platform.python_compiler(),
+        "free_threaded" : is_free_threaded,
+        "gil_enabled" : sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True,
+    }
+
+
+def get_package_version(package : str) -> Optional[str]:
+    """Return the installed version of a package, without importing it, or None if it is not installed."""
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def get_libraries_info() -> Dict[str, Any]:
+    """Return the BLAS configuration of numpy, the versions of numpy, torch and jax, and their thread settings.
+    torch and jax are not imported (it is slow), their number of threads is only read if they are already imported."""
+    libraries_info = {package : get_package_version(package) for package in ["numpy", "torch", "jax", "jaxlib"]}
+    libraries_info["thread_environment_variables"] = {name : os.environ[name] for name in thread_environment_variables if name in os.environ}
+    try:
+        import numpy as np
+        blas = np.show_config(mode="dicts")["Build Dependencies"]["blas"]
+        libraries_info["numpy_blas"] = {key : blas.get(key) for key in ["name", "version", "openblas configuration"] if blas.get(key) is not None}
+    except Exception:
+        libraries_info["numpy_blas"] = None
+    try:
+        from threadpoolctl import threadpool_info
+        libraries_info["threadpools"] = [{key : pool.get(key) for key in ["internal_api", "version", "num_threads", "threading_layer"]} for pool in threadpool_info()]
+    except ImportError:
+        pass
+    if "torch" in sys.modules:
+        torch = sys.modules["torch"]
+        libraries_info["torch_num_threads"] = torch.get_num_threads()
+        libraries_info["torch_num_interop_threads"] = torch.get_num_interop_threads()
+    if "jax" in sys.modules:
+        libraries_info["jax_devices"] = [str(device) for device in sys.modules["jax"].devices()]
+    return libraries_info
+
+
+@lru_cache(maxsize=1)
+def get_machine_fingerprint() -> Dict[str, Any]:
+    """Return the fingerprint of the machine: hostname and platform, CPU, effective number of CPUs (affinity and cgroup quota),
+    memory and NUMA topology, python build and numerical libraries. Stored with the results of every run, see localperf.core.results."""
+    return {
+        "hostname" : socket.gethostname(),
+        "platform" : platform.platform(),
+        "machine" : platform.machine(),
+        **get_cpu_info(),
+        "available_cpus" : get_available_cpus(),
+        "cgroup_cpu_quota" : get_cgroup_cpu_quota(),
+        "effective_cpu_count" : get_effective_cpu_count(),
+        **get_memory_info(),
+        **get_python_info(),
+        **get_libraries_info(),
+    }
+
+
+def get_machine_summary() -> str:
+    """Return a short description of the machine, printed at the start of the benchmarks."""
+    fingerprint = get_machine_fingerprint()
+    quota = fingerprint["cgroup_cpu_quota"]
+    string = f"CPU: {fingerprint['model']}, {fingerprint['physical_cores'] or '?'} physical / {fingerprint['logical_cores']} logical cores"
+    string += f", {fingerprint['available_cpus']} available"
+    if quota is not None:
+        string += f", cgroup quota of {quota:g} CPUs"
+    string += f" -> {fingerprint['effective_cpu_count']} effective cores\n"
+    if fingerprint["frequency_governor"] is not None or fingerprint.get("max_frequency_MHz") is not None:
+        string += f"Frequency: governor {fingerprint['frequency_governor']}, max {fingerprint.get('max_frequency_MHz')} MHz\n"
+    if fingerprint["total_memory_MB"] is not None:
+        string += f"Memory: {fingerprint['total_memory_MB'] / 1024:.1f} GB, {max(1, len(fingerprint['numa_nodes']))} NUMA node(s)\n"
+    string += f"Python {fingerprint['python_version']} ({fingerprint['python_implementation']}{', free-threaded' if fingerprint['free_threaded'] else ''})"
+    if fingerprint["numpy_blas"]:
+        string += f", numpy {fingerprint['numpy']} with {fingerprint['numpy_blas'].get('name')} {fingerprint['numpy_blas'].get('version', '')}"
+    return string
@@ -1,19 +1,24 @@
 from argparse import ArgumentParser
 from time import time, perf_counter
 import numpy as np
-import matplotlib.pyplot as plt
-from typing import Callable, List, Any, Tuple
-from tqdm import tqdm
+from typing import Callable, List, Any, Tuple, Dict
 
-from localperf.core.utils import build_plt_figure, get_results_as_string
+from localperf.core.utils import add_plt_curve, get_pyplot, get_results_as_string
 from localperf.core.utils import create_dir, remove_file
+from localperf.core.instrumentation import ResourceMonitor
+from localperf.core.results import record_results
+from localperf.core.isolation import is_isolated, measure_point_isolated
+from localperf.core.config import default_n_warmup, default_min_sample_time, default_target_relative_ci, default_max_time_per_input
+from localperf.core.config import default_min_measures, default_max_measures, default_n_bootstrap, ci_check_growth
 
 def measure_time(
         func : Callable, 
         list_inputs : List[Any], 
         n_measures : int = 10,
         show_progress_bar : bool = False,
-        ) -> Tuple[List[float], List[float]]:
+        setup : Callable = None,
+        monitor : ResourceMonitor = None,
+        ) -> Tuple[List[float], List[float], List[List[float]]]:
     """Measure the mean and std of the time taken by a function, for each input in list_input.
 
     Args:
@@ -21,28 +26,183 @@ def measure_time(
         list_input (List[Any]): the list of inputs for the function func
         n_measures (int, optional): The number of measures that will be made for evaluating the mean and std. Defaults to 10.
         show_progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+        setup (Callable, optional): A function called with the input before each measure, whose time is not measured. Defaults to None.
+        monitor (ResourceMonitor, optional): A monitor recording the resource usage of each measured call, see ResourceMonitor. Defaults to None.
+            Not available if the points are isolated, see localperf.core.isolation.start_isolation.
         
     Returns:
-        Tuple[List[float], List[float]]: The list of mean and std of the time taken by the function func, for each input in list_input.
+        Tuple[List[float], List[float], List[List[float]]]: The list of mean and std of the time taken by the function func, for each input in list_input,
+            and the list of the measured times of each input, to be recorded with the results (see deal_with_results).
+            If the points are isolated, the mean and std of the points skipped, timed out or failed are NaN, and their measured times are empty.
     """
+    if is_isolated() and monitor is not None:
+        raise ValueError("The resource usage can't be monitored when the points are isolated")
     list_mean_time = []
     list_std_time = []
+    list_samples = []
+    list_failed_inputs = []
     for x_input in list_inputs:
+        if is_isolated():
+            # Each point in a new process, with a timeout, see localperf.core.isolation
+            list_time, failed = measure_point_isolated(func, x_input, n_measures, setup, show_progress_bar, list_inputs[:len(list_mean_time)], list_mean_time, list_failed_inputs)
+            if failed:
+                list_failed_inputs.append(x_input)
+            list_samples.append(list_time)
+            list_mean_time.append(np.mean(list_time) if len(list_time) > 0 else np.nan)
+            list_std_time.append(np.std(list_time) if len(list_time) > 0 else np.nan)
+            continue
         list_time = []
         
         if show_progress_bar:
+            from tqdm import tqdm
             iterable = tqdm(range(n_measures), desc=f"Measuring time for {x_input} data")
         else:
             iterable = range(n_measures)
         
         for _ in iterable:
+            if setup is not None:
+                setup(x_input)
+            if monitor is not None:
+                monitor.start(x_input)
             t_start = perf_counter()
             func(x_input)
             t_end = perf_counter()
+            if monitor is not None:
+                monitor.stop(x_input, t_end - t_start)
             list_time.append(t_end - t_start)
+        list_samples.append(list_time)
         list_mean_time.append(np.mean(list_time))
         list_std_time.append(np.std(list_time))
-    return list_mean_time, list_std_time
+    return list_mean_time, list_std_time, list_samples
+
+
+
+def get_time_statistics(list_time : List[float], n_bootstrap : int = default_n_bootstrap) -> Dict[str, float]:
+    """Compute robust statistics of a list of measured times: the median, the median absolute deviation (MAD),
+    the 5th and 95th percentiles, and a 95% bootstrap confidence interval of the median.
+
+    Args:
+        list_time (List[float]): the measured times.
+        n_bootstrap (int, optional): the number of bootstrap resamples used for the confidence interval. Defaults to default_n_bootstrap.
+
+    Returns:
+        Dict[str, float]: the statistics, with keys median_time, mad_time, p5_time, p95_time, ci_low_time and ci_high_time.
+    """
+    array_time = np.array(list_time)
+    median_time = np.median(array_time)
+    resamples = np.random.default_rng(0).choice(array_time, size=(n_bootstrap, len(array_time)), replace=True)
+    ci_low_time, ci_high_time = np.percentile(np.median(resamples, axis=1), [2.5, 97.5])
+    return {
+        "median_time" : median_time,
+        "mad_time" : np.median(np.abs(array_time - median_time)),
+        "p5_time" : np.percentile(array_time, 5),
+        "p95_time" : np.percentile(array_time, 95),
+        "ci_low_time" : ci_low_time,
+        "ci_high_time" : ci_high_time,
+    }
+
+
+def get_n_loops(func : Callable, x_input : Any, min_sample_time : float) -> int:
+    """Find, like timeit's autorange, the number of calls to func(x_input) in the sequence 1, 2, 5, 10, 20, 50, ...
+    so that one sample of that many calls lasts at least min_sample_time seconds."""
+    i = 1
+    while True:
+        for n_loops in (i, 2 * i, 5 * i):
+            t_start = perf_counter()
+            for _ in range(n_loops):
+                func(x_input)
+            if perf_counter() - t_start >= min_sample_time:
+                return n_loops
+        i *= 10
+
+
+def measure_time_adaptive(
+        func : Callable,
+        list_inputs : List[Any],
+        n_warmup : int = default_n_warmup,
+        min_sample_time : float = default_min_sample_time,
+        target_relative_ci : float = default_target_relative_ci,
+        max_time_per_input : float = default_max_time_per_input,
+        min_measures : int = default_min_measures,
+        max_measures : int = default_max_measures,
+        show_progress_bar : bool = False,
+        monitor : ResourceMonitor = None,
+        ) -> Tuple[List[float], List[float], Dict[str, List[float]], List[List[float]]]:
+    """Measure the time taken by a function for each input in list_input, with an adaptive number of measures.
+
+    For each input, the function is first called n_warmup times without being measured. Fast calls are then repeated
+    in a loop so that each sample lasts at least min_sample_time (the sample time being divided by the number of loops),
+    which avoids the noise of the timer resolution. Samples are taken until the 95% bootstrap confidence interval of the median
+    is narrower than target_relative_ci times the median, or until max_time_per_input seconds or max_measures samples are reached.
+    The bootstrap is only recomputed each time the number of samples has grown by ci_check_growth, so that its cost stays small
+    compared to the measures even for fast calls.
+
+    Args:
+        func (Callable): the function we want to measure
+        list_input (List[Any]): the list of inputs for the function func
+        n_warmup (int, optional): The number of unmeasured calls before measuring. Defaults to default_n_warmup.
+        min_sample_time (float, optional): The minimal duration of a sample, in seconds. Defaults to default_min_sample_time.
+        target_relative_ci (float, optional): The width of the confidence interval of the median, relative to the median, at which measures stop. Defaults to default_target_relative_ci.
+        max_time_per_input (float, optional): The time budget for measuring one input, in seconds. Defaults to default_max_time_per_input.
+        min_measures (int, optional): The minimal number of samples. Defaults to default_min_measures.
+        max_measures (int, optional): The maximal number of samples. Defaults to default_max_measures.
+        show_progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+        monitor (ResourceMonitor, optional): A monitor recording the resource usage of each sample (divided by the number of loops), see ResourceMonitor. Defaults to None.
+
+    Returns:
+        Tuple[List[float], List[float], Dict[str, List[float]], List[List[float]]]: The list of mean and std of the time taken by the function func,
+            for each input in list_input, the robust statistics (see get_time_statistics) and number of samples and loops per sample for each input,
+            as extra columns, and the list of the measured times of each input, to be recorded with the results (see deal_with_results).
+    """
+    list_mean_time = []
+    list_std_time = []
+    dict_extra_columns = {}
+    list_samples = []
+    for x_input in list_inputs:
+        for _ in range(n_warmup):
+            func(x_input)
+        n_loops = get_n_loops(func, x_input, min_sample_time)
+
+        list_time = []
+        n_measures_next_check = min_measures
+        t_start_input = perf_counter()
+        progress_bar = None
+        if show_progress_bar:
+            from tqdm import tqdm
+            progress_bar = tqdm(total=max_measures, desc=f"Measuring time for {x_input} data")
+        while len(list_time) < max_measures:
+            if monitor is not None:
+                monitor.start(x_input)
+            t_start = perf_counter()
+            for _ in range(n_loops):
+                func(x_input)
+            t_end = perf_counter()
+            if monitor is not None:
+                monitor.stop(x_input, t_end - t_start, n_calls = n_loops)
+            list_time.append((t_end - t_start) / n_loops)
+            if progress_bar is not None:
+                progress_bar.update(1)
+            if len(list_time) < min_measures:
+                continue
+            if t_end - t_start_input >= max_time_per_input:
+                break
+            if len(list_time) < n_measures_next_check:
+                continue
+            n_measures_next_check = max(len(list_time) + 1, int(len(list_time) * ci_check_growth))
+            statistics = get_time_statistics(list_time)
+            if statistics["ci_high_time"] - statistics["ci_low_time"] <= target_relative_ci * statistics["median_time"]:
+                break
+        if progress_bar is not None:
+            progress_bar.close()
+        list_samples.append(list_time)
+
+        list_mean_time.append(np.mean(list_time))
+        list_std_time.append(np.std(list_time))
+        for name, value in get_time_statistics(list_time).items():
+            dict_extra_columns.setdefault(name, []).append(value)
+        dict_extra_columns.setdefault("n_measures", []).append(len(list_time))
+        dict_extra_columns.setdefault("n_loops", []).append(n_loops)
+    return list_mean_time, list_std_time, dict_extra_columns, list_samples
     
     
 
@@ -51,9 +211,11 @@ def deal_with_results(
         list_mean_time : List[float], 
         list_std_time : List[float], 
         list_speed_up : List[float] = None,
+        dict_extra_columns : Dict[str, List[Any]] = None,
         do_print : bool = False, do_plot : bool = False, 
         log_filename : str = None, image_filename : str = None,
         title : str = None,
+        list_samples : List[List[float]] = None,
         ) -> None:
     """Deals with the results obtained, by (eventually) printing, plotting and saving logs and images.
 
@@ -62,29 +224,34 @@ def deal_with_results(
         list_mean_time (List[float]): the list of mean of the time taken by the function func, for each input in list_input.
         list_std_time (List[float]): the list of std of the time taken by the function func, for each input in list_input.
         list_speed_up (List[float], optional): the list of speed up obtained. Defaults to None.
+        dict_extra_columns (Dict[str, List[Any]], optional): additional columns to report, as a mapping from the column name to the list of values for each input. Defaults to None.
         do_print (bool): whether to print the results on the terminal.
         do_plot (bool): whether to plot the results.
         log_filename (str): filename for the log file.
         image_filename (str): filename for the image file.
+        title (str): the title of the results.
+        list_samples (List[List[float]], optional): the measured times of each input, returned by measure_time or measure_time_adaptive,
+            recorded with the results. Defaults to None (the results are recorded without their measured times, e.g. if they are averaged).
     """
     if list_inputs is None:
         list_inputs = ["-" for _ in list_mean_time]
+    record_results(title, list_inputs, list_mean_time, list_std_time, list_speed_up, dict_extra_columns, list_samples)
         
     if do_print:
-        string = string = get_results_as_string(list_inputs, list_mean_time, list_std_time, list_speed_up = list_speed_up)
+        string = string = get_results_as_string(list_inputs, list_mean_time, list_std_time, list_speed_up = list_speed_up, dict_extra_columns = dict_extra_columns)
         print(string)
     
     if log_filename is not None:
-        string = get_results_as_string(list_inputs, list_mean_time, list_std_time, list_speed_up = list_speed_up)
+        string = get_results_as_string(list_inputs, list_mean_time, list_std_time, list_speed_up = list_speed_up, dict_extra_columns = dict_extra_columns)
         if title is not None:
             string = title + "\n" + string + "\n"
         with open(log_filename, "a") as f:
             f.write(string)
     
-    build_plt_figure(list_inputs, list_mean_time, list_std_time, title)
+    add_plt_curve(list_inputs, list_mean_time, list_std_time, title)
     if image_filename is not None:
-        plt.savefig(image_filename)  
+        get_pyplot().savefig(image_filename)  
     if do_plot:        
-        plt.show()
+        get_pyplot().show()
         
     
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""This module contains the kernels of the memory benchmarks : the STREAM kernels, which measure the memory bandwidth,
+and the pointer chasing, which measures the latency of random accesses for a given working set.
+"""
+
+import os
+import threading
+import numpy as np
+from typing import Dict, Tuple
+
+
+# Bytes moved per element by each STREAM kernel, counted as in the reference STREAM benchmark (8 bytes per float64 read or written)
+stream_bytes_per_element = {
+    "copy" : 16,
+    "scale" : 16,
+    "add" : 24,
+    "triad" : 24,
+}
+stream_scalar = 3.0
+
+# The number of elements and the arrays of each (process, thread), so that they are allocated once per size and not in the measured time.
+# Only the arrays of the current size are kept, so that a sweep over the sizes doesn't keep the arrays of every size in memory
+stream_arrays_cache : Dict[Tuple[int, int], Tuple[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+
+
+def get_stream_arrays(n_elements : int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the arrays a, b and c of n_elements float64 of the current process and thread, allocating and initializing them
+    when the number of elements changes. The arrays of the previous size are freed before the new ones are allocated."""
+    key = (os.getpid(), threading.get_ident())
+    if key not in stream_arrays_cache or stream_arrays_cache[key][0] != n_elements:
+        stream_arrays_cache.pop(key, None)
+        # c is written too (not np.zeros), so that its pages are already mapped at the first measure
+        stream_arrays_cache[key] = (n_elements, (np.full(n_elements, 1.0), np.full(n_elements, 2.0), np.full(n_elements, 0.0)))
+    return stream_arrays_cache[key][1]
+
+
+def prepare_stream_arrays_task(n_elements : int):
+    """Allocate the arrays of n_elements float64 of the worker (see get_stream_arrays), before the measured calls. This is the setup mapped by a parallel backend."""
+    get_stream_arrays(n_elements)
+
+
+def run_stream_kernel(kernel : str, n_elements : int):
+    """Run one STREAM kernel on arrays of n_elements float64.
+
+    copy: c = a, scale: b = q * c, add: c = a + b, triad: a = b + q * c.
+    Numpy computes the triad in two passes (a = q * c, then a += b), so it moves more bytes than the 3 arrays counted by STREAM.
+
+    Args:
+        kernel (str): the name of the kernel, one of stream_bytes_per_element.
+        n_elements (int): the number of elements of each array.
+    """
+    a, b, c = get_stream_arrays(n_elements)
+    if kernel == "copy":
+        np.copyto(c, a)
+    elif kernel == "scale":
+        np.multiply(c, stream_scalar, out=b)
+    elif kernel == "add":
+        np.add(a, b, out=c)
+    elif kernel == "triad":
+        np.multiply(c, stream_scalar, out=a)
+        np.add(a, b, out=a)
+    else:
+        raise ValueError(f"Unknown STREAM kernel: {kernel}. Please choose one of {list(stream_bytes_per_element)}")
+
+
+def run_stream_kernel_task(args : Tuple[str, int]):
+    """Run one STREAM kernel, with the arguments packed in a tuple so that it can be mapped by a parallel backend."""
+    kernel, n_elements = args
+    run_stream_kernel(kernel, n_elements)
+
+
+# Size of a cache line in bytes. The pointer chasing accesses one int64 per cache line.
+cache_line_size = 64
+
+
+def get_pointer_chasing_array(working_set_size : int, seed : int = 0) -> np.ndarray:
+    """Build the array of a random pointer chasing over a working set of working_set_size bytes.
+
+    Each cache line of the working set holds, in its first int64, the index of the next cache line to visit.
+    The visit order is a random permutation forming a single cycle, so that the hardware prefetchers can't predict the next access.
+    """
+    n_elements_per_line = cache_line_size // 8
+    n_lines = max(1, working_set_size // cache_line_size)
+    order = np.random.default_rng(seed).permutation(n_lines) * n_elements_per_line
+    array = np.zeros(n_lines * n_elements_per_line, dtype=np.int64)
+    array[order] = np.roll(order, -1)
+    return array
+
+
+def chase_pointers(array : np.ndarray, n_steps : int) -> int:
+    """Follow n_steps pointers of a pointer chasing array. Each access depends on the previous one, so the time per step is the latency of a memory access,
+    plus the (constant) overhead of the python interpreter."""
+    memory = memoryview(array)
+    i = 0
+    for _ in range(n_steps):
+        i = memory[i]
+    return i
+
+
+def get_cache_sizes() -> Dict[str, int]:
+    """Return the size in bytes of the data caches of the first CPU, read from /sys (linux only). Returns an empty dict if they can't be read."""
+    cache_sizes = {}
+    cache_dir = "/sys/devices/system/cpu/cpu0/cache"
+    if not os.path.isdir(cache_dir):
+        return cache_sizes
+    for index in sorted(os.listdir(cache_dir)):
+        try:
+            with open(f"{cache_dir}/{index}/level") as f:
+                level = f.read().strip()
+            with open(f"{cache_dir}/{index}/type") as f:
+                cache_type = f.read().strip()
+            with open(f"{cache_dir}/{index}/size") as f:
+                size = f.read().strip()
+        except OSError:
+            continue
+        if cache_type == "Instruction":
+            continue
+        multiplier = {"K" : 2**10, "M" : 2**20, "G" : 2**30}.get(size[-1], 1)
+        cache_sizes[f"L{level}"] = int(size.rstrip("KMG")) * multiplier
+    return cache_sizes
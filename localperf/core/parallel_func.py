@@ -1,53 +1,677 @@
-from typing import Callable, List, Any, Tuple
+from abc import ABC, abstractmethod
+from functools import partial, lru_cache
+from importlib.metadata import entry_points
+import inspect
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+from typing import Callable, List, Any, Tuple, Dict, Union, Iterable
 
-from localperf.core.compute import treat_one_data
-from localperf.core.config import supported_libs
+import numpy as np
 
+from localperf.core.compute import get_workload
+from localperf.core.config import default_workload
+from localperf.core.measuring import measure_time
+from localperf.core.instrumentation import ResourceMonitor
+from localperf.core.data_parallel import SharedArray, get_data_array, reduce_chunk, get_peak_private_memory, get_worker_private_memory
+from localperf.core.profiling import profile_call, profile_chunk, merge_worker_profiles, is_profiler_per_thread
+from localperf.core.placement import WorkerPlacement, get_worker_placement, get_placement_cpus, reset_worker_placement, run_pinned
+from localperf.core.thread_limits import thread_limit_methods, run_with_thread_limit, thread_environment, count_worker_threads
 
-def get_parallel_function(lib_name : str, n_process : int) -> Callable[[int], Any]:
-    """Return a function that will compute data in parallel with the given library.
-    
-    Args:
-        lib_name (str): Name of the library to use for parallelization. Available: {supported_libs}
-        n_process (int): Number of process to use for parallelization.
-    
-    Returns:
-        parallel_computing (Callable[[int], None]): Function that will compute data in parallel.
+
+def do_nothing(*args):
+    """Trivial task, used to force the workers of a pool to be started."""
+    return None
+
+
+def shutdown_loky_executor():
+    """Shut down the reusable executor of loky (the one vendored by joblib, or the loky package), if one was started.
+    The executor of joblib is terminated, which also deletes the temporary folders of its memory mapping: otherwise they are only deleted
+    by an atexit hook, which doesn't run in the processes forked for the isolated points (see localperf.core.isolation),
+    and the resource tracker of loky warns about leaked folders."""
+    for module_name in ["joblib.externals.loky.reusable_executor", "loky.reusable_executor"]:
+        executor = getattr(sys.modules.get(module_name), "_executor", None)
+        if executor is None:
+            continue
+        if hasattr(executor, "terminate"):
+            executor.terminate()
+        else:
+            executor.shutdown(wait=True)
+
+
+def treat_one_indexed_data(index : int, treat_one : Callable[[], Any]):
+    """Treat one data with the treatment of a workload (see get_workload). The index is ignored, it only allows to map the treatment over range(n_data).
+    The treatment itself is sent to the workers rather than the name of its workload, so that the workloads registered at runtime
+    are also known by the workers that don't import the module registering them."""
+    return treat_one()
+
+
+def get_n_data_per_task(n_data : int, n_process : int, chunksize : int = None) -> List[int]:
+    """Split n_data data into tasks of chunksize data (the last task possibly smaller).
+    If chunksize is None, n_data is split into at most n_process tasks whose sizes differ by at most one data."""
+    if chunksize is None:
+        return [n_data // n_process + (1 if i < n_data % n_process else 0) for i in range(min(n_process, n_data))]
+    return [min(chunksize, n_data - i) for i in range(0, n_data, chunksize)]
+
+
+class ParallelPool(ABC):
+    """A pool of workers that can be started once and reused for every call to compute.
+
+    A parallel backend is defined by subclassing this class and implementing its abstract methods start, map and close,
+    then registering it with register_backend.
+    Separating the start and close of the pool from the computation allows to measure apart the one-time cost
+    of starting and stopping the workers and the steady-state cost of the computation.
     """
-    
-    if lib_name == "joblib":
+
+    # Whether the workers are threads of the main process (or the main process itself), which matters to profile them (see is_profiler_per_thread)
+    # and to limit their threads (see get_thread_limited_pool)
+    workers_are_threads : bool = False
+
+    def __init__(self, n_process : int):
+        self.n_process = n_process
+        # The profiler and the directory of the worker profiles, when the profile of the workers is captured (see profile_parallel_point)
+        self.worker_profiling : Tuple[str, str] = None
+        # The placement of the workers on the CPUs, when they are pinned (see get_worker_placement)
+        self.worker_placement : WorkerPlacement = None
+        # The number of threads of the BLAS and OpenMP libraries of each worker, when it is limited with threadpoolctl (see limit_worker_threads)
+        self.worker_threads : int = None
+
+    @abstractmethod
+    def start(self):
+        """Start the pool. The workers may be started lazily, see warm_up."""
+
+    @abstractmethod
+    def map(self, func : Callable[[Any], Any], iterable : Iterable[Any], chunksize : int = None) -> List[Any]:
+        """Apply func to each element of iterable in parallel, sending chunksize elements to a worker at once,
+        and return the list of results. If chunksize is None, the default batching of the library is used."""
+
+    def map_unordered(self, func : Callable[[Any], Any], iterable : Iterable[Any], chunksize : int = None) -> List[Any]:
+        """Same as map, but the results are returned in the order in which they are completed, which lets the library schedule the tasks dynamically.
+        Defaults to map for the libraries that have no unordered map."""
+        return self.map(func, iterable, chunksize=chunksize)
+
+    @abstractmethod
+    def close(self):
+        """Stop the workers of the pool and free their resources."""
+
+    def warm_up(self):
+        """Make sure the workers are started and ready to compute (and pinned, with a placement), by giving them a trivial task each."""
+        self.map_tasks(do_nothing, range(self.n_process), chunksize=1)
+
+    def compute(self, n_data : int, chunksize : int = None, workload : str = default_workload, shared_array : SharedArray = None):
+        """Compute n_data data of the given workload in parallel with the workers of the pool, sending them chunksize data at once.
+        If chunksize is None, the default batching of the library is used.
+        If shared_array is given, the data parallel workload is computed instead: the chunks of shared_array are reduced by the workers,
+        and the results of reduce_chunk are returned."""
+        if shared_array is not None:
+            return self.map_tasks(reduce_chunk, shared_array.get_tasks(self.n_process, chunksize), chunksize=1)
+        self.map_tasks(partial(treat_one_indexed_data, treat_one=get_workload(workload)), range(n_data), chunksize=chunksize)
+
+    def map_tasks(self, func : Callable[[Any], Any], iterable : Iterable[Any], chunksize : int = None) -> List[Any]:
+        """Same as map, but the workers are pinned before computing if the pool has a placement, their threads are limited if the pool has
+        a thread limit, and if the profile of the workers is captured,
+        the elements are sent by chunks (one chunk per process if chunksize is None) to profile_chunk, which profiles each chunk in its worker."""
+        if self.worker_placement is not None:
+            func = partial(run_pinned, func, self.worker_placement)
+        if self.worker_threads is not None:
+            func = partial(run_with_thread_limit, func, self.worker_threads)
+        if self.worker_profiling is None or not self.can_profile_workers():
+            return self.map(func, iterable, chunksize=chunksize)
+        profiler, directory = self.worker_profiling
+        list_x = list(iterable)
+        if chunksize is None:
+            chunksize = max(1, -(-len(list_x) // self.n_process))
+        list_chunks = [list_x[i : i + chunksize] for i in range(0, len(list_x), chunksize)]
+        list_results = self.map(partial(profile_chunk, func, profiler=profiler, directory=directory), list_chunks, chunksize=1)
+        return [y for list_y in list_results for y in list_y]
+
+
+    def can_profile_workers(self) -> bool:
+        """Whether each worker can run its own profiler. Worker threads can't with cProfile since python 3.12,
+        but the profiler of the main process then profiles them too."""
+        return not self.workers_are_threads or is_profiler_per_thread(self.worker_profiling[0])
+
+
+class JoblibPool(ParallelPool):
+    """A pool of joblib workers, kept alive by reusing the same Parallel object.
+    At close, the reusable executor of loky is shut down too (see shutdown_loky_executor), so that the workers are really created at each call
+    without a warm pool (joblib alone would keep them alive between calls, which made the cold times of joblib those of a warm pool before).
+    The automatic memory mapping of the large arrays sent to the workers (max_nbytes) is disabled, so that they are pickled as with the other
+    libraries: otherwise the pickle sharing mode of the data parallel workload would share the chunks of more than 1 MB through memory mapped files."""
+
+    def __init__(self, n_process : int):
+        super().__init__(n_process)
+        # With one process, joblib computes in the main process, without workers
+        self.workers_are_threads = n_process == 1
+
+    def start(self):
         try:
             from joblib import Parallel, delayed
         except ImportError:
             raise ImportError("Please install joblib with: pip install joblib")
-        def parallel_computing(n_data: int):
-            """Compute data in parallel with joblib."""
-            Parallel(n_jobs=n_process)(delayed(treat_one_data)() for _ in range(n_data))
-    elif lib_name == "mp":
-        from multiprocessing import Pool
-        def parallel_computing(n_data: int):
-            """Compute data in parallel with multiprocessing."""
-            with Pool(n_process) as p:
-                p.starmap(treat_one_data, [() for _ in range(n_data)])
-    elif lib_name == "ray":
+        self.delayed = delayed
+        self.parallel = Parallel(n_jobs=self.n_process, max_nbytes=None)
+        self.parallel.__enter__()
+
+    def map(self, func, iterable, chunksize = None):
+        self.parallel.batch_size = "auto" if chunksize is None else chunksize
+        return self.parallel(self.delayed(func)(x) for x in iterable)
+
+    def map_unordered(self, func, iterable, chunksize = None):
+        # The unordered output is an option of the Parallel object. A Parallel object made for the call runs on the same reusable workers of loky
+        from joblib import Parallel
+        parallel = Parallel(n_jobs=self.n_process, batch_size=1 if chunksize is None else chunksize, max_nbytes=None, return_as="generator_unordered")
+        return list(parallel(self.delayed(func)(x) for x in iterable))
+
+    def close(self):
+        self.parallel.__exit__(None, None, None)
+        shutdown_loky_executor()
+
+
+class MultiprocessingPool(ParallelPool):
+    """A multiprocessing.Pool, using the given start method (fork, spawn or forkserver), or the default one of the platform if None."""
+
+    def __init__(self, n_process : int, start_method : str = None):
+        super().__init__(n_process)
+        self.start_method = start_method
+
+    def start(self):
+        self.pool = mp.get_context(self.start_method).Pool(self.n_process)
+
+    def map(self, func, iterable, chunksize = None):
+        return self.pool.map(func, iterable, chunksize=chunksize)
+
+    def map_unordered(self, func, iterable, chunksize = None):
+        return list(self.pool.imap_unordered(func, iterable, chunksize=1 if chunksize is None else chunksize))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+class ExecutorPool(ParallelPool):
+    """A concurrent.futures executor. Subclasses define make_executor."""
+
+    @abstractmethod
+    def make_executor(self):
+        """Return the (not yet used) executor of the pool."""
+
+    def start(self):
+        self.executor = self.make_executor()
+
+    def map(self, func, iterable, chunksize = None):
+        return list(self.executor.map(func, iterable, chunksize=1 if chunksize is None else chunksize))
+
+    def map_unordered(self, func, iterable, chunksize = None):
+        from concurrent.futures import as_completed
+        return [future.result() for future in as_completed([self.executor.submit(func, x) for x in iterable])]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class ProcessPoolExecutorPool(ExecutorPool):
+    """A concurrent.futures.ProcessPoolExecutor."""
+
+    def make_executor(self):
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=self.n_process)
+
+
+class ThreadPoolExecutorPool(ExecutorPool):
+    """A concurrent.futures.ThreadPoolExecutor. Pure python computations are serialized by the GIL,
+    except on free-threaded builds of python (3.13+). The chunksize is ignored by threads."""
+
+    workers_are_threads = True
+
+    def make_executor(self):
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(max_workers=self.n_process)
+
+
+class LokyPool(ExecutorPool):
+    """The reusable executor of loky, used directly instead of through joblib. Falls back on the loky vendored by joblib."""
+
+    def make_executor(self):
+        try:
+            from loky import get_reusable_executor
+        except ImportError:
+            try:
+                from joblib.externals.loky import get_reusable_executor
+            except ImportError:
+                raise ImportError("Please install loky with: pip install loky")
+        return get_reusable_executor(max_workers=self.n_process)
+
+
+def treat_n_data(n_data : int, treat_one : Callable[[], Any]):
+    """Treat n_data data sequentially with the treatment of a workload (see get_workload). This is the task sent to the ray workers, one per process."""
+    for _ in range(n_data):
+        treat_one()
+
+
+def map_chunk(func : Callable[[Any], Any], chunk : List[Any]) -> List[Any]:
+    """Apply func to each element of a chunk sequentially. This is the task sent to the ray workers by map."""
+    return [func(x) for x in chunk]
+
+
+class RayWorker:
+    """A ray actor, i.e. a worker process dedicated to the pool, computing the same tasks as the ray remote functions."""
+
+    def treat_n_data(self, n_data : int, treat_one : Callable[[], Any]):
+        treat_n_data(n_data, treat_one)
+
+    def map_chunk(self, func : Callable[[Any], Any], chunk : List[Any]) -> List[Any]:
+        return map_chunk(func, chunk)
+
+
+@lru_cache(maxsize=1)
+def get_ray_remotes() -> Tuple[Any, Any, Any]:
+    """Return the ray remote versions of treat_n_data, map_chunk and RayWorker.
+    They are created once for the whole python process, so that they are not registered again at each call."""
+    import ray
+    return ray.remote(treat_n_data), ray.remote(map_chunk), ray.remote(RayWorker)
+
+
+class RayPool(ParallelPool):
+    """The ray runtime, whose tasks are scheduled on the workers of ray.
+    The runtime is initialized if needed and is left running at close, as it is shared by the whole python process."""
+
+    def start(self):
         try:
             import ray
-            if not ray.is_initialized():
-                ray.init()
         except ImportError:
             raise ImportError("Please install ray with: pip install ray")
-        def parallel_computing(n_data: int):
-            """Compute data in parallel with ray."""
-            @ray.remote
-            def treat_n_data_ray(n_data : int):
-                for _ in range(n_data):
-                    treat_one_data()
-            
-            n_data_per_process_list = [n_data // n_process] * n_process
-            futures = [treat_n_data_ray.remote(n_data = n_data_per_process) 
-                       for n_data_per_process in n_data_per_process_list]
-            ray.get(futures)
-    
-    else:
+        self.ray = ray
+        if not ray.is_initialized():
+            ray.init()
+        self.treat_n_data_ray, self.map_chunk_ray, _ = get_ray_remotes()
+
+    def submit_treat_n_data(self, i_task : int, n_data : int, treat_one : Callable[[], Any]):
+        """Submit the i_task-th task of compute and return its future."""
+        return self.treat_n_data_ray.remote(n_data, treat_one)
+
+    def submit_map_chunk(self, i_task : int, func : Callable[[Any], Any], chunk : List[Any]):
+        """Submit the i_task-th chunk of map and return its future."""
+        return self.map_chunk_ray.remote(func, chunk)
+
+    def map(self, func, iterable, chunksize = None):
+        list_x = list(iterable)
+        if chunksize is None:
+            chunksize = max(1, -(-len(list_x) // self.n_process))
+        futures = [self.submit_map_chunk(i_task, func, list_x[i : i + chunksize]) for i_task, i in enumerate(range(0, len(list_x), chunksize))]
+        return [y for list_y in self.ray.get(futures) for y in list_y]
+
+    def compute(self, n_data, chunksize = None, workload = default_workload, shared_array = None):
+        if shared_array is not None or self.worker_placement is not None:
+            return super().compute(n_data, chunksize=chunksize, workload=workload, shared_array=shared_array)
+        treat_one = get_workload(workload)
+        futures = [self.submit_treat_n_data(i_task, n_data_task, treat_one)
+                   for i_task, n_data_task in enumerate(get_n_data_per_task(n_data, self.n_process, chunksize))]
+        self.ray.get(futures)
+
+    def close(self):
+        pass
+
+
+class RayActorPool(RayPool):
+    """A pool of n_process ray actors, created at start and killed at close. The tasks are given to the actors in turn.
+    Unlike the ray tasks, which are scheduled on any worker of the runtime, each actor is a process dedicated to the pool."""
+
+    def start(self):
+        super().start()
+        _, _, ray_worker = get_ray_remotes()
+        self.actors = [ray_worker.remote() for _ in range(self.n_process)]
+
+    def submit_treat_n_data(self, i_task, n_data, treat_one):
+        return self.actors[i_task % self.n_process].treat_n_data.remote(n_data, treat_one)
+
+    def submit_map_chunk(self, i_task, func, chunk):
+        return self.actors[i_task % self.n_process].map_chunk.remote(func, chunk)
+
+    def close(self):
+        for actor in self.actors:
+            self.ray.kill(actor)
+        self.actors = []
+
+
+parallel_backends : Dict[str, Callable[[int], ParallelPool]] = {}
+has_loaded_entry_points = False
+
+
+def register_backend(name : str, pool_factory : Callable[[int], ParallelPool]):
+    """Register a parallel backend, so that it can be used by its name in every parallel benchmark.
+
+    Backends can also be registered by other packages without modifying localperf, by declaring an entry point
+    in the group "localperf.backends", whose name is the backend name and whose object is the pool factory.
+
+    Args:
+        name (str): the name of the backend, used as lib_name.
+        pool_factory (Callable[[int], ParallelPool]): a function (typically a ParallelPool subclass) taking n_process and returning a not yet started pool.
+    """
+    if inspect.isclass(pool_factory) and inspect.isabstract(pool_factory):
+        raise TypeError(f"The pool of the backend {name} doesn't implement the abstract methods {sorted(pool_factory.__abstractmethods__)} of ParallelPool")
+    parallel_backends[name] = pool_factory
+
+
+def get_supported_libs() -> List[str]:
+    """Return the names of the registered parallel backends, including the ones declared as entry points."""
+    global has_loaded_entry_points
+    if not has_loaded_entry_points:
+        has_loaded_entry_points = True
+        for entry_point in entry_points(group="localperf.backends"):
+            register_backend(entry_point.name, entry_point.load())
+    return list(parallel_backends)
+
+
+register_backend("joblib", JoblibPool)
+register_backend("mp", MultiprocessingPool)
+for start_method in mp.get_all_start_methods():
+    register_backend(f"mp_{start_method}", partial(MultiprocessingPool, start_method=start_method))
+register_backend("process_pool", ProcessPoolExecutorPool)
+register_backend("thread_pool", ThreadPoolExecutorPool)
+register_backend("loky", LokyPool)
+register_backend("ray", RayPool)
+register_backend("ray_actors", RayActorPool)
+
+
+def get_parallel_pool(lib_name : str, n_process : int) -> ParallelPool:
+    """Return a (not yet started) pool of workers for the given library.
+
+    Args:
+        lib_name (str): Name of the library to use for parallelization. Available: see get_supported_libs()
+        n_process (int): Number of process to use for parallelization.
+
+    Returns:
+        ParallelPool: the pool, to be started with pool.start() and closed with pool.close().
+    """
+    supported_libs = get_supported_libs()
+    if lib_name not in supported_libs:
         raise ValueError(f"Unknown lib: {lib_name}. Please choose one of {supported_libs}")
+    return parallel_backends[lib_name](n_process)
+
+
+def get_parallel_function(
+        lib_name : str,
+        n_process : int,
+        placement : str = None,
+        numa_local : bool = False,
+        n_threads : int = None,
+        thread_limit : str = "threadpoolctl",
+        ) -> Callable[[int], Any]:
+    """Return a function that will compute data in parallel with the given library.
+    The workers are created and stopped at each call of the function.
+
+    Args:
+        lib_name (str): Name of the library to use for parallelization. Available: see get_supported_libs()
+        n_process (int): Number of process to use for parallelization.
+        placement (str, optional): The placement policy of the workers on the CPUs, see get_worker_placement. Defaults to None (no pinning).
+        numa_local (bool, optional): Whether to bind the memory of each worker to the NUMA node of its CPU, with a placement policy. Defaults to False.
+        n_threads (int, optional): The number of threads of the BLAS and OpenMP libraries of each worker. Defaults to None (no limit).
+            Can't be given for the libraries whose workers are threads, see get_thread_limited_pool.
+        thread_limit (str, optional): How the threads are limited: with threadpoolctl in each worker (threadpoolctl), or with the thread
+            environment variables set while the workers are started (env), see thread_environment. Defaults to "threadpoolctl".
+
+    Returns:
+        parallel_computing (Callable[[int, int, str, SharedArray], Any]): Function that will compute data in parallel.
+            It takes the number of data and optionally the number of data sent to a worker at once (chunksize), the workload,
+            and the shared array of the data parallel workload (see ParallelPool.compute).
+            If chunksize is None, the default batching of the library is used.
+    """
+    pool = get_thread_limited_pool(lib_name, n_process, n_threads, thread_limit)
+    pool.worker_placement = get_worker_placement(placement, numa_local)
+
+    def parallel_computing(n_data : int, chunksize : int = None, workload : str = default_workload, shared_array : SharedArray = None):
+        """Compute data in parallel, with workers created for this call only."""
+        if pool.worker_placement is not None:
+            reset_worker_placement(pool.worker_placement)
+        with thread_environment(n_threads if thread_limit == "env" else None):
+            pool.start()
+            try:
+                return pool.compute(n_data, chunksize=chunksize, workload=workload, shared_array=shared_array)
+            finally:
+                pool.close()
     return parallel_computing
+
+
+def get_thread_limited_pool(lib_name : str, n_process : int, n_threads : int = None, thread_limit : str = "threadpoolctl") -> ParallelPool:
+    """Return a (not yet started) pool of workers for the given library, whose workers are limited to n_threads threads of the BLAS and OpenMP
+    libraries with threadpoolctl if thread_limit is threadpoolctl (with env, the pool must be started in thread_environment(n_threads)).
+    Raises a ValueError if n_threads is given and the workers are threads of this process (or this process itself): they share its thread pools,
+    whose limit is global and would remain after the call."""
+    if thread_limit not in thread_limit_methods:
+        raise ValueError(f"Unknown thread limit method: {thread_limit}. Please choose one of {thread_limit_methods}")
+    pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+    if n_threads is not None and pool.workers_are_threads:
+        raise ValueError(f"The threads of the workers of {lib_name} with n_process={n_process} can't be limited, since they run in this process and share its thread pools")
+    if thread_limit == "threadpoolctl":
+        pool.worker_threads = n_threads
+    return pool
+
+
+def get_worker_n_threads(lib_name : str, n_process : int, n_threads : int = None, thread_limit : str = "threadpoolctl") -> List[int]:
+    """Start the workers of a library as get_parallel_function does, and return the number of threads of the BLAS and OpenMP libraries
+    read in each of its n_process tasks (see count_worker_threads), i.e. the number of threads actually used by the workers,
+    which is not the requested n_threads when the limit has no effect (e.g. the thread environment variables with forked workers)."""
+    pool = get_thread_limited_pool(lib_name, n_process, n_threads, thread_limit)
+    with thread_environment(n_threads if thread_limit == "env" else None):
+        pool.start()
+        try:
+            return pool.map_tasks(count_worker_threads, range(n_process), chunksize=1)
+        finally:
+            pool.close()
+
+
+def get_idle_private_memory(pool : ParallelPool) -> int:
+    """Return the private memory in bytes of an idle worker of a started pool (the smallest over its workers), or None if it is unknown.
+    The workers forked from this process count the pages they inherited from it (e.g. the array of the data parallel workload)
+    in their private memory, so this baseline is subtracted from the peak private memory of the workers of the data parallel workload."""
+    list_memory = pool.map_tasks(get_worker_private_memory, range(pool.n_process), chunksize=1)
+    return None if None in list_memory else min(list_memory)
+
+
+def measure_parallel_time(
+        lib_name : str,
+        n_process : int,
+        list_n_data : List[int],
+        n_measures : int = 10,
+        show_progress_bar : bool = False,
+        warm_pool : bool = False,
+        chunksize : Union[int, str] = None,
+        workload : str = default_workload,
+        sharing : str = None,
+        monitor : ResourceMonitor = None,
+        placement : str = None,
+        numa_local : bool = False,
+        ) -> Tuple[List[float], List[float], Dict[str, List[Any]]]:
+    """Measure the time taken to compute data in parallel with the given library, for each n_data in list_n_data.
+
+    Args:
+        lib_name (str): Name of the library to use for parallelization.
+        n_process (int): Number of process to use for parallelization.
+        list_n_data (List[int]): the list of n_data to compute.
+        n_measures (int, optional): The number of measures made for each n_data. Defaults to 10.
+        show_progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+        warm_pool (bool, optional): If True, the workers are started once and reused for every measure,
+            and the startup and teardown of the pool are timed separately. Else, the workers are created at each call. Defaults to False.
+        chunksize (Union[int, str], optional): The number of data sent to a worker at once. If "auto", the best chunksize is searched for each n_data
+            with find_best_chunksize. If None, the default batching of the library is used. Defaults to None.
+        workload (str, optional): The name of the workload computed for each data. Defaults to default_workload.
+        sharing (str, optional): If given, the data parallel workload is computed instead of the workload: an array of n_data data
+            is shared with the workers with this sharing mode (see SharedArray) and reduced by chunks. Defaults to None.
+        monitor (ResourceMonitor, optional): A monitor recording the resource usage of each measured call, whose columns are added to the extra columns. Defaults to None.
+        placement (str, optional): The placement policy of the workers on the CPUs, see get_worker_placement. Defaults to None (no pinning).
+        numa_local (bool, optional): Whether to bind the memory of each worker to the NUMA node of its CPU, with a placement policy. Defaults to False.
+
+    Returns:
+        Tuple[List[float], List[float], Dict[str, List[Any]], List[List[float]]]: The list of mean and std of the time taken for each n_data,
+            the extra columns to report (the chunksize used if it was given, the pool startup and teardown times in warm pool mode,
+            and the time to share the array and the peak private memory of the workers above the one of idle workers for the data parallel workload),
+            and the list of the times measured for each n_data.
+    """
+    if sharing == "ray" and not lib_name.startswith("ray"):
+        raise ValueError("The ray sharing mode requires the ray library")
+    dict_extra_columns = {}
+    if warm_pool:
+        pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+        pool.worker_placement = get_worker_placement(placement, numa_local)
+        t_start = perf_counter()
+        pool.start()
+        pool.warm_up()
+        pool_startup_time = perf_counter() - t_start
+        parallel_computing = partial(pool.compute, workload=workload)
+    else:
+        parallel_computing = partial(get_parallel_function(lib_name=lib_name, n_process=n_process, placement=placement, numa_local=numa_local), workload=workload)
+
+    # For the data parallel workload, the array of each n_data is shared before its measures (this is not measured in the time),
+    # and the peak private memory of the workers is recorded at each call, above the one of idle workers started after the array was made
+    dict_shared_array, dict_share_time, dict_peak_memory, dict_idle_memory = {}, {}, {}, {}
+    if sharing is not None:
+        def share_array(n_data : int):
+            if n_data not in dict_shared_array:
+                for shared_array in dict_shared_array.values():
+                    shared_array.close()
+                dict_shared_array.clear()
+                t_start = perf_counter()
+                dict_shared_array[n_data] = SharedArray(get_data_array(n_data), sharing)
+                dict_share_time[n_data] = perf_counter() - t_start
+                if warm_pool:
+                    dict_idle_memory[n_data] = get_idle_private_memory(pool)
+                else:
+                    idle_pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+                    idle_pool.start()
+                    try:
+                        dict_idle_memory[n_data] = get_idle_private_memory(idle_pool)
+                    finally:
+                        idle_pool.close()
+
+        computing_function = parallel_computing
+        def parallel_computing(n_data : int, chunksize : int = None):
+            share_array(n_data)
+            list_results = computing_function(n_data, chunksize = chunksize, shared_array = dict_shared_array[n_data])
+            peak_memory = get_peak_private_memory(list_results, dict_idle_memory[n_data])
+            if peak_memory is not None:
+                dict_peak_memory[n_data] = max(dict_peak_memory.get(n_data, 0), peak_memory)
+
+    try:
+        if chunksize == "auto":
+            dict_chunksize = {n_data : find_best_chunksize(parallel_computing, n_data, n_process, n_measures) for n_data in list_n_data}
+        else:
+            dict_chunksize = {n_data : chunksize for n_data in list_n_data}
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = lambda n_data : parallel_computing(n_data, chunksize = dict_chunksize[n_data]),
+            list_inputs = list_n_data,
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            setup = share_array if sharing is not None else None,
+            monitor = monitor,
+            )
+    finally:
+        for shared_array in dict_shared_array.values():
+            shared_array.close()
+        if warm_pool:
+            t_start = perf_counter()
+            pool.close()
+            pool_teardown_time = perf_counter() - t_start
+
+    if chunksize is not None:
+        dict_extra_columns["chunksize"] = [dict_chunksize[n_data] for n_data in list_n_data]
+    if sharing is not None:
+        dict_extra_columns["share_time"] = [dict_share_time[n_data] for n_data in list_n_data]
+        dict_extra_columns["peak_private_memory_MB"] = [dict_peak_memory[n_data] / 1e6 if n_data in dict_peak_memory else "-" for n_data in list_n_data]
+    if placement is not None and placement != "none":
+        list_cpus = get_placement_cpus(placement)
+        dict_extra_columns["cpus"] = [",".join(str(list_cpus[i % len(list_cpus)]) for i in range(n_process))] * len(list_n_data)
+    if warm_pool:
+        dict_extra_columns["pool_startup_time"] = [pool_startup_time] * len(list_n_data)
+        dict_extra_columns["pool_teardown_time"] = [pool_teardown_time] * len(list_n_data)
+    if monitor is not None:
+        dict_extra_columns.update(monitor.get_extra_columns(list_n_data))
+    return list_mean_time, list_std_time, dict_extra_columns, list_samples
+
+
+def profile_parallel_point(
+        lib_name : str,
+        n_process : int,
+        n_data : int,
+        profiler : str,
+        filename_prefix : str,
+        warm_pool : bool = False,
+        chunksize : int = None,
+        workload : str = default_workload,
+        sharing : str = None,
+        placement : str = None,
+        numa_local : bool = False,
+        ):
+    """Profile one parallel computation of n_data data, in a separate run from the measures, see measure_parallel_time for the arguments.
+    The profile of the main process is saved as filename_prefix.* and the merged profile of the workers as filename_prefix_workers.*
+    (see profile_call). To profile the workers, the data are sent to them by chunks (one chunk per process if chunksize is None).
+    The workers of the ray backend, which does not go through map, are not profiled."""
+    pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+    directory = tempfile.mkdtemp(prefix="localperf_profile_")
+    pool.worker_profiling = (profiler, directory)
+    pool.worker_placement = get_worker_placement(placement, numa_local)
+    shared_array = SharedArray(get_data_array(n_data), sharing) if sharing is not None else None
+
+    def parallel_computing(n_data : int):
+        if not warm_pool:
+            if pool.worker_placement is not None:
+                reset_worker_placement(pool.worker_placement)
+            pool.start()
+        try:
+            pool.compute(n_data, chunksize=chunksize, workload=workload, shared_array=shared_array)
+        finally:
+            if not warm_pool:
+                pool.close()
+
+    try:
+        if warm_pool:
+            pool.start()
+            pool.warm_up()
+        try:
+            profile_call(parallel_computing, n_data, profiler, filename_prefix)
+        finally:
+            if warm_pool:
+                pool.close()
+        if not pool.can_profile_workers():
+            print(f"The worker threads of {lib_name} are profiled with the main process, in {filename_prefix}.*")
+        elif not merge_worker_profiles(directory, profiler, filename_prefix + "_workers"):
+            print(f"WARNING : no profile of the workers of {lib_name} was captured.")
+    finally:
+        if shared_array is not None:
+            shared_array.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def find_best_chunksize(
+        parallel_computing : Callable[[int, int], Any],
+        n_data : int,
+        n_process : int,
+        n_measures : int = 10,
+        ) -> int:
+    """Find the chunksize giving the best throughput for computing n_data data in parallel.
+    The candidates are the powers of 2 up to the chunksize that gives one chunk per process.
+
+    Args:
+        parallel_computing (Callable[[int, int], Any]): the function computing data in parallel, taking n_data and chunksize.
+        n_data (int): the number of data to compute.
+        n_process (int): the number of process used by parallel_computing.
+        n_measures (int, optional): The number of measures made for each candidate chunksize. Defaults to 10.
+
+    Returns:
+        int: the chunksize with the lowest mean time, i.e. the best throughput. None (the default batching of the library)
+            if no candidate was measured, which can happen when the points are isolated (see localperf.core.isolation).
+    """
+    max_chunksize = max(1, -(-n_data // n_process))
+    list_chunksize = [2**k for k in range(max_chunksize.bit_length())]
+    if list_chunksize[-1] != max_chunksize:
+        list_chunksize.append(max_chunksize)
+    list_mean_time, _, _ = measure_time(
+        func = lambda chunksize : parallel_computing(n_data, chunksize = chunksize),
+        list_inputs = list_chunksize,
+        n_measures = n_measures,
+        )
+    if np.all(np.isnan(list_mean_time)):
+        return None
+    return list_chunksize[int(np.nanargmin(list_mean_time))]
@@ -0,0 +1,199 @@
+"""This module contains the placement of the workers of the parallel backends on the CPUs (linux only) : each worker is pinned
+to one CPU with os.sched_setaffinity, chosen with a placement policy from the topology of the machine (cores, SMT siblings and sockets),
+and its memory can be bound to the NUMA node of its CPU. Without pinning, the workers float between the cores, sockets and SMT siblings,
+which makes the parallel scaling stop early and change from run to run on multi-socket machines.
+"""
+
+import atexit
+import ctypes
+import ctypes.util
+import os
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from localperf.core.machine import read_file, parse_cpu_list
+
+
+placement_policies = ["none", "physical_cores", "smt_packed", "socket_spread"]
+# The CPU affinity of the process at its start, before the pinning of any worker
+initial_cpu_affinity = frozenset(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+
+
+class CpuTopology(NamedTuple):
+    """The position of a logical CPU in the topology of the machine."""
+    cpu : int
+    core : int
+    socket : int
+    node : int
+
+
+@lru_cache(maxsize=1)
+def get_cpu_topology() -> List[CpuTopology]:
+    """Return the topology of the CPUs the process may run on (its CPU affinity at its start, see initial_cpu_affinity),
+    read from /sys (linux only) once."""
+    node_dir = "/sys/devices/system/node"
+    dict_node = {}
+    if os.path.isdir(node_dir):
+        for node in os.listdir(node_dir):
+            cpu_list = read_file(f"{node_dir}/{node}/cpulist")
+            if node.startswith("node") and cpu_list is not None:
+                dict_node.update({cpu : int(node[len("node"):]) for cpu in parse_cpu_list(cpu_list)})
+    list_topology = []
+    for cpu in sorted(initial_cpu_affinity):
+        core = read_file(f"/sys/devices/system/cpu/cpu{cpu}/topology/core_id")
+        socket = read_file(f"/sys/devices/system/cpu/cpu{cpu}/topology/physical_package_id")
+        list_topology.append(CpuTopology(cpu, int(core) if core is not None else cpu, int(socket) if socket is not None else 0, dict_node.get(cpu, 0)))
+    return list_topology
+
+
+def get_placement_cpus(policy : str, topology : List[CpuTopology] = None) -> List[int]:
+    """Return the CPUs on which the workers are pinned with a placement policy, in order: the i-th worker is pinned on the i-th CPU
+    (modulo the number of CPUs, if there are more workers than CPUs).
+
+    physical_cores: one worker per physical core (on its first SMT sibling), socket after socket, before using the other SMT siblings.
+    smt_packed: the SMT siblings of a core are filled before moving to the next core, socket after socket.
+    socket_spread: the workers alternate between the sockets, one per physical core before using the other SMT siblings.
+
+    Args:
+        policy (str): the placement policy, among placement_policies except "none".
+        topology (List[CpuTopology], optional): the topology of the CPUs. Defaults to None (the topology of this machine, see get_cpu_topology).
+
+    Returns:
+        List[int]: the CPUs of the workers.
+    """
+    if topology is None:
+        topology = get_cpu_topology()
+    # The rank of each CPU among the SMT siblings of its core
+    dict_siblings, dict_rank = {}, {}
+    for cpu_topology in topology:
+        siblings = dict_siblings.setdefault((cpu_topology.socket, cpu_topology.core), [])
+        dict_rank[cpu_topology.cpu] = len(siblings)
+        siblings.append(cpu_topology.cpu)
+    if policy == "physical_cores":
+        key = lambda cpu_topology : (dict_rank[cpu_topology.cpu], cpu_topology.socket, cpu_topology.core)
+    elif policy == "smt_packed":
+        key = lambda cpu_topology : (cpu_topology.socket, cpu_topology.core, dict_rank[cpu_topology.cpu])
+    elif policy == "socket_spread":
+        # Rank of each core in its socket, so that the i-th cores of every socket come one after the other
+        dict_core_rank = {}
+        for socket, core in sorted(dict_siblings):
+            dict_core_rank[(socket, core)] = sum(other_socket == socket for other_socket, _ in dict_core_rank)
+        key = lambda cpu_topology : (dict_rank[cpu_topology.cpu], dict_core_rank[(cpu_topology.socket, cpu_topology.core)], cpu_topology.socket)
+    else:
+        raise ValueError(f"Unknown placement policy: {policy}. Please choose one of {placement_policies}")
+    return [cpu_topology.cpu for cpu_topology in sorted(topology, key=key)]
+
+
+@lru_cache(maxsize=1)
+def get_libnuma() -> Any:
+    """Return libnuma loaded with ctypes, or None if it is not installed or if NUMA is not available."""
+    path = ctypes.util.find_library("numa")
+    if path is None:
+        return None
+    libnuma = ctypes.CDLL(path)
+    if libnuma.numa_available() < 0:
+        return None
+    libnuma.numa_allocate_nodemask.restype = ctypes.c_void_p
+    libnuma.numa_bitmask_setbit.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+    libnuma.numa_bitmask_setbit.restype = ctypes.c_void_p
+    libnuma.numa_set_membind.argtypes = [ctypes.c_void_p]
+    libnuma.numa_bitmask_free.argtypes = [ctypes.c_void_p]
+    return libnuma
+
+
+def bind_memory_to_node(node : int):
+    """Bind the future memory allocations of the calling process to a NUMA node, with libnuma."""
+    libnuma = get_libnuma()
+    nodemask = libnuma.numa_allocate_nodemask()
+    libnuma.numa_bitmask_setbit(nodemask, node)
+    libnuma.numa_set_membind(nodemask)
+    libnuma.numa_bitmask_free(nodemask)
+
+
+class WorkerPlacement(NamedTuple):
+    """The placement of the workers of a pool: the directory in which the workers claim their slot, the CPU of each slot,
+    whether the memory of the workers is bound to the NUMA node of their CPU, and the process which made the placement,
+    whose main thread is never pinned (see pin_worker)."""
+    directory : str
+    list_cpus : List[int]
+    list_nodes : List[int]
+    numa_local : bool
+    pid : int
+
+
+def get_worker_placement(policy : str, numa_local : bool = False) -> WorkerPlacement:
+    """Return the placement of the workers of a pool with a placement policy, or None if the policy is "none".
+    The directory of the placement is removed at the exit of the python process.
+
+    Args:
+        policy (str): the placement policy, among placement_policies.
+        numa_local (bool, optional): whether to bind the memory of each worker to the NUMA node of its CPU (requires libnuma). Defaults to False.
+
+    Returns:
+        WorkerPlacement: the placement, to be set as the worker_placement of a ParallelPool.
+    """
+    if policy is None or policy == "none":
+        return None
+    if not hasattr(os, "sched_setaffinity"):
+        raise ValueError("Placement policies require os.sched_setaffinity (linux only)")
+    if numa_local and get_libnuma() is None:
+        raise ImportError("NUMA-local memory requires libnuma, please install it with e.g.: apt install libnuma1")
+    topology = get_cpu_topology()
+    dict_node = {cpu_topology.cpu : cpu_topology.node for cpu_topology in topology}
+    list_cpus = get_placement_cpus(policy, topology)
+    directory = tempfile.mkdtemp(prefix="localperf_placement_")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    return WorkerPlacement(directory, list_cpus, [dict_node[cpu] for cpu in list_cpus], numa_local, os.getpid())
+
+
+# The CPU of each worker (process and thread) already pinned, by placement directory, so that a worker is pinned once
+pinned_workers : Dict[Tuple[str, int, int], int] = {}
+
+
+def claim_slot(directory : str) -> int:
+    """Claim the first free slot of a placement directory, by creating its file exclusively, so that each worker gets its own slot
+    whatever the backend and the order in which the workers receive their tasks."""
+    slot = 0
+    while True:
+        try:
+            os.close(os.open(f"{directory}/{slot}", os.O_CREAT | os.O_EXCL))
+            return slot
+        except FileExistsError:
+            slot += 1
+
+
+def reset_worker_placement(placement : WorkerPlacement):
+    """Free the slots of a placement, before starting new workers with it. The workers of the previous pool must have been stopped.
+    The affinity of the calling thread is also restored to the initial one, in case it was pinned."""
+    if os.sched_getaffinity(0) != initial_cpu_affinity:
+        os.sched_setaffinity(0, initial_cpu_affinity)
+    for name in os.listdir(placement.directory):
+        os.remove(f"{placement.directory}/{name}")
+    for key in [key for key in pinned_workers if key[0] == placement.directory]:
+        del pinned_workers[key]
+
+
+def pin_worker(placement : WorkerPlacement) -> int:
+    """Pin the calling worker to the CPU of its slot (and bind its memory to the NUMA node of the CPU if asked), once. Returns the CPU,
+    or None if the tasks run in the main thread of the process which made the placement (e.g. joblib with 1 process), which is not pinned:
+    its affinity would remain after the call, and the later workers forked from it would inherit it."""
+    if os.getpid() == placement.pid and threading.current_thread() is threading.main_thread():
+        return None
+    key = (placement.directory, os.getpid(), threading.get_ident())
+    if key not in pinned_workers:
+        slot = claim_slot(placement.directory) % len(placement.list_cpus)
+        cpu = placement.list_cpus[slot]
+        os.sched_setaffinity(0, {cpu})
+        if placement.numa_local:
+            bind_memory_to_node(placement.list_nodes[slot])
+        pinned_workers[key] = cpu
+    return pinned_workers[key]
+
+
+def run_pinned(func : Callable[[Any], Any], placement : WorkerPlacement, x : Any) -> Any:
+    """Pin the calling worker with the placement, then return func(x). This is the task sent to the workers of a pool with a placement."""
+    pin_worker(placement)
+    return func(x)
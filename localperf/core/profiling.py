@@ -0,0 +1,178 @@
+"""This module contains the profiling of the benchmark points : a deterministic profile with cProfile, or a low-overhead sampling profile,
+of one call of a benchmarked function, saved as .pstats files (cProfile only) and collapsed stacks (one "frame;frame;frame weight" line per stack),
+which can be turned into a flamegraph with e.g. flamegraph.pl or speedscope.
+The profiled calls are separate from the timed measures, so the overhead of profiling does not affect the measured times.
+"""
+
+import cProfile
+import glob
+import os
+import pstats
+import sys
+import threading
+import uuid
+from time import perf_counter
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+from localperf.core.config import default_sampling_interval_profile, min_stack_time_profile
+
+
+profilers = ["cprofile", "sampling"]
+
+
+def get_function_name(filename : str, line : int, name : str) -> str:
+    """Return the name of a function as written in the collapsed stacks."""
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class SamplingProfiler:
+    """A background thread sampling the stack of a thread every sampling_interval seconds.
+    The weight of each collapsed stack is the time elapsed since the previous sample, in microseconds: the sampling thread needs the GIL,
+    so the actual interval between two samples can be longer than sampling_interval (see sys.getswitchinterval)."""
+
+    def __init__(self, sampling_interval : float = default_sampling_interval_profile):
+        self.sampling_interval = sampling_interval
+        self.stacks = Counter()
+
+    def run(self):
+        t_previous = perf_counter()
+        while not self.stop_event.wait(self.sampling_interval):
+            frame = sys._current_frames().get(self.thread_id)
+            t_sample = perf_counter()
+            list_names = []
+            while frame is not None:
+                list_names.append(get_function_name(frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name))
+                frame = frame.f_back
+            if list_names and not self.stop_event.is_set():
+                self.stacks[";".join(reversed(list_names))] += (t_sample - t_previous) * 1e6
+            t_previous = t_sample
+
+    def start(self):
+        """Start sampling the stack of the calling thread."""
+        self.thread_id = threading.get_ident()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def get_collapsed_stacks_from_pstats(stats : pstats.Stats) -> Dict[str, float]:
+    """Return the collapsed stacks of a cProfile profile, whose weights are the times in microseconds.
+
+    cProfile only records the callers of each function, not the full stacks: the own time of each function is split between
+    its callers proportionally to the time spent in the function from each caller, recursively up to the roots (or to a recursive call).
+    """
+    stacks = Counter()
+
+    def add_stacks(func, stack : str, time : float, visited : set):
+        callers = {caller : timing[3] for caller, timing in stats.stats[func][4].items() if caller in stats.stats and caller not in visited}
+        total_time = sum(callers.values())
+        if total_time <= 0 or time < min_stack_time_profile:
+            stacks[stack] += time * 1e6
+            return
+        for caller, caller_time in callers.items():
+            add_stacks(caller, get_function_name(*caller) + ";" + stack, time * caller_time / total_time, visited | {caller})
+
+    for func, (_, _, own_time, _, _) in stats.stats.items():
+        if own_time > 0:
+            add_stacks(func, get_function_name(*func), own_time, {func})
+    return stacks
+
+
+def write_collapsed_stacks(stacks : Dict[str, float], filename : str):
+    """Write collapsed stacks, one "frame;frame;frame weight" line per stack, with weights rounded to integers."""
+    with open(filename, "w") as f:
+        for stack, weight in sorted(stacks.items()):
+            if round(weight) > 0:
+                f.write(f"{stack} {round(weight)}\n")
+
+
+def read_collapsed_stacks(filename : str) -> Counter:
+    """Read collapsed stacks written by write_collapsed_stacks."""
+    stacks = Counter()
+    with open(filename) as f:
+        for line in f:
+            stack, weight = line.rstrip("\n").rsplit(" ", 1)
+            stacks[stack] += int(weight)
+    return stacks
+
+
+def profile_call(func : Callable[[Any], Any], x_input : Any, profiler : str, filename_prefix : str) -> Any:
+    """Call func(x_input) once under a profiler, and save the profile as filename_prefix.pstats (cProfile only) and filename_prefix.collapsed.
+
+    Args:
+        func (Callable[[Any], Any]): the function to profile.
+        x_input (Any): the input of the function.
+        profiler (str): "cprofile" for a deterministic profile of every function call, or "sampling" for a low-overhead sampling of the stack.
+        filename_prefix (str): the path of the profile files, without extension.
+
+    Returns:
+        Any: the result of func(x_input).
+    """
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            result = func(x_input)
+        finally:
+            profile.disable()
+        profile.dump_stats(filename_prefix + ".pstats")
+        write_collapsed_stacks(get_collapsed_stacks_from_pstats(pstats.Stats(profile)), filename_prefix + ".collapsed")
+    elif profiler == "sampling":
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            result = func(x_input)
+        finally:
+            sampler.stop()
+        write_collapsed_stacks(sampler.stacks, filename_prefix + ".collapsed")
+    else:
+        raise ValueError(f"Unknown profiler: {profiler}. Please choose one of {profilers}")
+    return result
+
+
+def is_profiler_per_thread(profiler : str) -> bool:
+    """Whether each thread can run its own profiler. Since python 3.12, cProfile relies on sys.monitoring, which is global to the process:
+    only one cProfile profiler can be active at once, and it profiles every thread."""
+    return profiler != "cprofile" or sys.version_info < (3, 12)
+
+
+def profile_chunk(func : Callable[[Any], Any], chunk : List[Any], profiler : str, directory : str) -> List[Any]:
+    """Apply func to each element of a chunk under a profiler, saving the profile in directory with a unique name.
+    This is the task sent to the workers of a pool when their profile is captured, see merge_worker_profiles."""
+    return profile_call(lambda chunk : [func(x) for x in chunk], chunk, profiler, f"{directory}/worker_{os.getpid()}_{uuid.uuid4().hex}")
+
+
+def merge_worker_profiles(directory : str, profiler : str, filename_prefix : str) -> bool:
+    """Merge the profiles saved by profile_chunk in directory into filename_prefix.pstats (cProfile only) and filename_prefix.collapsed.
+    Returns False if there is no profile to merge (e.g. the workers are threads of a backend that does not use profile_chunk)."""
+    if profiler == "cprofile":
+        list_filenames = glob.glob(directory + "/*.pstats")
+        if not list_filenames:
+            return False
+        stats = pstats.Stats(*list_filenames)
+        stats.dump_stats(filename_prefix + ".pstats")
+        write_collapsed_stacks(get_collapsed_stacks_from_pstats(stats), filename_prefix + ".collapsed")
+    else:
+        list_filenames = glob.glob(directory + "/*.collapsed")
+        if not list_filenames:
+            return False
+        write_collapsed_stacks(sum((read_collapsed_stacks(filename) for filename in list_filenames), Counter()), filename_prefix + ".collapsed")
+    return True
+
+
+def get_profile_filename_prefix(log_dir : str, name : str, x_input : Any) -> str:
+    """Return the path, without extension, of the profile of the point x_input of a benchmark, in log_dir (or the current directory)."""
+    return f"{log_dir if log_dir is not None else '.'}/" + f"profile_{name}_{x_input}".replace(" ", "_")
+
+
+def profile_points(func : Callable[[Any], Any], list_points : List[Any], profiler : str, log_dir : str, name : str):
+    """Profile one call of func for each point of list_points, see profile_call, and save the profiles in log_dir (or the current directory)."""
+    for x_input in list_points:
+        filename_prefix = get_profile_filename_prefix(log_dir, name, x_input)
+        profile_call(func, x_input, profiler, filename_prefix)
+        print(f"Profile of {name} for {x_input} saved to {filename_prefix}.*")
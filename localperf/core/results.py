@@ -0,0 +1,256 @@
+"""This module contains the structured results of the benchmarks : each run of a benchmark gets a run id, and each table of results
+deal_with_results is called with is recorded with the parameters of the run and the raw measured times, in JSON and CSV files
+and in a local SQLite database, so that runs can be compared over time and between machines (see localperf.compare).
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from localperf.core.machine import get_machine_fingerprint
+from localperf.core.config import default_n_bootstrap, default_threshold_compare, default_n_baselines_compare
+
+
+output_formats = ["json", "csv"]
+
+# The current run, started by start_run. Results are only recorded when a run is started
+current_run : Dict[str, Any] = None
+
+
+def to_json_value(value : Any) -> Any:
+    """Convert a value (e.g. a numpy scalar) to a value that can be written in JSON."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(x) for x in value]
+    if isinstance(value, dict):
+        return {str(key) : to_json_value(x) for key, x in value.items()}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def start_run(suite : str, parameters : Dict[str, Any], log_dir : str = None, formats : List[str] = None, db_filename : str = None) -> Dict[str, Any]:
+    """Start recording the results of a run of a benchmark suite. Every call to deal_with_results is then recorded, see record_results.
+
+    Args:
+        suite (str): the name of the benchmark suite, e.g. "cpu".
+        parameters (Dict[str, Any]): the parameters of the run, e.g. the arguments of the command.
+        log_dir (str, optional): the directory of the JSON and CSV files, named <suite>_<run_id>.json and .csv. Defaults to None (the current directory).
+        formats (List[str], optional): the file formats to write, among output_formats. Defaults to None (no file).
+        db_filename (str, optional): the SQLite database in which the results are also stored. Defaults to None (no database).
+
+    Returns:
+        Dict[str, Any]: the run, with its run_id, timestamp, suite, machine, parameters and records.
+    """
+    global current_run
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S_") + uuid.uuid4().hex[:6]
+    directory = log_dir if log_dir is not None else "."
+    current_run = {
+        "run_id" : run_id,
+        "timestamp" : datetime.now(timezone.utc).isoformat(),
+        "suite" : suite,
+        "machine" : get_machine_fingerprint(),
+        "parameters" : to_json_value(parameters),
+        "records" : [],
+    }
+    current_run_files.clear()
+    current_run_files.update({file_format : f"{directory}/{suite}_{run_id}.{file_format}" for file_format in formats or []})
+    current_run_files["db"] = db_filename
+    if db_filename is not None:
+        with connect_db(db_filename) as connection:
+            connection.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)", (run_id, current_run["timestamp"], suite,
+                               json.dumps(current_run["machine"]), json.dumps(current_run["parameters"])))
+    return current_run
+
+
+# The output files of the current run, by format, and its database
+current_run_files : Dict[str, str] = {}
+
+
+def connect_db(db_filename : str) -> sqlite3.Connection:
+    """Open (and create if needed) a results database."""
+    connection = sqlite3.connect(db_filename)
+    connection.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, timestamp TEXT, suite TEXT, machine TEXT, parameters TEXT)")
+    connection.execute("CREATE TABLE IF NOT EXISTS records (run_id TEXT, title TEXT, input TEXT, mean_time REAL, std_time REAL, speed_up REAL, "
+                       "extra_columns TEXT, samples TEXT)")
+    return connection
+
+
+def record_results(
+        title : str,
+        list_inputs : List[Any],
+        list_mean_time : List[float],
+        list_std_time : List[float],
+        list_speed_up : List[float] = None,
+        dict_extra_columns : Dict[str, List[Any]] = None,
+        list_samples : List[List[float]] = None,
+        ):
+    """Record a table of results in the current run, if a run was started with start_run, and write the run in its files and database.
+    Each row of the table is recorded with its input, mean and std time, speed-up, extra columns and measured times (samples)."""
+    if current_run is None:
+        return
+    list_rows = []
+    for i, x_input in enumerate(list_inputs):
+        list_rows.append(to_json_value({
+            "title" : title,
+            "input" : x_input,
+            "mean_time" : list_mean_time[i],
+            "std_time" : list_std_time[i],
+            "speed_up" : list_speed_up[i] if list_speed_up is not None else None,
+            "extra_columns" : {name : list_values[i] for name, list_values in (dict_extra_columns or {}).items()},
+            "samples" : list_samples[i] if list_samples is not None else None,
+        }))
+    current_run["records"] += list_rows
+
+    if "json" in current_run_files:
+        with open(current_run_files["json"], "w") as f:
+            json.dump(current_run, f, indent=1)
+    if "csv" in current_run_files:
+        is_new_file = not os.path.exists(current_run_files["csv"])
+        with open(current_run_files["csv"], "a", newline="") as f:
+            writer = csv.writer(f)
+            if is_new_file:
+                writer.writerow(["run_id", "timestamp", "suite", "title", "input", "mean_time", "std_time", "speed_up", "extra_columns", "samples"])
+            for row in list_rows:
+                writer.writerow([current_run["run_id"], current_run["timestamp"], current_run["suite"], row["title"], row["input"], row["mean_time"], row["std_time"],
+                                 row["speed_up"], json.dumps(row["extra_columns"]), " ".join(str(t) for t in row["samples"] or [])])
+    if current_run_files.get("db") is not None:
+        with connect_db(current_run_files["db"]) as connection:
+            connection.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+                (current_run["run_id"], row["title"], json.dumps(row["input"]), row["mean_time"], row["std_time"], row["speed_up"],
+                 json.dumps(row["extra_columns"]), json.dumps(row["samples"])) for row in list_rows])
+
+
+def get_run_rows(connection : sqlite3.Connection, suite : str = None, hostname : str = None) -> List[Tuple]:
+    """Return the rows of the runs of a results database, from the latest to the oldest, only of the given suite and machine if given."""
+    list_runs = connection.execute("SELECT run_id, timestamp, suite, machine, parameters FROM runs ORDER BY timestamp DESC").fetchall()
+    return [row for row in list_runs if (suite is None or row[2] == suite) and (hostname is None or json.loads(row[3])["hostname"] == hostname)]
+
+
+def load_run_row(connection : sqlite3.Connection, row : Tuple) -> Dict[str, Any]:
+    """Load the run of a row of get_run_rows, with its records."""
+    records = connection.execute("SELECT title, input, mean_time, std_time, speed_up, extra_columns, samples FROM records WHERE run_id = ? ORDER BY rowid", (row[0],)).fetchall()
+    return {
+        "run_id" : row[0],
+        "timestamp" : row[1],
+        "suite" : row[2],
+        "machine" : json.loads(row[3]),
+        "parameters" : json.loads(row[4]),
+        "records" : [{"title" : title, "input" : json.loads(x_input), "mean_time" : mean_time, "std_time" : std_time, "speed_up" : speed_up,
+                      "extra_columns" : json.loads(extra_columns), "samples" : json.loads(samples)}
+                     for title, x_input, mean_time, std_time, speed_up, extra_columns, samples in records],
+    }
+
+
+def load_run(run : str, db_filename : str = None, suite : str = None, hostname : str = None) -> Dict[str, Any]:
+    """Load a recorded run, from its JSON file or from a results database.
+
+    Args:
+        run (str): the JSON file of the run, or its run id in the database, or "latest" / "previous" for the last / second to last run of the database.
+        db_filename (str, optional): the results database. Required unless run is a JSON file. Defaults to None.
+        suite (str, optional): only consider the runs of this suite for "latest" and "previous". Defaults to None (all suites).
+        hostname (str, optional): only consider the runs on this machine for "latest" and "previous". Defaults to None (all machines).
+
+    Returns:
+        Dict[str, Any]: the run, with the same keys as the one returned by start_run.
+    """
+    if run.endswith(".json"):
+        with open(run) as f:
+            return json.load(f)
+    if db_filename is None:
+        raise ValueError(f"Run {run} is not a JSON file, please give the results database with --db")
+    with connect_db(db_filename) as connection:
+        list_runs = get_run_rows(connection, suite, hostname)
+        if run in ["latest", "previous"]:
+            index = 0 if run == "latest" else 1
+            if len(list_runs) <= index:
+                raise ValueError(f"There is no {run} run in {db_filename} (suite={suite}, hostname={hostname})")
+            row = list_runs[index]
+        else:
+            row = next((row for row in list_runs if row[0] == run), None)
+            if row is None:
+                raise ValueError(f"Unknown run {run} in {db_filename}")
+        return load_run_row(connection, row)
+
+
+def load_previous_runs(db_filename : str, n_runs : int = default_n_baselines_compare, suite : str = None, hostname : str = None) -> List[Dict[str, Any]]:
+    """Load the n_runs runs before the latest one of a results database (fewer if there are not enough), from the latest to the oldest,
+    only of the given suite and machine if given. These are the baseline runs of the comparison of the latest run, see compare_runs."""
+    with connect_db(db_filename) as connection:
+        list_runs = get_run_rows(connection, suite, hostname)
+        if len(list_runs) < 2:
+            raise ValueError(f"There is no previous run in {db_filename} (suite={suite}, hostname={hostname})")
+        return [load_run_row(connection, row) for row in list_runs[1 : n_runs + 1]]
+
+
+def get_ratio_of_medians(baseline_samples : List[float], candidate_samples : List[float], n_bootstrap : int = default_n_bootstrap) -> Tuple[float, float, float]:
+    """Return the ratio of the median candidate time over the median baseline time, with a 95% bootstrap confidence interval
+    (both lists of samples are resampled independently)."""
+    baseline_samples, candidate_samples = np.array(baseline_samples), np.array(candidate_samples)
+    rng = np.random.default_rng(0)
+    baseline_medians = np.median(rng.choice(baseline_samples, size=(n_bootstrap, len(baseline_samples)), replace=True), axis=1)
+    candidate_medians = np.median(rng.choice(candidate_samples, size=(n_bootstrap, len(candidate_samples)), replace=True), axis=1)
+    ci_low, ci_high = np.percentile(candidate_medians / baseline_medians, [2.5, 97.5])
+    return np.median(candidate_samples) / np.median(baseline_samples), ci_low, ci_high
+
+
+def compare_runs(baselines : List[Dict[str, Any]], candidate : Dict[str, Any], threshold : float = default_threshold_compare, n_bootstrap : int = default_n_bootstrap) -> List[Dict[str, Any]]:
+    """Compare the measures of a candidate run with the ones of one or several baseline runs, matched by title and input.
+
+    The ratio of the median candidate time over the median time of the pooled baseline runs is computed with a 95% bootstrap confidence
+    interval of the measured times (see get_ratio_of_medians). This interval only accounts for the noise within a run, while the times
+    of a whole run usually move by more (frequency, temperature, other processes, memory layout): the run-to-run noise is estimated
+    as the largest relative gap between the median time of a baseline run and the baseline time.
+    A measure is a regression if the lower bound of the interval is above 1 + the largest of threshold and the run-to-run noise,
+    and an improvement if the upper bound is below 1 - this margin. With a single baseline run, the run-to-run noise is unknown and only threshold is used.
+    Without raw measured times, the mean times are used, without confidence interval.
+
+    Args:
+        baselines (List[Dict[str, Any]]): the baseline runs, see load_run and load_previous_runs.
+        candidate (Dict[str, Any]): the candidate run.
+        threshold (float, optional): the minimal relative change of a regression or an improvement. Defaults to default_threshold_compare.
+        n_bootstrap (int, optional): the number of bootstrap resamples used for the confidence intervals. Defaults to default_n_bootstrap.
+
+    Returns:
+        List[Dict[str, Any]]: for each measure of the candidate in a baseline run, its title, input, baseline and candidate time, ratio, confidence interval,
+        number of baseline runs, run-to-run noise (NaN with a single baseline run) and status ("regression", "improvement" or "unchanged").
+    """
+    list_dict_baseline = [{(record["title"], json.dumps(record["input"])) : record for record in baseline["records"]} for baseline in baselines]
+    list_comparisons = []
+    for record in candidate["records"]:
+        key = (record["title"], json.dumps(record["input"]))
+        list_baseline_records = [dict_baseline[key] for dict_baseline in list_dict_baseline if key in dict_baseline]
+        if len(list_baseline_records) == 0:
+            continue
+        if record["samples"] and all(baseline_record["samples"] for baseline_record in list_baseline_records):
+            pooled_samples = [t for baseline_record in list_baseline_records for t in baseline_record["samples"]]
+            ratio, ci_low, ci_high = get_ratio_of_medians(pooled_samples, record["samples"], n_bootstrap)
+            baseline_time, candidate_time = np.median(pooled_samples), np.median(record["samples"])
+            list_run_times = [np.median(baseline_record["samples"]) for baseline_record in list_baseline_records]
+        else:
+            baseline_time, candidate_time = np.mean([baseline_record["mean_time"] for baseline_record in list_baseline_records]), record["mean_time"]
+            ratio = ci_low = ci_high = candidate_time / baseline_time
+            list_run_times = [baseline_record["mean_time"] for baseline_record in list_baseline_records]
+        run_to_run_noise = np.max(np.abs(np.array(list_run_times) / baseline_time - 1)) if len(list_run_times) > 1 else np.nan
+        margin = max(threshold, run_to_run_noise) if len(list_run_times) > 1 else threshold
+        status = "regression" if ci_low > 1 + margin else "improvement" if ci_high < 1 - margin else "unchanged"
+        list_comparisons.append({
+            "title" : record["title"],
+            "input" : record["input"],
+            "baseline_time" : baseline_time,
+            "candidate_time" : candidate_time,
+            "ratio" : ratio,
+            "ci_low" : ci_low,
+            "ci_high" : ci_high,
+            "n_baselines" : len(list_run_times),
+            "run_to_run_noise" : run_to_run_noise,
+            "status" : status,
+        })
+    return list_comparisons
@@ -0,0 +1,94 @@
+"""This module contains the models of parallel scaling (Amdahl's and Gustafson's laws) and their fit on measured times.
+"""
+
+from itertools import product
+import numpy as np
+from typing import List, Dict
+
+
+def fit_amdahl(
+        list_n_process : List[int],
+        list_n_data : List[int],
+        list_time_sequential : List[float],
+        list_time_parallel : List[float],
+        ) -> Dict[str, float]:
+    """Fit a strong scaling model on parallel times measured for several n_process and n_data.
+
+    The model is Amdahl's law with overheads : T(n_data, p) = t_fixed + t_per_task * n_data + T_seq(n_data) * (s + (1 - s) / p),
+    where T_seq(n_data) is the sequential time, s the serial fraction of the computation, t_fixed the fixed overhead of a call
+    and t_per_task the overhead of dispatching one task. The fit is a linear least squares on (t_fixed, t_per_task, s) of the relative errors,
+    so that the small n_data (short times) weigh as much as the large ones, with s in [0, 1] and non-negative overheads.
+
+    Args:
+        list_n_process (List[int]): the number of process of each measure.
+        list_n_data (List[int]): the number of data of each measure.
+        list_time_sequential (List[float]): the sequential time for the n_data of each measure.
+        list_time_parallel (List[float]): the parallel time of each measure.
+
+    Returns:
+        Dict[str, float]: the fitted serial_fraction, fixed_overhead and per_task_overhead, the max_speed_up 1 / s predicted by Amdahl's law,
+            and the relative_error of the fit (root mean square of the relative residuals).
+    """
+    p = np.array(list_n_process, dtype=float)
+    n = np.array(list_n_data, dtype=float)
+    t_seq = np.array(list_time_sequential, dtype=float)
+    t_par = np.array(list_time_parallel, dtype=float)
+    # The points that were not measured (e.g. skipped or timed out, see localperf.core.isolation) are not fitted
+    is_measured = np.isfinite(t_seq) & np.isfinite(t_par)
+    p, n, t_seq, t_par = p[is_measured], n[is_measured], t_seq[is_measured], t_par[is_measured]
+    if len(t_par) == 0:
+        return {"serial_fraction" : np.nan, "fixed_overhead" : np.nan, "per_task_overhead" : np.nan, "max_speed_up" : np.nan, "relative_error" : np.nan}
+    A = np.stack([np.ones_like(p), n, t_seq * (1 - 1 / p)], axis=1) / t_par[:, None]
+    b = (t_par - t_seq / p) / t_par
+    # Candidate fits: each parameter is either fitted or fixed at one of its bounds (the overheads at 0, s at 0 or 1).
+    # The best candidate within the bounds is the solution of the bounded least squares
+    best_fit = None
+    for list_fixed in product([None, 0.0], [None, 0.0], [None, 0.0, 1.0]):
+        is_free = np.array([value is None for value in list_fixed])
+        params = np.array([0.0 if value is None else value for value in list_fixed])
+        if np.any(is_free):
+            params[is_free], *_ = np.linalg.lstsq(A[:, is_free], b - A[:, ~is_free] @ params[~is_free], rcond=None)
+        fixed_overhead, per_task_overhead, serial_fraction = params
+        if fixed_overhead < 0 or per_task_overhead < 0 or not 0 <= serial_fraction <= 1:
+            continue
+        relative_error = np.sqrt(np.mean((A @ params - b) ** 2))
+        if best_fit is None or relative_error < best_fit["relative_error"]:
+            best_fit = {
+                "serial_fraction" : serial_fraction,
+                "fixed_overhead" : fixed_overhead,
+                "per_task_overhead" : per_task_overhead,
+                "max_speed_up" : 1 / serial_fraction if serial_fraction > 0 else np.inf,
+                "relative_error" : relative_error,
+            }
+    return best_fit
+
+
+def fit_gustafson(
+        list_n_process : List[int],
+        list_scaled_speed_up : List[float],
+        ) -> Dict[str, float]:
+    """Fit Gustafson's law on scaled speed-ups measured with a fixed amount of work per process (weak scaling).
+
+    The model is S(p) = p - s * (p - 1), where s is the serial fraction of the computation. The fit is a least squares on s, clipped to [0, 1].
+
+    Args:
+        list_n_process (List[int]): the number of process of each measure.
+        list_scaled_speed_up (List[float]): the scaled speed-up of each measure, i.e. p * T_seq(n_data_per_process) / T(p * n_data_per_process, p).
+
+    Returns:
+        Dict[str, float]: the fitted serial_fraction.
+    """
+    p = np.array(list_n_process, dtype=float)
+    speed_up = np.array(list_scaled_speed_up, dtype=float)
+    p, speed_up = p[np.isfinite(speed_up)], speed_up[np.isfinite(speed_up)]
+    x = p - 1
+    serial_fraction = np.clip(np.sum(x * (p - speed_up)) / np.sum(x * x), 0, 1) if np.any(x > 0) else np.nan
+    return {"serial_fraction" : serial_fraction}
+
+
+def get_fit_as_string(title : str, dict_fit : Dict[str, float]) -> str:
+    """Generate the fitted parameters of a scaling model as string."""
+    string = title + "\n"
+    for name, value in dict_fit.items():
+        string += f"{name}\t{value:.2e}\n"
+    return string
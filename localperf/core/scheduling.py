@@ -0,0 +1,106 @@
+"""This module contains the heterogeneous task benchmarks : tasks of random sizes, drawn from a distribution, computed by the workers of a pool
+with a given scheduling strategy, and the statistics of the resulting schedule (makespan, idle time of the workers and load imbalance).
+"""
+
+import os
+import threading
+from time import time, perf_counter
+import numpy as np
+from typing import Any, Callable, Dict, List, Tuple
+
+from localperf.core.compute import get_workload
+from localperf.core.config import default_workload, pareto_shape_scheduling
+
+
+task_distributions = ["constant", "uniform", "exponential", "pareto", "bimodal"]
+scheduling_strategies = ["static", "dynamic", "unordered", "default"]
+
+
+def get_task_sizes(n_tasks : int, distribution : str, mean_task_size : float, seed : int = 0) -> List[int]:
+    """Draw the sizes of n_tasks tasks, i.e. their number of data, from a distribution of mean (approximately) mean_task_size.
+    Each task has at least one data.
+
+    constant: every task has mean_task_size data.
+    uniform: uniform between 0 and 2 * mean_task_size.
+    exponential: exponential of mean mean_task_size, i.e. a light tail.
+    pareto: pareto of shape pareto_shape_scheduling scaled to mean mean_task_size, i.e. a heavy tail with a few very long tasks.
+    bimodal: 90% of small tasks of mean_task_size / 2 data, and 10% of large tasks of 5.5 * mean_task_size data.
+    """
+    rng = np.random.default_rng(seed)
+    if distribution == "constant":
+        sizes = np.full(n_tasks, mean_task_size, dtype=float)
+    elif distribution == "uniform":
+        sizes = rng.uniform(0, 2 * mean_task_size, n_tasks)
+    elif distribution == "exponential":
+        sizes = rng.exponential(mean_task_size, n_tasks)
+    elif distribution == "pareto":
+        shape = pareto_shape_scheduling
+        sizes = (rng.pareto(shape, n_tasks) + 1) * mean_task_size * (shape - 1) / shape
+    elif distribution == "bimodal":
+        sizes = np.where(rng.random(n_tasks) < 0.9, mean_task_size / 2, 5.5 * mean_task_size)
+    else:
+        raise ValueError(f"Unknown task distribution: {distribution}. Please choose one of {task_distributions}")
+    return [int(size) for size in np.maximum(1, np.rint(sizes))]
+
+
+def treat_sized_task(task : Tuple[int, Callable[[], Any]]) -> Tuple[Tuple[int, int], float, float]:
+    """Treat a task of n_data data of a workload. This is the task sent to the workers.
+
+    Args:
+        task (Tuple[int, Callable[[], Any]]): the number of data of the task and the treatment of one data of the workload (see get_workload).
+
+    Returns:
+        Tuple[Tuple[int, int], float, float]: the id of the worker (its pid and thread id), and the start and end time of the task
+            (wall clock, shared by all process).
+    """
+    n_data, treat_one = task
+    t_start = time()
+    for _ in range(n_data):
+        treat_one()
+    return (os.getpid(), threading.get_ident()), t_start, time()
+
+
+def run_tasks(pool, list_task_sizes : List[int], strategy : str, workload : str = default_workload) -> Tuple[float, List[Tuple[Tuple[int, int], float, float]]]:
+    """Compute tasks of the given sizes with the workers of a started pool, with a scheduling strategy.
+
+    static: the tasks are split in one chunk per worker, in order, before the computation.
+    dynamic: the tasks are sent one by one to the first available worker.
+    unordered: the same, with the unordered map of the library (e.g. imap_unordered for multiprocessing).
+    default: the default batching of the library (e.g. the auto-batching of joblib).
+
+    Returns:
+        Tuple[float, List[Tuple[Tuple[int, int], float, float]]]: the makespan, i.e. the time taken to compute all the tasks, and the results of treat_sized_task.
+    """
+    # The treatment is sent rather than the name of the workload, which the workers may not know if it was registered at runtime
+    treat_one = get_workload(workload)
+    list_tasks = [(n_data, treat_one) for n_data in list_task_sizes]
+    t_start = perf_counter()
+    if strategy == "static":
+        list_results = pool.map(treat_sized_task, list_tasks, chunksize=max(1, -(-len(list_tasks) // pool.n_process)))
+    elif strategy == "dynamic":
+        list_results = pool.map(treat_sized_task, list_tasks, chunksize=1)
+    elif strategy == "unordered":
+        list_results = pool.map_unordered(treat_sized_task, list_tasks, chunksize=1)
+    elif strategy == "default":
+        list_results = pool.map(treat_sized_task, list_tasks)
+    else:
+        raise ValueError(f"Unknown scheduling strategy: {strategy}. Please choose one of {scheduling_strategies}")
+    return perf_counter() - t_start, list_results
+
+
+def get_schedule_statistics(makespan : float, list_results : List[Tuple[Tuple[int, int], float, float]], n_process : int) -> Dict[str, float]:
+    """Return the statistics of a schedule, from its makespan and the results of treat_sized_task.
+
+    idle_time: the total time the n_process workers spent not computing during the makespan (including the communication overhead).
+    imbalance: the busy time of the busiest worker divided by the mean busy time of the workers, minus 1. 0 is a perfect balance.
+    """
+    dict_busy_time = {}
+    for worker_id, t_start, t_end in list_results:
+        dict_busy_time[worker_id] = dict_busy_time.get(worker_id, 0) + t_end - t_start
+    list_busy_time = list(dict_busy_time.values()) + [0] * max(0, n_process - len(dict_busy_time))
+    total_busy_time = sum(list_busy_time)
+    mean_busy_time = total_busy_time / len(list_busy_time)
+    return {
+        "idle_time" : max(0, n_process * makespan - total_busy_time),
+        "imbalance" : max(list_busy_time) / mean_busy_time - 1 if mean_busy_time > 0 else 0,
+    }
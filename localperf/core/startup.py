@@ -0,0 +1,36 @@
+"""This module contains the measure of the startup time of python commands : the wall time of a command run in a new process,
+and the time spent importing each module, read from the import profile of python (python -X importtime).
+"""
+
+import subprocess
+import sys
+from time import perf_counter
+from typing import Dict, List
+
+
+def measure_command_time(list_command : List[str]) -> float:
+    """Run a command in a new process, without its output, and return its wall time in seconds. Raises an error if the command fails."""
+    t_start = perf_counter()
+    subprocess.run(list_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return perf_counter() - t_start
+
+
+def get_import_times(list_command : List[str]) -> Dict[str, float]:
+    """Run a python command (whose first element is the python executable) with the import profile of python,
+    and return the cumulative import time in seconds of each module imported at the top level (i.e. not by another module),
+    sorted from the slowest to the fastest."""
+    completed = subprocess.run([list_command[0], "-X", "importtime"] + list_command[1:], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    dict_import_times = {}
+    for line in completed.stderr.splitlines():
+        # Lines of the form "import time: self [us] | cumulative | imported package", the nested imports are indented
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            dict_import_times[name.strip()] = int(cumulative) / 1e6
+    return dict(sorted(dict_import_times.items(), key=lambda item : item[1], reverse=True))
+
+
+def get_localperf_command(list_args : List[str]) -> List[str]:
+    """Return the command running localperf with the given arguments, with the current python executable."""
+    return [sys.executable, "-m", "localperf"] + list_args
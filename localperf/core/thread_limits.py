@@ -0,0 +1,78 @@
+"""This module contains the control of the threads of the BLAS and OpenMP libraries in the workers of the parallel backends.
+Numpy (and torch) run their matrix computations on a pool of threads, one per core by default, started by each process:
+with n_process workers, n_process x n_cores threads compete for the cores (oversubscription), and the throughput collapses.
+The number of threads of each worker can be limited with threadpoolctl in the worker, or with the thread environment variables
+(OMP_NUM_THREADS and co) read by the libraries when they are loaded, i.e. when the worker process starts, which has no effect
+on the workers forked from a process which already loaded them. The number of threads actually used by the workers is read in them
+with threadpoolctl (see count_worker_threads).
+"""
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Tuple
+
+from localperf.core.machine import thread_environment_variables
+
+
+thread_limit_methods = ["threadpoolctl", "env"]
+
+
+def is_oversubscribed(n_process : int, n_threads : int, n_cores : int) -> bool:
+    """Whether n_process workers of n_threads threads each run more threads than there are cores."""
+    return n_process * n_threads > n_cores
+
+
+def count_worker_threads(_ : Any = None) -> int:
+    """Return the number of threads of the BLAS and OpenMP libraries of the calling worker (the largest of their thread pools),
+    read with threadpoolctl. This is the task sent to the workers to check their thread limit, its argument is ignored."""
+    try:
+        from threadpoolctl import threadpool_info
+    except ImportError:
+        raise ImportError("Please install threadpoolctl with: pip install threadpoolctl")
+    return max([pool["num_threads"] for pool in threadpool_info()], default=1)
+
+
+# The limit of threads of each worker (process and thread) already limited, so that a worker is limited once
+limited_workers : Dict[Tuple[int, int], int] = {}
+
+
+def limit_worker_threads(n_threads : int):
+    """Limit the threads of the BLAS and OpenMP libraries of the calling worker to n_threads with threadpoolctl
+    (and the intra-op threads of torch, if it is imported), once per worker and limit."""
+    key = (os.getpid(), threading.get_ident())
+    if limited_workers.get(key) != n_threads:
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            raise ImportError("Please install threadpoolctl with: pip install threadpoolctl")
+        threadpool_limits(limits=n_threads)
+        if "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(n_threads)
+        limited_workers[key] = n_threads
+
+
+def run_with_thread_limit(func : Callable[[Any], Any], n_threads : int, x : Any) -> Any:
+    """Limit the threads of the calling worker to n_threads, then return func(x). This is the task sent to the workers of a pool with a thread limit."""
+    limit_worker_threads(n_threads)
+    return func(x)
+
+
+@contextmanager
+def thread_environment(n_threads : int = None):
+    """Set the thread environment variables to n_threads in this context (nothing if n_threads is None), so that the worker processes started
+    in it load their BLAS and OpenMP libraries with n_threads threads. The workers forked from a process which already loaded them are not limited."""
+    if n_threads is None:
+        yield
+        return
+    previous_values = {name : os.environ.get(name) for name in thread_environment_variables}
+    os.environ.update({name : str(n_threads) for name in thread_environment_variables})
+    try:
+        yield
+    finally:
+        for name, value in previous_values.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
@@ -0,0 +1,173 @@
+"""This module contains the kernels of the torch CPU benchmarks : a multi-layer perceptron of configurable width and depth,
+run for inference with the different execution modes of torch (eager, no_grad, inference_mode, TorchScript and torch.compile)
+in fp32 or bf16, and the measure of a configuration of the intra-op and inter-op threads of torch in a fresh process.
+It also contains the small model of the CPU vs GPU benchmark (gpu_torch).
+torch is imported in the functions and the models are defined at their first use, so that the benchmarks can parse their arguments
+(and localperf <command> --help works) without importing torch, which is slow to import and may not be installed.
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+from localperf.core.measuring import measure_time
+from localperf.core.compute import treat_batch
+from localperf.core.config import n_neurons_torch_model
+
+
+torch_modes = ["eager", "no_grad", "inference_mode", "jit_script", "compile"]
+# The name of each data type in torch
+torch_dtypes = {"fp32" : "float32", "bf16" : "bfloat16"}
+
+
+def get_torch_dtype(dtype : str) -> "torch.dtype":
+    """Return the torch data type of a data type of torch_dtypes (fp32 or bf16)."""
+    import torch
+    return getattr(torch, torch_dtypes[dtype])
+
+
+@lru_cache(maxsize=None)
+def get_mlp_class() -> type:
+    """Return the class of the multi-layer perceptron, a torch.nn.Module defined at the first call (see __getattr__)."""
+    import torch
+
+    class MLP(torch.nn.Module):
+        """A multi-layer perceptron of depth linear layers of width neurons, with ReLU activations."""
+
+        def __init__(self, width : int, depth : int):
+            super(MLP, self).__init__()
+            layers = []
+            for _ in range(depth - 1):
+                layers += [torch.nn.Linear(width, width), torch.nn.ReLU()]
+            layers.append(torch.nn.Linear(width, width))
+            self.layers = torch.nn.Sequential(*layers)
+
+        def forward(self, x):
+            return self.layers(x)
+
+    # The class is found by pickle as an attribute of this module
+    MLP.__module__, MLP.__qualname__ = __name__, "MLP"
+    return MLP
+
+
+def get_mlp(width : int, depth : int, dtype : str = "fp32") -> "torch.nn.Module":
+    """Create a MLP on the CPU in evaluation mode, with parameters of the given dtype (fp32 or bf16)."""
+    model = get_mlp_class()(width, depth).to(dtype=get_torch_dtype(dtype))
+    model.eval()
+    return model
+
+
+def get_batch(batch_size : int, width : int, dtype : str = "fp32") -> "torch.Tensor":
+    """Create a random batch of inputs for a MLP of the given width, generated once so that its generation is not measured."""
+    import torch
+    return torch.rand(size=(batch_size, width), dtype=get_torch_dtype(dtype))
+
+
+def get_inference_function(model : "torch.nn.Module", mode : str) -> Callable[["torch.Tensor"], "torch.Tensor"]:
+    """Return a function running the forward pass of a model on a batch with an execution mode of torch.
+
+    eager: plain call of the model, which records the graph of the operations for autograd.
+    no_grad: call under torch.no_grad, without autograd.
+    inference_mode: call under torch.inference_mode, which also skips the version counters of the tensors.
+    jit_script: the model compiled to TorchScript with torch.jit.script and frozen, called under torch.no_grad.
+    compile: the model compiled with torch.compile (the compilation happens at the first call of each batch shape), called under torch.no_grad.
+    """
+    import torch
+    if mode == "eager":
+        return model
+    elif mode == "no_grad":
+        def no_grad_inference(batch : "torch.Tensor") -> "torch.Tensor":
+            with torch.no_grad():
+                return model(batch)
+        return no_grad_inference
+    elif mode == "inference_mode":
+        def inference_mode_inference(batch : "torch.Tensor") -> "torch.Tensor":
+            with torch.inference_mode():
+                return model(batch)
+        return inference_mode_inference
+    elif mode in ["jit_script", "compile"]:
+        compiled_model = torch.jit.freeze(torch.jit.script(model)) if mode == "jit_script" else torch.compile(model)
+        def compiled_inference(batch : "torch.Tensor") -> "torch.Tensor":
+            with torch.no_grad():
+                return compiled_model(batch)
+        return compiled_inference
+    else:
+        raise ValueError(f"Unknown torch mode: {mode}. Please choose one of {torch_modes}")
+
+
+def measure_threads_point(
+        n_threads : int,
+        n_interop_threads : int,
+        width : int,
+        depth : int,
+        mode : str,
+        dtype : str,
+        batch_size : int,
+        n_measures : int,
+        ) -> Tuple[float, float, List[float]]:
+    """Measure the inference time of a batch with n_threads intra-op threads and n_interop_threads inter-op threads.
+    Must be run in a new process (see run_in_new_process), since the number of inter-op threads of torch can only be set once, before any parallel work.
+    Returns the mean and std of the time, and the measured times."""
+    import torch
+    torch.set_num_interop_threads(n_interop_threads)
+    torch.set_num_threads(n_threads)
+    inference = get_inference_function(get_mlp(width, depth, dtype), mode)
+    batch = get_batch(batch_size, width, dtype)
+    inference(batch)
+    list_mean_time, list_std_time, list_samples = measure_time(func=lambda batch_size : inference(batch), list_inputs=[batch_size], n_measures=n_measures)
+    return list_mean_time[0], list_std_time[0], list_samples[0]
+
+
+def get_throughput_columns(list_batch_size, list_mean_time) -> Dict[str, list]:
+    """Return the samples/s and per-batch latency (in ms) extra columns of inference measures."""
+    return {
+        "samples/s" : [batch_size / mean_time for batch_size, mean_time in zip(list_batch_size, list_mean_time)],
+        "latency_ms" : [mean_time * 1e3 for mean_time in list_mean_time],
+    }
+
+
+@lru_cache(maxsize=None)
+def get_net_class() -> type:
+    """Return the class of the model of the CPU vs GPU benchmark, a torch.nn.Module defined at the first call (see __getattr__)."""
+    import torch
+
+    class Net(torch.nn.Module):
+        def __init__(self):
+            super(Net, self).__init__()
+            self.fc1 = torch.nn.Linear(n_neurons_torch_model, n_neurons_torch_model)
+            self.fc2 = torch.nn.Linear(n_neurons_torch_model, n_neurons_torch_model)
+            self.fc3 = torch.nn.Linear(n_neurons_torch_model, n_neurons_torch_model)
+            self.fc4 = torch.nn.Linear(n_neurons_torch_model, 10)
+        def forward(self, x):
+            x = self.fc1(x)
+            x = self.fc2(x)
+            x = self.fc3(x)
+            x = self.fc4(x)
+            return x
+
+    Net.__module__, Net.__qualname__ = __name__, "Net"
+    return Net
+
+def get_model(device : "torch.device"):
+    """Create a model and move it to the device.
+
+    Args:
+        device (torch.device): the device on which the model will be moved.
+
+    Returns:
+        torch.nn.Module: the torch model.
+    """
+    import torch
+    model = get_net_class()()
+    model.to(device = device)
+    batch = torch.rand(size = (2, n_neurons_torch_model), device=device)
+    treat_batch(model=model, batch=batch, device=device)
+    return model
+
+
+# The models are defined lazily, so that they are found as attributes of this module (e.g. by pickle) without importing torch at its import
+def __getattr__(name):
+    if name == "MLP":
+        return get_mlp_class()
+    if name == "Net":
+        return get_net_class()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -1,13 +1,29 @@
 from argparse import ArgumentParser
 from time import time, perf_counter
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import Callable, List, Any, Tuple
 import os
 
 
+# The curves of the results not drawn yet, see get_pyplot
+pending_curves : List[Tuple[List[Any], List[float], List[float], str]] = []
+
+def get_pyplot():
+    """Import matplotlib.pyplot, which is slow to import and is only needed to plot or save a figure, and draw on the figure
+    of the results the curves added since the last call. Returns the matplotlib.pyplot module."""
+    import matplotlib.pyplot as plt
+    for curve in pending_curves:
+        build_plt_figure(*curve)
+    pending_curves.clear()
+    return plt
+
+def add_plt_curve(list_inputs, list_mean_time, list_std_time, title : str):
+    """Add a curve to the figure of the results. It is drawn when the figure is plotted or saved, see get_pyplot."""
+    pending_curves.append((list_inputs, list_mean_time, list_std_time, title))
+
 def build_plt_figure(list_inputs, list_mean_time, list_std_time, title : str):
     """Build the matplotlib figure for the CPU performance."""
+    import matplotlib.pyplot as plt
     plt.figure("Local Python Performance")
     plt.errorbar(list_inputs, list_mean_time, yerr=list_std_time, label=title)
     plt.xlabel("n_data")
@@ -16,16 +32,27 @@ def build_plt_figure(list_inputs, list_mean_time, list_std_time, title : str):
     plt.xscale("log")
     plt.yscale("log")
     
-def get_results_as_string(list_inputs, list_mean_time, list_std_time, list_speed_up = None):
-    """Generate results as string."""
+def get_results_as_string(list_inputs, list_mean_time, list_std_time, list_speed_up = None, dict_extra_columns = None):
+    """Generate results as string. The extra columns, if any, are added after the other columns, with their name as header."""
+    if dict_extra_columns is None:
+        dict_extra_columns = {}
+    extra_header = "".join(f"\t{name}" for name in dict_extra_columns)
     if list_speed_up is not None:
-        string = "n_data\tmean_time\tstd_time\tspeed_up (time taken divided by basic_python_time)\n"
-        for x_input, mean_time, std_time, speed_up in zip(list_inputs, list_mean_time, list_std_time, list_speed_up):
-            string += f"{x_input}\t{mean_time:.2e}\t{std_time:.2e}\t{speed_up}\n"
+        string = "n_data\tmean_time\tstd_time\tspeed_up (time taken divided by basic_python_time)" + extra_header + "\n"
+        for i, (x_input, mean_time, std_time, speed_up) in enumerate(zip(list_inputs, list_mean_time, list_std_time, list_speed_up)):
+            string += f"{x_input}\t{mean_time:.2e}\t{std_time:.2e}\t{speed_up}" + get_extra_columns_as_string(dict_extra_columns, i) + "\n"
     else:
-        string = "n_data\tmean_time\tstd_time\n"
-        for x_input, mean_time, std_time in zip(list_inputs, list_mean_time, list_std_time):
-            string += f"{x_input}\t{mean_time:.2e}\t{std_time:.2e}\n"
+        string = "n_data\tmean_time\tstd_time" + extra_header + "\n"
+        for i, (x_input, mean_time, std_time) in enumerate(zip(list_inputs, list_mean_time, list_std_time)):
+            string += f"{x_input}\t{mean_time:.2e}\t{std_time:.2e}" + get_extra_columns_as_string(dict_extra_columns, i) + "\n"
+    return string
+
+def get_extra_columns_as_string(dict_extra_columns, i):
+    """Generate the i-th row of the extra columns as string. Floats are written in scientific notation."""
+    string = ""
+    for list_values in dict_extra_columns.values():
+        value = list_values[i]
+        string += f"\t{value:.2e}" if isinstance(value, float) else f"\t{value}"
     return string
 
 def create_dir(directory : str = None):
@@ -36,4 +63,21 @@ def create_dir(directory : str = None):
 def remove_file(filename : str = None):
     """Remove a file if it exists."""
     if filename is not None and os.path.exists(filename):
-        os.remove(filename)
\ No newline at end of file
+        os.remove(filename)
+
+def parse_chunksize(value : str):
+    """Parse a chunksize argument, which is either a positive integer or "auto"."""
+    if value == "auto":
+        return value
+    chunksize = int(value)
+    if chunksize < 1:
+        raise ValueError(f"chunksize must be a positive integer or 'auto', got {value}")
+    return chunksize
+
+def run_in_new_process(func : Callable, *args) -> Any:
+    """Run func(*args) in a new spawned python process and return its result. Used for the measures that need a fresh interpreter,
+    e.g. a setting that can only be made once per process or the startup time of a library."""
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as executor:
+        return executor.submit(func, *args).result()
@@ -1,15 +1,21 @@
 
 from argparse import ArgumentParser
+from functools import partial
 from time import time, perf_counter
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import Callable, List, Any, Tuple
 
 # Local imports
-from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.measuring import measure_time, measure_time_adaptive, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.isolation import start_isolation
+from localperf.core.machine import get_machine_summary
+from localperf.core.instrumentation import ResourceMonitor, deal_with_utilization
 from localperf.core.utils import create_dir, remove_file
-from localperf.core.compute import compute
-from localperf.core.config import default_log_n_data_cpu, default_n_measures_cpu            
+from localperf.core.compute import compute, workloads
+from localperf.core.config import default_log_n_data_cpu, default_n_measures_cpu, default_workload
+from localperf.core.config import default_n_warmup, default_target_relative_ci, default_max_time_per_input
 
       
 if __name__ == "__main__":
@@ -19,11 +25,28 @@ if __name__ == "__main__":
     parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
     parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
     parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
     
     parser.add_argument("--log_n_data", type=int, default=default_log_n_data_cpu, help=f"Value (in log scale) of the maximum n_data to be tested. Default: {default_log_n_data_cpu} (10^{default_log_n_data_cpu})")
     parser.add_argument("--n_measures", type=int, default=default_n_measures_cpu, help=f"Number of measures to be made for each n_data. Default: {default_n_measures_cpu}")
-                        
+    parser.add_argument("--workload", type=str, default=default_workload, choices=list(workloads), help=f"Workload computed for each data. Default: {default_workload}")
+    parser.add_argument("--adaptive", action="store_true", default=False, help="Use an adaptive number of measures (with warmup and autoranging), stopping when the confidence interval of the median is narrow enough. --n_measures is then ignored")
+    parser.add_argument("--n_warmup", type=int, default=default_n_warmup, help=f"Number of unmeasured calls before measuring, in adaptive mode. Default: {default_n_warmup}")
+    parser.add_argument("--target_ci", type=float, default=default_target_relative_ci, help=f"Width of the 95%% confidence interval of the median, relative to the median, at which measures stop, in adaptive mode. Default: {default_target_relative_ci}")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Values of n_data to profile. Default: the largest one")
+    parser.add_argument("--instrument", action="store_true", default=False, help="Record the CPU time, context switches and peak memory (unix only) and the utilization of the cores (linux only) of each measured call as extra columns, and the utilization of the cores over time as a figure")
+    parser.add_argument("--time_budget", type=float, default=default_max_time_per_input, help=f"Maximal time spent measuring each n_data in seconds, in adaptive mode. Default: {default_max_time_per_input}")
+    parser.add_argument("--isolate", action="store_true", default=False, help="Measure each point (all the measures of one input) in a new process forked for it (unix only), killed with its workers after --timeout. The points whose time, extrapolated from the previous points, would exceed the timeout or the remaining --run_budget are skipped. Not available with --adaptive or --instrument")
+    parser.add_argument("--timeout", type=float, default=None, help="Maximal time in seconds of the measures of a point, with --isolate. No timeout by default")
+    parser.add_argument("--run_budget", type=float, default=None, help="Maximal time in seconds of the whole run, with --isolate: the points that don't fit in the remaining budget are skipped. No budget by default")
+
     args = parser.parse_args()
+    if args.isolate and any(getattr(args, option) for option in ["adaptive", "instrument"]):
+        parser.error("--isolate can't be used with --adaptive or --instrument")
+    if not args.isolate and (args.timeout is not None or args.run_budget is not None):
+        parser.error("--timeout and --run_budget require --isolate")
 
     image_dir = args.image_dir
     log_dir = args.log_dir
@@ -31,39 +54,68 @@ if __name__ == "__main__":
     log_n_data_max = args.log_n_data
     n_measures = args.n_measures
     show_progress_bar = not args.no_progress
+    workload = args.workload
+    adaptive = args.adaptive
+    monitor = ResourceMonitor() if args.instrument else None
 
 
     # Setup
+    print(get_machine_summary())
     print(
 f"===== CPU measurement ===== \n\
-CPU speed will be measured for data in range [1, 10^{log_n_data_max}] \n\
-and for {n_measures} measures for each data. \n\
+CPU speed will be measured with the {workload} workload for data in range [1, 10^{log_n_data_max}] \n\
+and for {'an adaptive number of' if adaptive else n_measures} measures for each data. \n\
 ===========================\n\
         ")
     list_n_data = [10**k for k in range(0, log_n_data_max + 1)]
     log_filename = log_dir + "/cpu.txt" if log_dir is not None else None
     image_filename = image_dir + "/cpu.png" if image_dir is not None else None
     create_dir(log_dir)
+    start_run("cpu", vars(args), log_dir, args.formats, args.db)
+    if args.isolate:
+        start_isolation(args.timeout, args.run_budget)
     create_dir(image_dir)
     remove_file(log_filename)
     
     
     
     # Measure CPU time
-    list_mean_time, list_std_time = measure_time(
-        func = compute, 
-        list_inputs = list_n_data, 
-        n_measures = n_measures,
-        show_progress_bar = show_progress_bar,
-        )
+    if adaptive:
+        list_mean_time, list_std_time, dict_extra_columns, list_samples = measure_time_adaptive(
+            func = partial(compute, workload=workload),
+            list_inputs = list_n_data,
+            n_warmup = args.n_warmup,
+            target_relative_ci = args.target_ci,
+            max_time_per_input = args.time_budget,
+            show_progress_bar = show_progress_bar,
+            monitor = monitor,
+            )
+    else:
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = partial(compute, workload=workload),
+            list_inputs = list_n_data, 
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            monitor = monitor,
+            )
+        dict_extra_columns = None
+    if args.profile is not None:
+        profile_points(partial(compute, workload=workload), args.profile_points or list_n_data[-1:], args.profile, log_dir, f"cpu_{workload}")
+    if monitor is not None:
+        dict_extra_columns = {**(dict_extra_columns or {}), **monitor.get_extra_columns(list_n_data)}
         
     deal_with_results(
         list_inputs=list_n_data,
         list_mean_time=list_mean_time,
         list_std_time=list_std_time,
+        dict_extra_columns=dict_extra_columns,
         do_print=True,
-        do_plot=do_plot,
+        do_plot=do_plot and monitor is None,
         log_filename=log_dir + "/cpu.txt" if log_dir is not None else None,
         image_filename=image_dir + "/cpu.png" if image_dir is not None else None,
-        title = "CPU",
-    )        
\ No newline at end of file
+        title = f"CPU ({workload})",
+        list_samples=list_samples,
+    )
+
+    if monitor is not None:
+        deal_with_utilization(monitor, do_plot=do_plot, image_filename=image_dir + "/cpu_utilization.png" if image_dir is not None else None)
@@ -0,0 +1,124 @@
+import multiprocessing as mp
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.dataloader_kernels import get_synthetic_dataset, get_data_loader, load_epoch, get_saturation_index
+from localperf.core.compute import workloads
+from localperf.core.utils import create_dir, remove_file
+from localperf.core.config import default_n_measures_dataloader, default_n_items_dataloader, default_log2_item_size_dataloader, default_decode_cost_dataloader
+from localperf.core.config import default_batch_sizes_dataloader, saturation_tolerance_dataloader, default_workload
+
+
+num_cores = get_effective_cpu_count()
+contexts = ["default"] + mp.get_all_start_methods()
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--n_items", type=int, default=default_n_items_dataloader, help=f"Number of items of the dataset, loaded at each measure. Default: {default_n_items_dataloader}")
+    parser.add_argument("--log2_item_size", type=int, default=default_log2_item_size_dataloader, help=f"Value (in log2 scale) of the size in bytes of an item. Default: {default_log2_item_size_dataloader} ({2**default_log2_item_size_dataloader} bytes)")
+    parser.add_argument("--decode_cost", type=int, default=default_decode_cost_dataloader, help=f"Number of data of the workload computed to decode an item. Default: {default_decode_cost_dataloader}")
+    parser.add_argument("--workload", type=str, default=default_workload, choices=list(workloads), help=f"Workload computed to decode an item. Default: {default_workload}")
+    parser.add_argument("--num_workers", type=int, nargs="+", default=None, help=f"Numbers of workers of the DataLoader. Default: 0 (loading in the main process) and the powers of 2 up to your effective number of cores ({num_cores})")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=default_batch_sizes_dataloader, help=f"Batch sizes of the DataLoader. Default: {default_batch_sizes_dataloader}")
+    parser.add_argument("--prefetch_factors", type=int, nargs="+", default=[2], help="Numbers of batches loaded in advance by each worker. Default: 2")
+    parser.add_argument("--persistent_workers", type=str, nargs="+", default=["false", "true"], choices=["false", "true"], help="Whether the workers are kept between the epochs (true) or restarted at each epoch (false). Default: both")
+    parser.add_argument("--contexts", type=str, nargs="+", default=["default"], choices=contexts, help=f"Multiprocessing contexts of the workers. Default: default (the one of the platform). Available: {contexts}")
+    parser.add_argument("--pin_memory", type=str, nargs="+", default=["false"], choices=["false", "true"], help="Whether the batches are copied into pinned memory (for faster copies to the GPU, requires CUDA). Default: false")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Numbers of workers to profile, for each configuration. Default: the largest one")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_dataloader, help=f"Number of epochs measured for each number of workers. Default: {default_n_measures_dataloader}")
+
+    args = parser.parse_args()
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    item_size = 2**args.log2_item_size
+    list_num_workers = args.num_workers if args.num_workers is not None else [0] + [2**k for k in range(0, num_cores.bit_length()) if 2**k <= num_cores]
+    dataset = get_synthetic_dataset(args.n_items, item_size, args.decode_cost, args.workload)
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== Torch DataLoader measurement ===== \n\
+The throughput of a DataLoader will be measured on {args.n_items} items of {item_size} bytes, each costing {args.decode_cost} data of {args.workload} to decode, \n\
+for num_workers in {list_num_workers}, batch sizes {args.batch_sizes}, prefetch factors {args.prefetch_factors}, \n\
+persistent workers {args.persistent_workers}, contexts {args.contexts} and pin memory {args.pin_memory}. \n\
+With {n_measures} epochs measured for each number of workers. \n\
+========================================\n\
+        ")
+    log_filename = log_dir + "/dataloader.txt" if log_dir is not None else None
+    image_filename = image_dir + "/dataloader.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("dataloader", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+
+    # Measure the throughput of an epoch for each number of workers, for each configuration of the DataLoader.
+    # The DataLoaders are created before the measures, and a first epoch is loaded unmeasured.
+    list_configurations = [(batch_size, prefetch_factor, persistent_workers == "true", context, pin_memory == "true")
+                           for batch_size in args.batch_sizes for prefetch_factor in args.prefetch_factors for persistent_workers in args.persistent_workers
+                           for context in args.contexts for pin_memory in args.pin_memory]
+    for batch_size, prefetch_factor, persistent_workers, context, pin_memory in list_configurations:
+        title = f"DataLoader (batch_size={batch_size}, prefetch_factor={prefetch_factor}, persistent_workers={persistent_workers}, context={context}, pin_memory={pin_memory})"
+        print(title)
+        dict_data_loader = {num_workers : get_data_loader(dataset, num_workers, batch_size, prefetch_factor, persistent_workers,
+                                                          None if context == "default" else context, pin_memory)
+                            for num_workers in list_num_workers}
+
+        def load_epoch_with_workers(num_workers : int):
+            load_epoch(dict_data_loader[num_workers])
+
+        for num_workers in list_num_workers:
+            load_epoch_with_workers(num_workers)
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = load_epoch_with_workers,
+            list_inputs = list_num_workers,
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            )
+        if args.profile is not None:
+            profile_points(load_epoch_with_workers, args.profile_points or list_num_workers[-1:], args.profile, log_dir, f"dataloader_{batch_size}_{prefetch_factor}_{persistent_workers}_{context}_{pin_memory}")
+        # Stop the persistent workers
+        dict_data_loader.clear()
+
+        list_throughput = [args.n_items / mean_time for mean_time in list_mean_time]
+        deal_with_results(
+            list_inputs=list_num_workers,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            list_speed_up=[list_mean_time[0] / mean_time for mean_time in list_mean_time],
+            dict_extra_columns={
+                "samples/s" : list_throughput,
+                "MB/s" : [throughput * item_size / 1e6 for throughput in list_throughput],
+                },
+            do_print=True,
+            do_plot=do_plot if (batch_size, prefetch_factor, persistent_workers, context, pin_memory) == list_configurations[-1] else False,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
+        i_saturation = get_saturation_index(list_throughput)
+        string = f"Saturation at num_workers={list_num_workers[i_saturation]} ({list_throughput[i_saturation]:.0f} samples/s, within {saturation_tolerance_dataloader:.0%} of the best throughput)\n"
+        print(string)
+        if log_filename is not None:
+            with open(log_filename, "a") as f:
+                f.write(string + "\n")
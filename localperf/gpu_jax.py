@@ -1,17 +1,17 @@
 
 from argparse import ArgumentParser
-import matplotlib.pyplot as plt
 
-import jax
-import jax.numpy as jnp
 import numpy as np
-import time
+import shutil
+import tempfile
 
 # Local imports
 from localperf.core.measuring import measure_time, deal_with_results
-from localperf.core.utils import create_dir, remove_file
-from localperf.core.compute import compute, treat_batch
-from localperf.core.config import default_n_measures_jax, default_log_n_data_jax, n_data_jax
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.utils import create_dir, remove_file, run_in_new_process, get_pyplot
+from localperf.core.jax_kernels import matmul, get_matrix, compile_function, enable_compilation_cache, measure_startup
+from localperf.core.config import default_n_measures_jax, default_log_n_data_jax, default_n_startups_jax
     
     
 if __name__ == "__main__":
@@ -21,11 +21,20 @@ if __name__ == "__main__":
     parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
     parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
     parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
     
     parser.add_argument("--log_n_data", type=int, default=default_log_n_data_jax, help=f"Value (in log scale) of the maximum n_data to be tested. Default: {default_log_n_data_jax} (10^{default_log_n_data_jax})")
     parser.add_argument("--n_measures", type=int, default=default_n_measures_jax, help=f"Number of measures to be made for each n_data. Default: {default_n_measures_jax}")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Values of n_data to profile. Default: the largest one")
     parser.add_argument("--n_measures_gpu", type=int, default=None, help=f"Number of measures to be made for each n_data for the GPU. Default: same as --n_measures")                    
+    parser.add_argument("--compilation_cache_dir", type=str, default=None, help="Directory of the persistent compilation cache of JAX used for the measures, so that the compilations are loaded from it when it is warm. No persistent cache by default")
+    parser.add_argument("--n_startups", type=int, default=default_n_startups_jax, help=f"Number of startups of a new JAX process measured with a cold and with a warm compilation cache, 0 to skip these measures. Default: {default_n_startups_jax}")
     args = parser.parse_args()
+    # jax is imported once the arguments are parsed, since it is slow to import, and not at the top of the module,
+    # since the spawned processes measuring the startup import this module
+    import jax
 
     image_dir = args.image_dir
     log_dir = args.log_dir
@@ -48,6 +57,7 @@ and for {n_measures} measures for each data. \n\
     log_filename = log_dir + "/gpu_jax.txt" if log_dir is not None else None
     image_filename = image_dir + "/gpu_jax.png" if image_dir is not None else None
     create_dir(log_dir)
+    start_run("gpu_jax", vars(args), log_dir, args.formats, args.db)
     create_dir(image_dir)
     remove_file(log_filename)
     
@@ -58,72 +68,92 @@ and for {n_measures} measures for each data. \n\
     except:
         gpu_is_used = False
         print("No GPU recognized by jax.devices().")
-    
-    # Measure CPU_only jax performance
-    device = "cpu"
-    title = f"JAX with {device}"
-    print(title)
-    
-    key = jax.random.PRNGKey(0)
-    list_keys = jax.random.split(key, len(list_n_data))
-    
-    def cpu_only_jax_compute(x):
-        n_data, key = x
-        X = jax.random.normal(key, (int(jnp.sqrt(n_data)), int(jnp.sqrt(n_data))))
-        return jnp.dot(X, X)
-        
-    list_mean_time_cpu, list_std_time = measure_time(
-        func = cpu_only_jax_compute, 
-        list_inputs = zip(list_n_data, list_keys),
-        n_measures = n_measures,
-        show_progress_bar = show_progress_bar,
-        )
-            
-    deal_with_results(
-        list_inputs=list_n_data,
-        list_mean_time=list_mean_time_cpu,
-        list_std_time=list_std_time,
-        do_print=True,
-        do_plot=not gpu_is_used and do_plot,
-        log_filename=log_filename,
-        image_filename=image_filename,
-        title = title,
-    )        
-    
-    
-    # Measure GPU JAX performance
     if not gpu_is_used:
         print("WARNING : No GPU recognized by jax.devices(). Skipping GPU jax performance measurement.")
-    else:
-        title = f"JAX with GPU"
+    list_platforms = ["cpu", "gpu"] if gpu_is_used else ["cpu"]
+    if args.compilation_cache_dir is not None:
+        enable_compilation_cache(args.compilation_cache_dir)
+    
+    # Measure JAX performance on each platform. The matrices are generated and the function is compiled for each shape before the measures,
+    # the tracing, compilation and first execution are reported apart, and each execution waits for its result (JAX dispatches asynchronously)
+    list_mean_time_cpu = None
+    for platform in list_platforms:
+        device = jax.devices(platform)[0]
+        title = f"JAX with {platform.upper() if platform == 'gpu' else platform}"
         print(title)
         
-        @jax.jit
-        def compute(X):
-            print(f"Compiling for shape {X.shape}")
-            return jnp.dot(X, X)
-            
-        def gpu_jax_compute(n_data : int):
-            key = jax.random.PRNGKey(0)
-            X = jax.random.normal(key, (int(jnp.sqrt(n_data)), int(jnp.sqrt(n_data))))
-            return compute(X)
+        dict_X = {n_data : get_matrix(n_data, device) for n_data in list_n_data}
+        dict_compiled, dict_compile_times = {}, {}
+        for n_data in list_n_data:
+            dict_compiled[n_data], dict_compile_times[n_data] = compile_function(matmul, dict_X[n_data])
         
-        list_mean_time_gpu, list_std_time = measure_time(
-            func = gpu_jax_compute, 
-            list_inputs = list_n_data, 
-            n_measures = n_measures_gpu,
+        def jax_compute(n_data : int):
+            return dict_compiled[n_data](dict_X[n_data]).block_until_ready()
+            
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = jax_compute, 
+            list_inputs = list_n_data,
+            n_measures = n_measures if platform == "cpu" else n_measures_gpu,
             show_progress_bar = show_progress_bar,
             )
-        list_speed_up = [list_mean_time_cpu[i] / list_mean_time_gpu[i] for i in range(len(list_mean_time_cpu))]
+        if args.profile is not None:
+            profile_points(jax_compute, args.profile_points or list_n_data[-1:], args.profile, log_dir, f"jax_{platform}")
+        if platform == "cpu":
+            list_mean_time_cpu = list_mean_time
                 
         deal_with_results(
             list_inputs=list_n_data,
-            list_mean_time=list_mean_time_gpu,
+            list_mean_time=list_mean_time,
             list_std_time=list_std_time,
-            list_speed_up=list_speed_up,
+            list_speed_up=[list_mean_time_cpu[i] / list_mean_time[i] for i in range(len(list_mean_time))] if platform != "cpu" else None,
+            dict_extra_columns={name : [dict_compile_times[n_data][name] for n_data in list_n_data] for name in ["trace_time", "compile_time", "first_run_time"]},
             do_print=True,
-            do_plot=do_plot,
+            do_plot=do_plot and args.n_startups == 0 if platform == list_platforms[-1] else False,
             log_filename=log_filename,
             image_filename=image_filename,
             title = title,
-        )
\ No newline at end of file
+            list_samples=list_samples,
+        )
+    
+    
+    # Measure the startup of a new JAX process until its first result, with a cold persistent compilation cache (empty at each startup)
+    # and with a warm one (filled by a first unmeasured startup). This process already preallocated 75% of the memory of the GPU,
+    # so the new processes allocate it on demand, otherwise they would fail to preallocate their own 75%
+    if args.n_startups > 0:
+        n_data_startup = list_n_data[-1]
+        for platform in list_platforms:
+            title = f"JAX startup with {platform} (n_data={n_data_startup})"
+            print(title)
+            warm_cache_dir = tempfile.mkdtemp(prefix="localperf_jax_cache_")
+            try:
+                run_in_new_process(measure_startup, n_data_startup, platform, warm_cache_dir, False)
+                dict_list_times = {"cold" : [], "warm" : []}
+                for _ in range(args.n_startups):
+                    cold_cache_dir = tempfile.mkdtemp(prefix="localperf_jax_cache_")
+                    try:
+                        dict_list_times["cold"].append(run_in_new_process(measure_startup, n_data_startup, platform, cold_cache_dir, False))
+                    finally:
+                        shutil.rmtree(cold_cache_dir, ignore_errors=True)
+                    dict_list_times["warm"].append(run_in_new_process(measure_startup, n_data_startup, platform, warm_cache_dir, False))
+            finally:
+                shutil.rmtree(warm_cache_dir, ignore_errors=True)
+            
+            list_cache = list(dict_list_times)
+            list_mean_time = [np.mean([times["time_to_first_result"] for times in dict_list_times[cache]]) for cache in list_cache]
+            list_std_time = [np.std([times["time_to_first_result"] for times in dict_list_times[cache]]) for cache in list_cache]
+            deal_with_results(
+                list_inputs=list_cache,
+                list_mean_time=list_mean_time,
+                list_std_time=list_std_time,
+                list_speed_up=[list_mean_time[0] / mean_time for mean_time in list_mean_time],
+                dict_extra_columns={name : [np.mean([times[name] for times in dict_list_times[cache]]) for cache in list_cache]
+                                    for name in ["import_time", "data_time", "trace_time", "compile_time", "first_run_time"]},
+                do_print=True,
+                do_plot=False,
+                log_filename=log_filename,
+                image_filename=None,
+                title = title,
+                list_samples=[[times["time_to_first_result"] for times in dict_list_times[cache]] for cache in list_cache],
+            )
+        if do_plot:
+            get_pyplot().show()
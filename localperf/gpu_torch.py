@@ -1,46 +1,15 @@
 
 from argparse import ArgumentParser
-import matplotlib.pyplot as plt
-
-import torch
 
 # Local imports
 from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
 from localperf.core.utils import create_dir, remove_file
 from localperf.core.compute import compute, treat_batch
 from localperf.core.config import default_log_n_data_torch, default_n_measures_torch, n_neurons_torch_model
 
-class Net(torch.nn.Module):
-    def __init__(self):
-        super(Net, self).__init__()
-        self.fc1 = torch.nn.Linear(n_neurons_torch_model, n_neurons_torch_model)
-        self.fc2 = torch.nn.Linear(n_neurons_torch_model, n_neurons_torch_model)
-        self.fc3 = torch.nn.Linear(n_neurons_torch_model, n_neurons_torch_model)
-        self.fc4 = torch.nn.Linear(n_neurons_torch_model, 10)
-    def forward(self, x):
-        x = self.fc1(x)
-        x = self.fc2(x)
-        x = self.fc3(x)
-        x = self.fc4(x)
-        return x
-
-def get_model(device : torch.device):
-    """Create a model and move it to the device.
 
-    Args:
-        device (torch.device): the device on which the model will be moved.
-
-    Returns:
-        torch.nn.Module: the torch model.
-    """
-    model = Net()
-    model.to(device = device)
-    batch = torch.rand(size = (2, n_neurons_torch_model), device=device)
-    treat_batch(model=model, batch=batch, device=device)
-    return model
-    
-    
-    
 if __name__ == "__main__":
     # Parser
     parser = ArgumentParser()
@@ -48,11 +17,18 @@ if __name__ == "__main__":
     parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
     parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
     parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
     
     parser.add_argument("--log_n_data", type=int, default=default_log_n_data_torch, help=f"Value (in log scale) of the maximum n_data to be tested. Default: {default_log_n_data_torch} (10^{default_log_n_data_torch})")
     parser.add_argument("--n_measures", type=int, default=default_n_measures_torch, help=f"Number of measures to be made for each n_data. Default: {default_n_measures_torch}")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Values of n_data to profile. Default: the largest one")
     parser.add_argument("--n_measures_gpu", type=int, default=None, help=f"Number of measures to be made for each n_data for the GPU. Default: same as --n_measures")                    
     args = parser.parse_args()
+    # torch is imported once the arguments are parsed, since it is slow to import
+    import torch
+    from localperf.core.torch_kernels import get_model
 
     image_dir = args.image_dir
     log_dir = args.log_dir
@@ -75,6 +51,7 @@ and for {n_measures} measures for each data. \n\
     log_filename = log_dir + "/gpu_torch.txt" if log_dir is not None else None
     image_filename = image_dir + "/gpu_torch.png" if image_dir is not None else None
     create_dir(log_dir)
+    start_run("gpu_torch", vars(args), log_dir, args.formats, args.db)
     create_dir(image_dir)
     remove_file(log_filename)
     
@@ -86,17 +63,21 @@ and for {n_measures} measures for each data. \n\
     title = f"Torch with {device}"
     print(title)
     
+    # The batches are generated before the measures, so that their generation is not measured
+    dict_batch = {n_data : torch.rand(size = (n_data, n_neurons_torch_model), device = "cpu") for n_data in list_n_data}
+
     def cpu_only_torch_compute(n_data : int):
-        batch = torch.rand(size = (n_data, n_neurons_torch_model), device = "cpu")
-        treat_batch(model=model, batch=batch, device="cpu")
+        treat_batch(model=model, batch=dict_batch[n_data], device="cpu")
         
         
-    list_mean_time_cpu, list_std_time = measure_time(
+    list_mean_time_cpu, list_std_time, list_samples = measure_time(
         func = cpu_only_torch_compute, 
         list_inputs = list_n_data, 
         n_measures = n_measures,
         show_progress_bar = show_progress_bar,
         )
+    if args.profile is not None:
+        profile_points(cpu_only_torch_compute, args.profile_points or list_n_data[-1:], args.profile, log_dir, "torch_cpu")
             
     deal_with_results(
         list_inputs=list_n_data,
@@ -107,6 +88,7 @@ and for {n_measures} measures for each data. \n\
         log_filename=log_filename,
         image_filename=image_filename,
         title = title,
+        list_samples=list_samples,
     )        
     
     
@@ -119,17 +101,20 @@ and for {n_measures} measures for each data. \n\
         title = f"Torch with {device}"
         print(title)
         
+        dict_batch = {n_data : torch.rand(size = (n_data, n_neurons_torch_model), device = device) for n_data in list_n_data}
+
         def gpu_torch_compute(n_data : int):
-            batch = torch.rand(size = (n_data, n_neurons_torch_model), device = device)
-            treat_batch(model=model, batch=batch, device=device)
+            treat_batch(model=model, batch=dict_batch[n_data], device=device)
             
             
-        list_mean_time_gpu, list_std_time = measure_time(
+        list_mean_time_gpu, list_std_time, list_samples = measure_time(
             func = gpu_torch_compute, 
             list_inputs = list_n_data, 
             n_measures = n_measures_gpu,
             show_progress_bar = show_progress_bar,
             )
+        if args.profile is not None:
+            profile_points(gpu_torch_compute, args.profile_points or list_n_data[-1:], args.profile, log_dir, "torch_gpu")
         list_speed_up = [list_mean_time_cpu[i] / list_mean_time_gpu[i] for i in range(len(list_mean_time_cpu))]
                 
         deal_with_results(
@@ -142,4 +127,5 @@ and for {n_measures} measures for each data. \n\
             log_filename=log_filename,
             image_filename=image_filename,
             title = title,
+            list_samples=list_samples,
         )
\ No newline at end of file
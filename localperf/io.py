@@ -0,0 +1,212 @@
+import shutil
+import tempfile
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_machine_summary
+from localperf.core.parallel_func import get_parallel_pool, get_supported_libs
+from localperf.core.io_kernels import read_methods, access_patterns, create_file, evict_from_page_cache, get_offsets
+from localperf.core.io_kernels import write_blocks, write_block_and_fsync, read_blocks, read_blocks_task
+from localperf.core.utils import create_dir, remove_file
+from localperf.core.config import default_n_measures_io, default_log2_file_size_io, default_log2_min_block_size_io, default_log2_max_block_size_io
+from localperf.core.config import default_n_fsync_io, default_log2_n_process_io
+
+
+def get_throughput_columns(list_n_bytes, list_n_ops, list_mean_time):
+    """Return the MB/s and IOPS extra columns of I/O measures."""
+    return {
+        "MB/s" : [n_bytes / mean_time / 1e6 for n_bytes, mean_time in zip(list_n_bytes, list_mean_time)],
+        "IOPS" : [n_ops / mean_time for n_ops, mean_time in zip(list_n_ops, list_mean_time)],
+    }
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--dir", type=str, default=None, help="Directory in which the temporary test file is created, on the filesystem to measure. Default: the temporary directory of the system")
+    parser.add_argument("--log2_file_size", type=int, default=default_log2_file_size_io, help=f"Value (in log2 scale) of the size in bytes of the test file. Default: {default_log2_file_size_io} ({2**default_log2_file_size_io} bytes)")
+    parser.add_argument("--log2_min_block_size", type=int, default=default_log2_min_block_size_io, help=f"Value (in log2 scale) of the minimum block size in bytes. Default: {default_log2_min_block_size_io} ({2**default_log2_min_block_size_io} bytes)")
+    parser.add_argument("--log2_max_block_size", type=int, default=default_log2_max_block_size_io, help=f"Value (in log2 scale) of the maximum block size in bytes. Default: {default_log2_max_block_size_io} ({2**default_log2_max_block_size_io} bytes)")
+    parser.add_argument("--methods", type=str, nargs="+", default=read_methods, choices=read_methods, help=f"Read methods to measure. Default: {read_methods}")
+    parser.add_argument("--n_fsync", type=int, default=default_n_fsync_io, help=f"Number of synced writes in each measure of the fsync cost. Default: {default_n_fsync_io}")
+    parser.add_argument("--lib", type=str, default="joblib", help=f"Library used for the parallel readers. Default: joblib. Available: {get_supported_libs()}")
+    parser.add_argument("--log2_n_process", type=int, default=default_log2_n_process_io, help=f"Value (in log2 scale) of the maximum number of parallel readers. Default: {default_log2_n_process_io} ({2**default_log2_n_process_io} readers max)")
+    parser.add_argument("--page_cache", action="store_true", default=False, help="Keep the file in the page cache between the read measures. By default, the file is evicted from the page cache before each read measure")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Block sizes in bytes to profile, among the measured ones, for the writes and reads. Default: the largest one")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_io, help=f"Number of measures to be made for each block size. Default: {default_n_measures_io}")
+
+    args = parser.parse_args()
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    file_size = 2**args.log2_file_size
+    lib_name = args.lib
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== I/O measurement ===== \n\
+File I/O throughput will be measured on a file of {file_size} bytes, \n\
+for blocks in range [2^{args.log2_min_block_size}, 2^{args.log2_max_block_size}] bytes, \n\
+with read methods {args.methods} and up to {2**args.log2_n_process} parallel readers with {lib_name}. \n\
+With {n_measures} measures for each block size. \n\
+===========================\n\
+        ")
+    list_block_size = [2**k for k in range(args.log2_min_block_size, args.log2_max_block_size + 1)]
+    list_n_process = [2**k for k in range(0, args.log2_n_process + 1)]
+    log_filename = log_dir + "/io.txt" if log_dir is not None else None
+    image_filename = image_dir + "/io.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("io", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+    test_dir = tempfile.mkdtemp(prefix="localperf_io_", dir=args.dir)
+    path = test_dir + "/data.bin"
+    print(f"Test file: {path}")
+    create_file(path, file_size)
+    evict_before_read = None if args.page_cache else (lambda _ : evict_from_page_cache(path))
+
+    try:
+        # Measure writes
+        for pattern in access_patterns:
+            title = f"Write ({pattern})"
+            print(title)
+            dict_offsets = {block_size : get_offsets(file_size, block_size, pattern) for block_size in list_block_size}
+            list_mean_time, list_std_time, list_samples = measure_time(
+                func = lambda block_size : write_blocks(path, block_size, dict_offsets[block_size]),
+                list_inputs = list_block_size,
+                n_measures = n_measures,
+                show_progress_bar = show_progress_bar,
+                )
+            if args.profile is not None:
+                profile_points(lambda block_size : write_blocks(path, block_size, dict_offsets[block_size]), args.profile_points or list_block_size[-1:], args.profile, log_dir, f"io_write_{pattern}")
+            list_n_ops = [len(dict_offsets[block_size]) for block_size in list_block_size]
+            deal_with_results(
+                list_inputs=list_block_size,
+                list_mean_time=list_mean_time,
+                list_std_time=list_std_time,
+                dict_extra_columns=get_throughput_columns([n_ops * block_size for n_ops, block_size in zip(list_n_ops, list_block_size)], list_n_ops, list_mean_time),
+                do_print=True,
+                do_plot=False,
+                log_filename=log_filename,
+                image_filename=image_filename,
+                title=title,
+                list_samples=list_samples,
+            )
+
+        # Measure the cost of fsync
+        title = f"Write + fsync ({args.n_fsync} synced writes)"
+        print(title)
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = lambda block_size : write_block_and_fsync(path, block_size, args.n_fsync),
+            list_inputs = list_block_size,
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            )
+        dict_extra_columns = get_throughput_columns([args.n_fsync * block_size for block_size in list_block_size], [args.n_fsync] * len(list_block_size), list_mean_time)
+        dict_extra_columns["latency_per_fsync"] = [mean_time / args.n_fsync for mean_time in list_mean_time]
+        deal_with_results(
+            list_inputs=list_block_size,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            dict_extra_columns=dict_extra_columns,
+            do_print=True,
+            do_plot=False,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
+
+        # Measure reads, for each read method and access pattern
+        for method in args.methods:
+            for pattern in access_patterns:
+                title = f"Read with {method} ({pattern})"
+                print(title)
+                dict_offsets = {block_size : get_offsets(file_size, block_size, pattern) for block_size in list_block_size}
+                try:
+                    list_mean_time, list_std_time, list_samples = measure_time(
+                        func = lambda block_size : read_blocks(path, method, block_size, dict_offsets[block_size]),
+                        list_inputs = list_block_size,
+                        n_measures = n_measures,
+                        show_progress_bar = show_progress_bar,
+                        setup = evict_before_read,
+                        )
+                except OSError as e:
+                    print(f"WARNING : {method} is not supported here ({e}). Skipping {method}.")
+                    break
+                if args.profile is not None:
+                    for block_size in args.profile_points or list_block_size[-1:]:
+                        if evict_before_read is not None:
+                            evict_before_read(block_size)
+                        profile_points(lambda block_size : read_blocks(path, method, block_size, dict_offsets[block_size]), [block_size], args.profile, log_dir, f"io_read_{method}_{pattern}")
+                list_n_ops = [len(dict_offsets[block_size]) for block_size in list_block_size]
+                deal_with_results(
+                    list_inputs=list_block_size,
+                    list_mean_time=list_mean_time,
+                    list_std_time=list_std_time,
+                    dict_extra_columns=get_throughput_columns([n_ops * block_size for n_ops, block_size in zip(list_n_ops, list_block_size)], list_n_ops, list_mean_time),
+                    do_print=True,
+                    do_plot=False,
+                    log_filename=log_filename,
+                    image_filename=image_filename,
+                    title=title,
+                    list_samples=list_samples,
+                )
+
+        # Measure parallel readers, each reading its own part of the file with readinto at random offsets
+        block_size = list_block_size[-1]
+        offsets = get_offsets(file_size, block_size, "random")
+        title = f"Parallel random reads with {lib_name} (block size {block_size})"
+        print(title)
+        list_mean_time, list_std_time, list_samples = [], [], []
+        for n_process in list_n_process:
+            list_tasks = [(path, block_size, offsets[i::n_process]) for i in range(n_process)]
+            pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+            pool.start()
+            try:
+                pool.warm_up()
+                list_mean_time_n_process, list_std_time_n_process, list_samples_n_process = measure_time(
+                    func = lambda n_process : pool.map(read_blocks_task, list_tasks, chunksize=1),
+                    list_inputs = [n_process],
+                    n_measures = n_measures,
+                    show_progress_bar = show_progress_bar,
+                    setup = evict_before_read,
+                    )
+            finally:
+                pool.close()
+            list_mean_time += list_mean_time_n_process
+            list_std_time += list_std_time_n_process
+            list_samples += list_samples_n_process
+        list_speed_up = [list_mean_time[0] / mean_time for mean_time in list_mean_time]
+        deal_with_results(
+            list_inputs=list_n_process,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            list_speed_up=list_speed_up,
+            dict_extra_columns=get_throughput_columns([len(offsets) * block_size] * len(list_n_process), [len(offsets)] * len(list_n_process), list_mean_time),
+            do_print=True,
+            do_plot=do_plot,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
+
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
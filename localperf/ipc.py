@@ -0,0 +1,140 @@
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_machine_summary
+from localperf.core.ipc_kernels import ipc_methods, get_payload, get_nbytes, pickle_round_trip, pickle_out_of_band_round_trip
+from localperf.core.ipc_kernels import start_pipe_worker, start_queue_worker, send_through_pipe, send_through_queue, send_through_shared_memory, get_shared_memories
+from localperf.core.ipc_kernels import start_ray, put_get_through_ray, send_through_ray_task
+from localperf.core.utils import create_dir, remove_file, get_pyplot
+from localperf.core.config import default_n_measures_ipc, default_log2_min_payload_size_ipc, default_log2_max_payload_size_ipc, default_log2_step_payload_size_ipc
+from localperf.core.config import joblib_max_nbytes_ipc
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--log2_min_payload_size", type=int, default=default_log2_min_payload_size_ipc, help=f"Value (in log2 scale) of the minimum payload size in bytes. Default: {default_log2_min_payload_size_ipc} ({2**default_log2_min_payload_size_ipc} bytes)")
+    parser.add_argument("--log2_max_payload_size", type=int, default=default_log2_max_payload_size_ipc, help=f"Value (in log2 scale) of the maximum payload size in bytes. Default: {default_log2_max_payload_size_ipc} ({2**default_log2_max_payload_size_ipc} bytes)")
+    parser.add_argument("--log2_step", type=int, default=default_log2_step_payload_size_ipc, help=f"Step (in log2 scale) between two payload sizes. Default: {default_log2_step_payload_size_ipc}")
+    parser.add_argument("--methods", type=str, nargs="+", default=ipc_methods, choices=ipc_methods, help=f"Transfer methods to measure. Default: {ipc_methods}")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Payload sizes in bytes to profile, among the measured ones. Default: the largest one")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_ipc, help=f"Number of measures to be made for each payload size. Default: {default_n_measures_ipc}")
+
+    args = parser.parse_args()
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    methods = args.methods
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== IPC and serialization measurement ===== \n\
+The cost of moving numpy arrays between process will be measured for payloads in range [2^{args.log2_min_payload_size}, 2^{args.log2_max_payload_size}] bytes, \n\
+with the methods {methods}. \n\
+With {n_measures} measures for each payload size. \n\
+=============================================\n\
+        ")
+    list_payload_size = [2**k for k in range(args.log2_min_payload_size, args.log2_max_payload_size + 1, args.log2_step)]
+    dict_payload = {payload_size : get_payload(payload_size) for payload_size in list_payload_size}
+    log_filename = log_dir + "/ipc.txt" if log_dir is not None else None
+    image_filename = image_dir + "/ipc.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("ipc", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+    for method in methods:
+        title = f"IPC with {method}"
+        print(title)
+
+        # Build the function sending a payload of a given size, and the function freeing its resources.
+        # The methods whose library is not installed are skipped
+        close = lambda : None
+        try:
+            if method == "pickle4":
+                transfer = lambda payload_size : pickle_round_trip(dict_payload[payload_size], protocol=4)
+            elif method == "pickle5_oob":
+                transfer = lambda payload_size : pickle_out_of_band_round_trip(dict_payload[payload_size])
+            elif method == "pipe":
+                conn, process = start_pipe_worker()
+                transfer = lambda payload_size : send_through_pipe(conn, dict_payload[payload_size])
+                close = lambda : (conn.send(None), process.join())
+            elif method == "queue":
+                queue_in, queue_out, process = start_queue_worker()
+                transfer = lambda payload_size : send_through_queue(queue_in, queue_out, dict_payload[payload_size])
+                close = lambda : (queue_in.put(None), process.join())
+            elif method == "shared_memory":
+                conn, process = start_pipe_worker()
+                dict_shm = get_shared_memories(list_payload_size)
+                transfer = lambda payload_size : send_through_shared_memory(conn, dict_shm[payload_size], dict_payload[payload_size])
+                def close():
+                    conn.send(None)
+                    process.join()
+                    for shm in dict_shm.values():
+                        shm.close()
+                        shm.unlink()
+            elif method in ("joblib_pickle", "joblib_memmap"):
+                try:
+                    from joblib import Parallel, delayed
+                except ImportError:
+                    raise ImportError("Please install joblib with: pip install joblib")
+                # joblib memmaps the arrays larger than max_nbytes to share them with the workers instead of pickling them. This needs at least 2 workers.
+                parallel = Parallel(n_jobs=2, max_nbytes=joblib_max_nbytes_ipc if method == "joblib_memmap" else None)
+                parallel.__enter__()
+                transfer = lambda payload_size : parallel(delayed(get_nbytes)(dict_payload[payload_size]) for _ in range(1))
+                close = lambda : parallel.__exit__(None, None, None)
+            elif method == "ray_put_get":
+                ray = start_ray()
+                transfer = lambda payload_size : put_get_through_ray(ray, dict_payload[payload_size])
+            elif method == "ray_task":
+                ray = start_ray()
+                get_nbytes_ray = ray.remote(get_nbytes)
+                transfer = lambda payload_size : send_through_ray_task(ray, get_nbytes_ray, dict_payload[payload_size])
+        except ImportError as e:
+            print(f"WARNING : {e}. Skipping {method}.")
+            continue
+
+        try:
+            transfer(list_payload_size[0])
+            list_mean_time, list_std_time, list_samples = measure_time(
+                func = transfer,
+                list_inputs = list_payload_size,
+                n_measures = n_measures,
+                show_progress_bar = show_progress_bar,
+                )
+            if args.profile is not None:
+                profile_points(transfer, args.profile_points or list_payload_size[-1:], args.profile, log_dir, f"ipc_{method}")
+        finally:
+            close()
+
+        deal_with_results(
+            list_inputs=list_payload_size,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            dict_extra_columns={"GB/s" : [payload_size / mean_time / 1e9 for payload_size, mean_time in zip(list_payload_size, list_mean_time)]},
+            do_print=True,
+            do_plot=False,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
+
+    if do_plot:
+        get_pyplot().show()
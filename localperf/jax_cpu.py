@@ -0,0 +1,156 @@
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.scaling import fit_amdahl, get_fit_as_string
+from localperf.core.jax_kernels import jax_batch_methods, jax_parallel_methods, get_batch_of_matrices, get_batched_matmul, measure_devices_point
+from localperf.core.utils import create_dir, remove_file, run_in_new_process
+from localperf.core.config import default_n_measures_jax_cpu, default_log_n_data_jax_cpu, default_n_matrices_jax_cpu, n_data_jax
+
+
+num_cores = get_effective_cpu_count()
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--n_matrices", type=int, default=default_n_matrices_jax_cpu, help=f"Number of matrices of a batch, which must be a multiple of every number of devices. Default: {default_n_matrices_jax_cpu}")
+    parser.add_argument("--n_data_batch", type=int, default=n_data_jax, help=f"Number of elements of each matrix of the batching measures (vmap against a python loop). Default: {n_data_jax}")
+    parser.add_argument("--log_n_data", type=int, default=default_log_n_data_jax_cpu, help=f"Value (in log scale) of the maximum number of elements of each matrix of the data-parallel measures. Default: {default_log_n_data_jax_cpu} (10^{default_log_n_data_jax_cpu})")
+    parser.add_argument("--n_devices", type=int, nargs="+", default=None, help=f"Numbers of host devices of the data-parallel measures. Default: the powers of 2 up to your effective number of cores ({num_cores})")
+    parser.add_argument("--methods", type=str, nargs="+", default=jax_parallel_methods, choices=jax_parallel_methods, help=f"Data-parallel methods to measure. Default: {jax_parallel_methods}")
+    parser.add_argument("--multi_threaded_devices", action="store_true", default=False, help="Keep the multi-threaded Eigen pool of XLA:CPU on each host device in the data-parallel measures, so that every device competes for all the cores. By default, each device computes on one thread (--xla_cpu_multi_thread_eigen=false intra_op_parallelism_threads=1)")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_jax_cpu, help=f"Number of measures to be made for each point. Default: {default_n_measures_jax_cpu}")
+
+    args = parser.parse_args()
+    # jax is imported once the arguments are parsed, since it is slow to import
+    import jax
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    n_matrices = args.n_matrices
+    list_batch_size = [2**k for k in range(0, n_matrices.bit_length()) if 2**k <= n_matrices]
+    list_n_data = [10**k for k in range(0, args.log_n_data + 1)]
+    single_threaded = not args.multi_threaded_devices
+    list_n_devices = args.n_devices if args.n_devices is not None else [2**k for k in range(0, num_cores.bit_length()) if 2**k <= num_cores]
+    for n_devices in list_n_devices:
+        if n_matrices % n_devices != 0:
+            parser.error(f"--n_matrices ({n_matrices}) must be a multiple of every number of devices, got {n_devices}")
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== JAX CPU measurement ===== \n\
+The product of a batch of matrices will be measured on the CPU with jax {jax.__version__}: \n\
+first with a python loop and with vmap, for batches of [1, {n_matrices}] matrices of {args.n_data_batch} elements, \n\
+then split across {list_n_devices} host devices with {args.methods}, for batches of {n_matrices} matrices of [1, 10^{args.log_n_data}] elements, \n\
+each device computing on {'one thread' if single_threaded else 'the multi-threaded Eigen pool of XLA:CPU'}. \n\
+With {n_measures} measures for each point. \n\
+===============================\n\
+        ")
+    log_filename = log_dir + "/jax_cpu.txt" if log_dir is not None else None
+    image_filename = image_dir + "/jax_cpu.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("jax_cpu", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+
+    # Measure the batching methods on one device. The batches are generated and the functions are compiled before the measures.
+    X = get_batch_of_matrices(n_matrices, args.n_data_batch)
+    list_mean_time_loop = None
+    for method in jax_batch_methods:
+        title = f"JAX batching with {method} (n_data={args.n_data_batch})"
+        print(title)
+        dict_batched = {batch_size : get_batched_matmul(method, X[:batch_size]) for batch_size in list_batch_size}
+
+        def batched_matmul(batch_size : int):
+            func, inputs = dict_batched[batch_size]
+            return func(inputs)
+
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = batched_matmul,
+            list_inputs = list_batch_size,
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            )
+        if list_mean_time_loop is None:
+            list_mean_time_loop = list_mean_time
+
+        deal_with_results(
+            list_inputs=list_batch_size,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            list_speed_up=[list_mean_time_loop[i] / list_mean_time[i] for i in range(len(list_mean_time))] if method != "loop" else None,
+            do_print=True,
+            do_plot=False,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
+
+
+
+    # Measure the batch on one device with vmap, the reference of the data-parallel measures.
+    # Each point is measured in a new process, since the number of host devices is fixed at the import of jax.
+    title = f"No parallelization (vmap on 1 device, n_matrices={n_matrices}, {'single' if single_threaded else 'multi'}-threaded device)"
+    print(title)
+    list_mean_time_no_parallelization, list_std_time, list_samples = run_in_new_process(measure_devices_point, 1, "vmap", n_matrices, list_n_data, n_measures, single_threaded)
+    deal_with_results(
+        list_inputs=list_n_data,
+        list_mean_time=list_mean_time_no_parallelization,
+        list_std_time=list_std_time,
+        do_print=True,
+        do_plot=False,
+        log_filename=log_filename,
+        image_filename=image_filename,
+        title=title,
+        list_samples=list_samples,
+    )
+
+    for method in args.methods:
+        list_fit_n_process, list_fit_n_data, list_fit_time_sequential, list_fit_time_parallel = [], [], [], []
+        for n_devices in list_n_devices:
+            title = f"Parallel° with {method} (n_devices={n_devices}, n_matrices={n_matrices}, {'single' if single_threaded else 'multi'}-threaded devices)"
+            print(title)
+            list_mean_time, list_std_time, list_samples = run_in_new_process(measure_devices_point, n_devices, method, n_matrices, list_n_data, n_measures, single_threaded)
+            list_speed_up = [list_mean_time_no_parallelization[i] / list_mean_time[i] for i in range(len(list_mean_time))]
+            list_fit_n_process += [n_devices] * len(list_n_data)
+            list_fit_n_data += list_n_data
+            list_fit_time_sequential += list_mean_time_no_parallelization
+            list_fit_time_parallel += list_mean_time
+
+            deal_with_results(
+                list_inputs=list_n_data,
+                list_mean_time=list_mean_time,
+                list_std_time=list_std_time,
+                list_speed_up=list_speed_up,
+                dict_extra_columns={"efficiency" : [speed_up / n_devices for speed_up in list_speed_up]},
+                do_print=True,
+                do_plot=do_plot if n_devices == list_n_devices[-1] and method == args.methods[-1] else False,
+                log_filename=log_filename,
+                image_filename=image_filename,
+                title=title,
+                list_samples=list_samples,
+            )
+
+        # Fit the scaling model
+        string = get_fit_as_string(f"Amdahl's law fit (strong scaling) with {method}", fit_amdahl(list_fit_n_process, list_fit_n_data, list_fit_time_sequential, list_fit_time_parallel))
+        print(string)
+        if log_filename is not None:
+            with open(log_filename, "a") as f:
+                f.write(string + "\n")
@@ -0,0 +1,184 @@
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.parallel_func import get_parallel_pool, get_supported_libs
+from localperf.core.memory_kernels import stream_bytes_per_element, run_stream_kernel, run_stream_kernel_task, get_stream_arrays, prepare_stream_arrays_task
+from localperf.core.memory_kernels import get_pointer_chasing_array, chase_pointers, get_cache_sizes
+from localperf.core.utils import create_dir, remove_file
+from localperf.core.config import default_n_measures_memory, default_log2_min_array_size_memory, default_log2_max_array_size_memory
+from localperf.core.config import default_log2_min_working_set_memory, default_log2_max_working_set_memory, default_n_steps_memory
+
+
+num_cores = get_effective_cpu_count()
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--log2_min_array_size", type=int, default=default_log2_min_array_size_memory, help=f"Value (in log2 scale) of the minimum size in bytes of each STREAM array. Default: {default_log2_min_array_size_memory} ({2**default_log2_min_array_size_memory} bytes)")
+    parser.add_argument("--log2_max_array_size", type=int, default=default_log2_max_array_size_memory, help=f"Value (in log2 scale) of the maximum size in bytes of each STREAM array. Default: {default_log2_max_array_size_memory} ({2**default_log2_max_array_size_memory} bytes)")
+    parser.add_argument("--kernels", type=str, nargs="+", default=list(stream_bytes_per_element), choices=list(stream_bytes_per_element), help=f"STREAM kernels to measure. Default: {list(stream_bytes_per_element)}")
+    parser.add_argument("--lib", type=str, default="joblib", help=f"Library used to run the STREAM kernels on all cores. Default: joblib. Available: {get_supported_libs()}")
+    parser.add_argument("--n_process", type=int, default=num_cores, help=f"Number of process used to run the STREAM kernels in parallel. Default is your effective number of cores (CPU affinity and cgroup quota): {num_cores}")
+    parser.add_argument("--log2_min_working_set", type=int, default=default_log2_min_working_set_memory, help=f"Value (in log2 scale) of the minimum working set in bytes of the pointer chasing. Default: {default_log2_min_working_set_memory} ({2**default_log2_min_working_set_memory} bytes)")
+    parser.add_argument("--log2_max_working_set", type=int, default=default_log2_max_working_set_memory, help=f"Value (in log2 scale) of the maximum working set in bytes of the pointer chasing. Default: {default_log2_max_working_set_memory} ({2**default_log2_max_working_set_memory} bytes)")
+    parser.add_argument("--n_steps", type=int, default=default_n_steps_memory, help=f"Number of pointers followed in each measure of the pointer chasing. Default: {default_n_steps_memory}")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Array sizes in bytes to profile, for the STREAM kernels. Default: the largest one")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_memory, help=f"Number of measures to be made for each size. Default: {default_n_measures_memory}")
+
+    args = parser.parse_args()
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    lib_name = args.lib
+    n_process = args.n_process
+    n_steps = args.n_steps
+    cache_sizes = get_cache_sizes()
+
+    # Setup
+    print(get_machine_summary())
+    print(f"Data caches: {', '.join(f'{level}={size} bytes' for level, size in cache_sizes.items()) or 'unknown'}")
+    print(
+f"===== Memory measurement ===== \n\
+STREAM bandwidth will be measured for arrays in range [2^{args.log2_min_array_size}, 2^{args.log2_max_array_size}] bytes, \n\
+with 1 process and with {n_process} process with {lib_name}. \n\
+Latency will be measured by pointer chasing for working sets in range [2^{args.log2_min_working_set}, 2^{args.log2_max_working_set}] bytes. \n\
+With {n_measures} measures for each size. \n\
+==============================\n\
+        ")
+    list_array_size = [2**k for k in range(args.log2_min_array_size, args.log2_max_array_size + 1)]
+    list_working_set = [2**k for k in range(args.log2_min_working_set, args.log2_max_working_set + 1)]
+    log_filename = log_dir + "/memory.txt" if log_dir is not None else None
+    image_filename = image_dir + "/memory.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("memory", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+
+    # Measure STREAM bandwidth with 1 process
+    for kernel in args.kernels:
+        title = f"STREAM {kernel} (1 process)"
+        print(title)
+
+        def stream_computing(array_size : int):
+            run_stream_kernel(kernel, array_size // 8)
+
+        # The arrays of each size are allocated before its measures, and freed at the next size
+        list_mean_time, list_std_time, list_samples = measure_time(
+            func = stream_computing,
+            list_inputs = list_array_size,
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            setup = lambda array_size : get_stream_arrays(array_size // 8),
+            )
+        if args.profile is not None:
+            profile_points(stream_computing, args.profile_points or list_array_size[-1:], args.profile, log_dir, f"memory_stream_{kernel}")
+
+        deal_with_results(
+            list_inputs=list_array_size,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            dict_extra_columns={"bandwidth_GB/s" : [stream_bytes_per_element[kernel] * (array_size // 8) / mean_time / 1e9
+                                                    for array_size, mean_time in zip(list_array_size, list_mean_time)]},
+            do_print=True,
+            do_plot=False,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
+
+
+
+    # Measure STREAM bandwidth with n_process process. The arrays are split between the process, so that the total working set is the same.
+    pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+    pool.start()
+    try:
+        for kernel in args.kernels:
+            title = f"STREAM {kernel} ({n_process} process with {lib_name})"
+            print(title)
+
+            def parallel_stream_computing(array_size : int):
+                pool.map(run_stream_kernel_task, [(kernel, array_size // 8 // n_process)] * n_process, chunksize=1)
+
+            list_mean_time, list_std_time, list_samples = measure_time(
+                func = parallel_stream_computing,
+                list_inputs = list_array_size,
+                n_measures = n_measures,
+                show_progress_bar = show_progress_bar,
+                setup = lambda array_size : pool.map(prepare_stream_arrays_task, [array_size // 8 // n_process] * n_process, chunksize=1),
+                )
+            if args.profile is not None:
+                profile_points(parallel_stream_computing, args.profile_points or list_array_size[-1:], args.profile, log_dir, f"memory_stream_{kernel}_{lib_name}")
+
+            deal_with_results(
+                list_inputs=list_array_size,
+                list_mean_time=list_mean_time,
+                list_std_time=list_std_time,
+                dict_extra_columns={"bandwidth_GB/s" : [stream_bytes_per_element[kernel] * (array_size // 8 // n_process) * n_process / mean_time / 1e9
+                                                        for array_size, mean_time in zip(list_array_size, list_mean_time)]},
+                do_print=True,
+                do_plot=False,
+                log_filename=log_filename,
+                image_filename=image_filename,
+                title=title,
+                list_samples=list_samples,
+            )
+    finally:
+        pool.close()
+
+
+
+    # Measure the latency of random accesses by pointer chasing, for each working set size
+    title = "Pointer chasing"
+    print(title)
+    list_mean_time, list_std_time, list_samples = [], [], []
+    for working_set in list_working_set:
+        array = get_pointer_chasing_array(working_set)
+        chase_pointers(array, n_steps)
+        list_mean_time_working_set, list_std_time_working_set, list_samples_working_set = measure_time(
+            func = lambda n_steps : chase_pointers(array, n_steps),
+            list_inputs = [n_steps],
+            n_measures = n_measures,
+            show_progress_bar = show_progress_bar,
+            )
+        list_mean_time += list_mean_time_working_set
+        list_std_time += list_std_time_working_set
+        list_samples += list_samples_working_set
+        del array
+
+    # The time per access at the smallest working set is mostly the overhead of the python interpreter, it is removed to get the additional latency
+    list_latency = [mean_time / n_steps * 1e9 for mean_time in list_mean_time]
+    deal_with_results(
+        list_inputs=list_working_set,
+        list_mean_time=list_mean_time,
+        list_std_time=list_std_time,
+        dict_extra_columns={
+            "ns_per_access" : list_latency,
+            "ns_above_smallest" : [latency - list_latency[0] for latency in list_latency],
+            "fits_in" : [next((level for level, size in cache_sizes.items() if working_set <= size), "DRAM") for working_set in list_working_set],
+            },
+        do_print=True,
+        do_plot=do_plot,
+        log_filename=log_filename,
+        image_filename=image_filename,
+        title=title,
+        list_samples=list_samples,
+    )
@@ -0,0 +1,148 @@
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.parallel_func import get_parallel_pool, get_parallel_function, get_worker_n_threads, get_supported_libs
+from localperf.core.thread_limits import thread_limit_methods, is_oversubscribed
+from localperf.core.compute import workloads
+from localperf.core.utils import create_dir, remove_file
+from localperf.core.config import default_n_measures_oversubscription, default_n_tasks_oversubscription
+
+
+num_cores = get_effective_cpu_count()
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--libs", type=str, nargs="+", default=["joblib", "mp"], help=f"Libraries to compare. Default: joblib and mp. Available: {get_supported_libs()}")
+    parser.add_argument("--n_process", type=int, nargs="+", default=None, help=f"Numbers of process. Default: the powers of 2 up to your effective number of cores ({num_cores})")
+    parser.add_argument("--threads", type=int, nargs="+", default=None, help=f"Numbers of threads of the BLAS and OpenMP libraries of each process, measured after the default number of threads (no limit). Default: the powers of 2 up to your effective number of cores ({num_cores})")
+    parser.add_argument("--thread_limit", type=str, default="threadpoolctl", choices=thread_limit_methods, help="How the threads of the workers are limited: with threadpoolctl in each worker (threadpoolctl), or with the thread environment variables (OMP_NUM_THREADS and co) set when the workers are started (env, no effect on the workers forked from this process, e.g. with mp_fork). The threads actually used by the workers are read in them and reported. The libraries whose workers are threads (thread_pool) are skipped. Default: threadpoolctl")
+    parser.add_argument("--workload", type=str, default="matmul", choices=list(workloads), help="Workload computed for each task. Default: matmul")
+    parser.add_argument("--n_tasks", type=int, default=default_n_tasks_oversubscription, help=f"Number of tasks computed at each measure. Default: {default_n_tasks_oversubscription}")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_oversubscription, help=f"Number of measures to be made for each configuration. Default: {default_n_measures_oversubscription}")
+
+    args = parser.parse_args()
+    try:
+        import threadpoolctl
+    except ImportError:
+        parser.error("The threads of the workers are limited and counted with threadpoolctl, please install it with: pip install threadpoolctl")
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    n_tasks = args.n_tasks
+    workload = args.workload
+    list_powers_of_2 = [2**k for k in range(0, num_cores.bit_length()) if 2**k <= num_cores]
+    list_n_process = args.n_process if args.n_process is not None else list_powers_of_2
+    # None is the default number of threads of the workers, without limit
+    list_n_threads = [None] + (args.threads if args.threads is not None else list_powers_of_2)
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== Thread oversubscription measurement ===== \n\
+{n_tasks} tasks of the {workload} workload will be computed with {args.libs}, \n\
+for n_process in {list_n_process} and threads per process in {['default'] + list_n_threads[1:]} (limited with {args.thread_limit}). \n\
+With {n_measures} measures for each configuration. \n\
+================================================\n\
+        ")
+    log_filename = log_dir + "/oversubscription.txt" if log_dir is not None else None
+    image_filename = image_dir + "/oversubscription.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("oversubscription", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+
+    # Measure the tasks for each split of the cores into process x threads. The workers are created at each call,
+    # so that the thread limit (or the thread environment variables) applies from their start. The number of threads actually used
+    # by the workers of each configuration is read in them, since a limit can have no effect (e.g. env with forked workers).
+    for lib_name in args.libs:
+        list_results = []
+        time_reference = None
+        try:
+            # The thread pools of the BLAS libraries are shared by the threads of a process, so the threads of thread workers can't be limited apart
+            if get_parallel_pool(lib_name, 2).workers_are_threads:
+                raise ValueError(f"The workers of {lib_name} are threads sharing the thread pools of this process, their threads can't be limited")
+            for n_process in list_n_process:
+                title = f"Threads of {workload} with {lib_name} (n_process={n_process}, limited with {args.thread_limit})"
+                print(title)
+                # The inputs are strings, since the default number of threads is measured with the numbers of threads.
+                # The limits are skipped when the library computes in this process (e.g. joblib with 1 process), since they would remain after the call
+                list_threads, dict_parallel_function, list_threads_per_process = [], {}, []
+                for n_threads in list_n_threads:
+                    threads = "default" if n_threads is None else str(n_threads)
+                    try:
+                        dict_parallel_function[threads] = get_parallel_function(lib_name, n_process, n_threads=n_threads, thread_limit=args.thread_limit)
+                    except ValueError as e:
+                        print(f"WARNING : {e}. Skipping {threads} threads.")
+                        continue
+                    list_threads.append(threads)
+                    list_threads_per_process.append(max(get_worker_n_threads(lib_name, n_process, n_threads=n_threads, thread_limit=args.thread_limit)))
+
+                def parallel_computing(threads):
+                    dict_parallel_function[threads](n_tasks, workload=workload)
+
+                list_mean_time, list_std_time, list_samples = measure_time(
+                    func = parallel_computing,
+                    list_inputs = list_threads,
+                    n_measures = n_measures,
+                    show_progress_bar = show_progress_bar,
+                    )
+                # The speed-up is relative to 1 process with the default number of threads, i.e. when only the BLAS library parallelizes the tasks
+                if time_reference is None:
+                    time_reference = list_mean_time[0]
+                list_oversubscribed = [is_oversubscribed(n_process, threads_per_process, num_cores) for threads_per_process in list_threads_per_process]
+                list_results += [(mean_time, n_process, threads, threads_per_process) for mean_time, threads, threads_per_process in zip(list_mean_time, list_threads, list_threads_per_process)]
+
+                deal_with_results(
+                    list_inputs=list_threads,
+                    list_mean_time=list_mean_time,
+                    list_std_time=list_std_time,
+                    list_speed_up=[time_reference / mean_time for mean_time in list_mean_time],
+                    dict_extra_columns={
+                        "tasks/s" : [n_tasks / mean_time for mean_time in list_mean_time],
+                        "threads_per_process" : list_threads_per_process,
+                        "total_threads" : [n_process * threads_per_process for threads_per_process in list_threads_per_process],
+                        "oversubscribed" : list_oversubscribed,
+                        },
+                    do_print=True,
+                    do_plot=do_plot if n_process == list_n_process[-1] and lib_name == args.libs[-1] else False,
+                    log_filename=log_filename,
+                    image_filename=image_filename,
+                    title=title,
+                    list_samples=list_samples,
+                )
+                list_threads_not_applied = [threads for threads, threads_per_process in zip(list_threads, list_threads_per_process)
+                                            if threads != "default" and threads_per_process != int(threads)]
+                if len(list_threads_not_applied) > 0:
+                    print(f"WARNING : the limits of {list_threads_not_applied} threads per process were not applied to the workers of {lib_name} with {args.thread_limit}, "
+                          f"see the threads_per_process column for the threads they actually used.\n")
+                list_threads_oversubscribed = [threads for threads, oversubscribed in zip(list_threads, list_oversubscribed) if oversubscribed]
+                if len(list_threads_oversubscribed) > 0:
+                    print(f"WARNING : {n_process} process with {list_threads_oversubscribed} threads each are oversubscribed: they run more threads than your {num_cores} cores.\n")
+        except (ImportError, ValueError) as e:
+            print(f"WARNING : {e}. Skipping {lib_name}.")
+            continue
+
+        # Report the best split of the cores
+        best_time, best_n_process, best_threads, best_threads_per_process = min(list_results, key=lambda result : result[0])
+        string = f"Best split with {lib_name}: {best_n_process} process x {best_threads} threads ({best_threads_per_process} threads used by each process, {n_tasks / best_time:.1f} tasks/s, speed-up {time_reference / best_time:.2f} over 1 process with the default threads)\n"
+        print(string)
+        if log_filename is not None:
+            with open(log_filename, "a") as f:
+                f.write(string + "\n")
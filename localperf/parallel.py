@@ -1,17 +1,26 @@
-import multiprocessing as mp
 from argparse import ArgumentParser
 from time import time, perf_counter
 import numpy as np
-import matplotlib.pyplot as plt
 from typing import Callable, List, Any, Tuple
 
 
 # Local imports
 from localperf.core.measuring import measure_time, deal_with_results
-from localperf.core.parallel_func import get_parallel_function
-from localperf.core.utils import create_dir, remove_file
-from localperf.core.compute import treat_one_data
-from localperf.core.config import default_log_n_data_parallel, default_log2_n_process_parallel, default_n_measures_parallel, supported_libs
+from localperf.core.profiling import profilers, profile_points, get_profile_filename_prefix
+from localperf.core.results import output_formats, start_run
+from localperf.core.isolation import start_isolation
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.parallel_func import measure_parallel_time, profile_parallel_point, get_supported_libs
+from localperf.core.placement import placement_policies
+from localperf.core.scaling import fit_amdahl, fit_gustafson, get_fit_as_string
+from localperf.core.instrumentation import ResourceMonitor, deal_with_utilization
+from localperf.core.utils import create_dir, remove_file, parse_chunksize
+from localperf.core.compute import compute, workloads
+from localperf.core.data_parallel import sharing_modes, get_data_array, reduce_array
+from localperf.core.config import default_log_n_data_parallel, default_n_measures_parallel, default_workload
+
+
+num_cores = get_effective_cpu_count()
 
 
             
@@ -23,40 +32,68 @@ if __name__ == "__main__":
     parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
     parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
     parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
     
     parser.add_argument("--log_n_data", type=int, default=default_log_n_data_parallel, help=f"Value (in log10 scale) of the maximum n_data to be tested. Default: {default_log_n_data_parallel} (10^{default_log_n_data_parallel} data max)")
-    parser.add_argument("--log2_n_process", type=int, default=default_log2_n_process_parallel, help=f"Value (in log2 scale) of the maximum n_process to be tested. Default: {default_log2_n_process_parallel} ({2**default_log2_n_process_parallel} process max)")
+    parser.add_argument("--log2_n_process", type=int, default=None, help=f"Value (in log2 scale) of the maximum n_process to be tested. Default: the largest power of 2 up to your effective number of cores ({num_cores})")
     parser.add_argument("--n_measures", type=int, default=default_n_measures_parallel, help=f"Number of measures to be made for each n_data. Default: {default_n_measures_parallel}")
-    parser.add_argument("--lib", type=str, default="joblib", help=f"Library to use for parallelization. Default: joblib. Available: {supported_libs}")
+    parser.add_argument("--workload", type=str, default=default_workload, choices=list(workloads), help=f"Workload computed for each data. Default: {default_workload}")
+    parser.add_argument("--warm_pool", action="store_true", default=False, help="Start the workers once per library and n_process and reuse them for every measure. Pool startup and teardown times are reported separately. By default, workers are created at each call")
+    parser.add_argument("--sharing", type=str, default=None, choices=sharing_modes, help="Compute the data parallel workload instead of --workload: an array of n_data data is shared with the workers with this sharing mode and reduced by chunks. The ray mode requires the ray library. Default: None (the --workload is computed)")
+    parser.add_argument("--instrument", action="store_true", default=False, help="Record the CPU time, context switches and peak memory (unix only) and the utilization of the cores (linux only) of each measured call as extra columns, and the utilization of the cores over time as a figure")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Values of n_data to profile (per process in weak scaling), for each n_process. Default: the largest one")
+    parser.add_argument("--chunksize", type=parse_chunksize, default=None, help="Number of data sent to a worker at once, or 'auto' to pick the chunksize with the best throughput for each n_data. Default: the default batching of the library")
+    parser.add_argument("--scaling", type=str, default="strong", choices=["strong", "weak"], help="Strong scaling (the total n_data is fixed and split between the process) or weak scaling (n_data is the amount of data per process, the total n_data grows with n_process). Default: strong")
+    parser.add_argument("--placements", type=str, nargs="+", default=["none"], choices=placement_policies, help="Placement policies of the workers on the CPUs (linux only), measured one after the other: no pinning (none), one worker per physical core (physical_cores), SMT siblings filled first (smt_packed) or workers alternating between the sockets (socket_spread). Default: none")
+    parser.add_argument("--numa_local", action="store_true", default=False, help="With a placement policy, also bind the memory of each worker to the NUMA node of its CPU (requires libnuma)")
+    parser.add_argument("--lib", type=str, default="joblib", help=f"Library to use for parallelization. Default: joblib. Available: {get_supported_libs()}")
+    parser.add_argument("--isolate", action="store_true", default=False, help="Measure each point (all the measures of one input) in a new process forked for it (unix only), killed with its workers after --timeout. The points whose time, extrapolated from the previous points, would exceed the timeout or the remaining --run_budget are skipped. Not available with --warm_pool, --sharing or --instrument")
+    parser.add_argument("--timeout", type=float, default=None, help="Maximal time in seconds of the measures of a point, with --isolate. No timeout by default")
+    parser.add_argument("--run_budget", type=float, default=None, help="Maximal time in seconds of the whole run, with --isolate: the points that don't fit in the remaining budget are skipped. No budget by default")
 
     args = parser.parse_args()
+    if args.isolate and any(getattr(args, option) for option in ["warm_pool", "sharing", "instrument"]):
+        parser.error("--isolate can't be used with --warm_pool, --sharing or --instrument")
+    if not args.isolate and (args.timeout is not None or args.run_budget is not None):
+        parser.error("--timeout and --run_budget require --isolate")
     
     image_dir = args.image_dir
     log_dir = args.log_dir
     do_plot = args.plot
     log_n_data_max = args.log_n_data
-    log2_n_process_max = args.log2_n_process
+    log2_n_process_max = args.log2_n_process if args.log2_n_process is not None else num_cores.bit_length() - 1
     n_measures = args.n_measures    
     show_progress_bar = not args.no_progress
+    workload = args.workload
+    warm_pool = args.warm_pool
+    chunksize = args.chunksize
+    sharing = args.sharing
+    monitor = ResourceMonitor() if args.instrument else None
     lib_name = args.lib
+    scaling = args.scaling
 
-    num_cores = mp.cpu_count()
 
     # Setup
-    print(f"Number of cores: {num_cores}")
+    print(get_machine_summary())
     print(
 f"===== Parallelization speed-up measurement ===== \n\
-Speed up with parallelization with {lib_name} will be measured \n\
-For data in range [1, 10^{log_n_data_max}] \n\
+Speed up with parallelization with {lib_name} will be measured ({scaling} scaling) \n\
+For data {'per process ' if scaling == 'weak' else ''}in range [1, 10^{log_n_data_max}] \n\
 For n_process in range [1, 2^{log2_n_process_max}] = [1, {2**log2_n_process_max}] \n\
 With {n_measures} measures for each data. \n\
 ================================================\n\
         ")
     list_n_data = [10**k for k in range(0, log_n_data_max + 1)]
     list_n_process = [2**k for k in range(0, log2_n_process_max + 1)]
-    log_filename = log_dir + f"/parallel_{lib_name}.txt" if log_dir is not None else None
-    image_filename = image_dir + f"/parallel_{lib_name}.png" if image_dir is not None else None
+    suffix = "_weak" if scaling == "weak" else ""
+    log_filename = log_dir + f"/parallel_{lib_name}{suffix}.txt" if log_dir is not None else None
+    image_filename = image_dir + f"/parallel_{lib_name}{suffix}.png" if image_dir is not None else None
     create_dir(log_dir)
+    start_run("parallel", vars(args), log_dir, args.formats, args.db)
+    if args.isolate:
+        start_isolation(args.timeout, args.run_budget)
     create_dir(image_dir)
     remove_file(log_filename)
     
@@ -68,54 +105,111 @@ With {n_measures} measures for each data. \n\
         
     def for_loop_computing(n_data: int):
         "Compute data sequentially."
-        for _ in range(n_data):
-            treat_one_data()
+        if sharing is not None:
+            reduce_array(get_data_array(n_data))
+        else:
+            compute(n_data, workload=workload)
             
-    list_mean_time_no_parallelization, list_std_time = measure_time(
+    list_mean_time_no_parallelization, list_std_time, list_samples = measure_time(
         func = for_loop_computing, 
         list_inputs = list_n_data, 
         n_measures = n_measures,
         show_progress_bar = show_progress_bar,
+        setup = get_data_array if sharing is not None else None,
+        monitor = monitor,
         )
+    if args.profile is not None:
+        profile_points(for_loop_computing, args.profile_points or list_n_data[-1:], args.profile, log_dir, "no_parallelization")
 
     deal_with_results(
         list_inputs=list_n_data,
         list_mean_time=list_mean_time_no_parallelization,
         list_std_time=list_std_time,
+        dict_extra_columns=monitor.get_extra_columns(list_n_data) if monitor is not None else None,
         do_print=True,
         do_plot=False,
         log_filename=log_filename,
         image_filename=image_filename,
         title=title,
+        list_samples=list_samples,
     ) 
         
         
         
-    for n_process in list_n_process:
+    for placement in args.placements:
+        placement_suffix = f", {placement} placement" if placement != "none" else ""
+        list_fit_n_process, list_fit_n_data, list_fit_time_sequential, list_fit_time_parallel, list_fit_speed_up = [], [], [], [], []
+        for n_process in list_n_process:
         
-        # Measure with the parallelization lib with n_process processes
-        title=f"Parallel° with {lib_name} (n_process={n_process})"
-        print(title)
+            # Measure with the parallelization lib with n_process processes
+            title=f"Parallel° with {lib_name} (n_process={n_process}{placement_suffix})"
+            print(title)
         
+            # In weak scaling, each process treats n_data data, so the sequential time of the total n_data is n_process times the one of n_data
+            if scaling == "weak":
+                list_n_data_total = [n_data * n_process for n_data in list_n_data]
+                list_time_sequential = [n_process * time_sequential for time_sequential in list_mean_time_no_parallelization]
+            else:
+                list_n_data_total = list_n_data
+                list_time_sequential = list_mean_time_no_parallelization
         
-        parallel_computing = get_parallel_function(lib_name=lib_name, n_process=num_cores)
-
-        list_mean_time, list_std_time = measure_time(
-            func = parallel_computing, 
-            list_inputs = list_n_data, 
-            n_measures = n_measures,
-            show_progress_bar = show_progress_bar,
+            list_mean_time, list_std_time, dict_extra_columns, list_samples = measure_parallel_time(
+                lib_name = lib_name,
+                n_process = n_process,
+                list_n_data = list_n_data_total,
+                n_measures = n_measures,
+                show_progress_bar = show_progress_bar,
+                warm_pool = warm_pool,
+                chunksize = chunksize,
+                workload = workload,
+                sharing = sharing,
+                monitor = monitor,
+                placement = placement,
+                numa_local = args.numa_local,
+                )
+            if args.profile is not None:
+                for n_data in args.profile_points or list_n_data[-1:]:
+                    n_data_total = n_data * n_process if scaling == "weak" else n_data
+                    # With chunksize auto, the chunksize found for n_data is used if n_data was measured, else the default batching of the library
+                    chunksize_profile = chunksize if chunksize != "auto" else dict(zip(list_n_data_total, dict_extra_columns["chunksize"])).get(n_data_total)
+                    filename_prefix = get_profile_filename_prefix(log_dir, f"parallel_{lib_name}_{n_process}" + (f"_{placement}" if placement != "none" else ""), n_data_total)
+                    profile_parallel_point(lib_name, n_process, n_data_total, args.profile, filename_prefix, warm_pool=warm_pool, chunksize=chunksize_profile, workload=workload, sharing=sharing, placement=placement, numa_local=args.numa_local)
+                    print(f"Profile of {lib_name} with {n_process} process for {n_data_total} saved to {filename_prefix}.*")
+            list_speed_up = [list_time_sequential[i] / list_mean_time[i] for i in range(len(list_mean_time))]
+            dict_extra_columns["efficiency"] = [speed_up / n_process for speed_up in list_speed_up]
+            if scaling == "weak":
+                dict_extra_columns["n_data_total"] = list_n_data_total
+            list_fit_n_process += [n_process] * len(list_n_data)
+            list_fit_n_data += list_n_data_total
+            list_fit_time_sequential += list_time_sequential
+            list_fit_time_parallel += list_mean_time
+            list_fit_speed_up += list_speed_up
+        
+            deal_with_results(
+                list_inputs=list_n_data,
+                list_mean_time=list_mean_time,
+                list_std_time=list_std_time,
+                list_speed_up=list_speed_up,
+                dict_extra_columns=dict_extra_columns,
+                do_print=True,
+                do_plot=do_plot and monitor is None if n_process == list_n_process[-1] and placement == args.placements[-1] else False,
+                log_filename=log_filename,
+                image_filename=image_filename,
+                title=title,
+                list_samples=list_samples,
             )
-        list_speed_up = [list_mean_time_no_parallelization[i] / list_mean_time[i] for i in range(len(list_mean_time))]
         
-        deal_with_results(
-            list_inputs=list_n_data,
-            list_mean_time=list_mean_time,
-            list_std_time=list_std_time,
-            list_speed_up=list_speed_up,
-            do_print=True,
-            do_plot=do_plot if n_process == list_n_process[-1] else False,
-            log_filename=log_filename,
-            image_filename=image_filename,
-            title=title,
-        )        
\ No newline at end of file
+        
+        
+        # Fit the scaling model
+        if scaling == "weak":
+            string = get_fit_as_string(f"Gustafson's law fit (weak scaling) with {lib_name}{placement_suffix}", fit_gustafson(list_fit_n_process, list_fit_speed_up))
+        else:
+            string = get_fit_as_string(f"Amdahl's law fit (strong scaling) with {lib_name}{placement_suffix}", fit_amdahl(list_fit_n_process, list_fit_n_data, list_fit_time_sequential, list_fit_time_parallel))
+        print(string)
+        if log_filename is not None:
+            with open(log_filename, "a") as f:
+                f.write(string + "\n")
+
+    if monitor is not None:
+        deal_with_utilization(monitor, do_plot=do_plot, image_filename=image_dir + f"/parallel_{lib_name}{suffix}_utilization.png" if image_dir is not None else None)
@@ -0,0 +1,119 @@
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.parallel_func import get_parallel_pool, get_supported_libs
+from localperf.core.scheduling import task_distributions, scheduling_strategies, get_task_sizes, run_tasks, get_schedule_statistics
+from localperf.core.compute import workloads
+from localperf.core.utils import create_dir, remove_file, get_pyplot
+from localperf.core.config import default_n_measures_scheduling, default_log_n_tasks_scheduling, default_mean_task_size_scheduling, default_workload
+
+
+num_cores = get_effective_cpu_count()
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--log_n_tasks", type=int, default=default_log_n_tasks_scheduling, help=f"Value (in log10 scale) of the maximum number of tasks to be tested. Default: {default_log_n_tasks_scheduling} (10^{default_log_n_tasks_scheduling} tasks max)")
+    parser.add_argument("--mean_task_size", type=int, default=default_mean_task_size_scheduling, help=f"Mean number of data of a task. Default: {default_mean_task_size_scheduling}")
+    parser.add_argument("--distributions", type=str, nargs="+", default=task_distributions, choices=task_distributions, help=f"Distributions of the task sizes. Default: {task_distributions}")
+    parser.add_argument("--strategies", type=str, nargs="+", default=scheduling_strategies, choices=scheduling_strategies, help=f"Scheduling strategies. Default: {scheduling_strategies}")
+    parser.add_argument("--libs", type=str, nargs="+", default=["joblib", "mp"], help=f"Libraries to compare. Default: joblib and mp. Available: {get_supported_libs()}")
+    parser.add_argument("--n_process", type=int, default=num_cores, help=f"Value of the number of process used. Default is your effective number of cores (CPU affinity and cgroup quota): {num_cores}")
+    parser.add_argument("--workload", type=str, default=default_workload, choices=list(workloads), help=f"Workload computed for each data. Default: {default_workload}")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Numbers of tasks to profile, among the measured ones. Default: the largest one")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_scheduling, help=f"Number of measures to be made for each number of tasks. Default: {default_n_measures_scheduling}")
+
+    args = parser.parse_args()
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    n_process = args.n_process
+    workload = args.workload
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== Scheduling of heterogeneous tasks measurement ===== \n\
+Tasks of sizes drawn from {args.distributions} (mean {args.mean_task_size} data) will be computed \n\
+with {args.libs} and the scheduling strategies {args.strategies}, with n_process = {n_process}. \n\
+For n_tasks in range [1, 10^{args.log_n_tasks}] \n\
+With {n_measures} measures for each number of tasks. \n\
+=========================================================\n\
+        ")
+    list_n_tasks = [10**k for k in range(0, args.log_n_tasks + 1)]
+    log_filename = log_dir + "/scheduling.txt" if log_dir is not None else None
+    image_filename = image_dir + "/scheduling.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("scheduling", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+    for lib_name in args.libs:
+        pool = get_parallel_pool(lib_name=lib_name, n_process=n_process)
+        try:
+            pool.start()
+        except ImportError as e:
+            print(f"WARNING : {e}. Skipping {lib_name}.")
+            continue
+        try:
+            pool.warm_up()
+            for distribution in args.distributions:
+                dict_task_sizes = {n_tasks : get_task_sizes(n_tasks, distribution, args.mean_task_size) for n_tasks in list_n_tasks}
+                for strategy in args.strategies:
+                    title = f"{distribution} task sizes with {lib_name} ({strategy} scheduling, n_process={n_process})"
+                    print(title)
+
+                    # The makespan is the measured time, the statistics of the schedule are averaged over the measures
+                    dict_statistics = {n_tasks : [] for n_tasks in list_n_tasks}
+                    def scheduled_computing(n_tasks : int):
+                        makespan, list_results = run_tasks(pool, dict_task_sizes[n_tasks], strategy, workload)
+                        dict_statistics[n_tasks].append(get_schedule_statistics(makespan, list_results, n_process))
+
+                    list_mean_time, list_std_time, list_samples = measure_time(
+                        func = scheduled_computing,
+                        list_inputs = list_n_tasks,
+                        n_measures = n_measures,
+                        show_progress_bar = show_progress_bar,
+                        )
+                    if args.profile is not None:
+                        profile_points(lambda n_tasks : run_tasks(pool, dict_task_sizes[n_tasks], strategy, workload), args.profile_points or list_n_tasks[-1:],
+                                       args.profile, log_dir, f"scheduling_{lib_name}_{distribution}_{strategy}")
+
+                    deal_with_results(
+                        list_inputs=list_n_tasks,
+                        list_mean_time=list_mean_time,
+                        list_std_time=list_std_time,
+                        dict_extra_columns={
+                            "n_data_total" : [sum(dict_task_sizes[n_tasks]) for n_tasks in list_n_tasks],
+                            "idle_time" : [sum(statistics["idle_time"] for statistics in dict_statistics[n_tasks]) / len(dict_statistics[n_tasks]) for n_tasks in list_n_tasks],
+                            "imbalance" : [sum(statistics["imbalance"] for statistics in dict_statistics[n_tasks]) / len(dict_statistics[n_tasks]) for n_tasks in list_n_tasks],
+                            },
+                        do_print=True,
+                        do_plot=False,
+                        log_filename=log_filename,
+                        image_filename=image_filename,
+                        title=title,
+                        list_samples=list_samples,
+                    )
+        finally:
+            pool.close()
+
+    if do_plot:
+        get_pyplot().show()
@@ -0,0 +1,96 @@
+from argparse import ArgumentParser
+import subprocess
+import sys
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_machine_summary
+from localperf.core.startup import measure_command_time, get_import_times, get_localperf_command
+from localperf.core.utils import create_dir, remove_file
+from localperf.cli import commands
+from localperf.core.config import default_n_measures_startup
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--commands", type=str, nargs="+", default=list(commands), choices=list(commands), help="Commands of localperf whose startup (localperf <command> --help) is measured. Default: all of them")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_startup, help=f"Number of measures to be made for each command. Default: {default_n_measures_startup}")
+
+    args = parser.parse_args()
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== Startup measurement ===== \n\
+The startup time of python, of the import of localperf and of localperf <command> --help will be measured \n\
+for the commands {args.commands}, each in a new process. \n\
+With {n_measures} measures for each command. \n\
+===============================\n\
+        ")
+    log_filename = log_dir + "/startup.txt" if log_dir is not None else None
+    image_filename = image_dir + "/startup.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("startup", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+
+    # Measure the startup of each command, from the start of the process to its exit. A first unmeasured run checks
+    # that the command works (e.g. that the libraries it requires are installed) and loads its files in the cache of the disk.
+    dict_command = {
+        "python" : [sys.executable, "-c", "pass"],
+        "import localperf" : [sys.executable, "-c", "import localperf"],
+        "localperf --help" : get_localperf_command(["--help"]),
+        }
+    dict_command.update({f"localperf {command} --help" : get_localperf_command([command, "--help"]) for command in args.commands})
+    for target in list(dict_command):
+        try:
+            measure_command_time(dict_command[target])
+        except subprocess.CalledProcessError:
+            print(f"WARNING : {target} failed (e.g. a library it requires is not installed). Skipping it.")
+            del dict_command[target]
+    list_targets = list(dict_command)
+
+    title = "Startup time"
+    print(title)
+    list_mean_time, list_std_time, list_samples = measure_time(
+        func = lambda target : measure_command_time(dict_command[target]),
+        list_inputs = list_targets,
+        n_measures = n_measures,
+        show_progress_bar = show_progress_bar,
+        )
+
+    # The import time of the modules is read from one more run of each command with the import profile of python
+    list_import_times = [get_import_times(dict_command[target]) for target in list_targets]
+    deal_with_results(
+        list_inputs=list_targets,
+        list_mean_time=list_mean_time,
+        list_std_time=list_std_time,
+        dict_extra_columns={
+            "overhead" : [mean_time - list_mean_time[0] for mean_time in list_mean_time],
+            "import_time" : [sum(dict_import_times.values()) for dict_import_times in list_import_times],
+            "slowest_import" : [next(iter(dict_import_times), None) for dict_import_times in list_import_times],
+            },
+        do_print=True,
+        do_plot=do_plot,
+        log_filename=log_filename,
+        image_filename=image_filename,
+        title=title,
+        list_samples=list_samples,
+    )
@@ -0,0 +1,142 @@
+from argparse import ArgumentParser
+
+# Local imports
+from localperf.core.measuring import measure_time, deal_with_results
+from localperf.core.profiling import profilers, profile_points
+from localperf.core.results import output_formats, start_run
+from localperf.core.machine import get_effective_cpu_count, get_machine_summary
+from localperf.core.torch_kernels import torch_modes, torch_dtypes, get_mlp, get_batch, get_inference_function, measure_threads_point, get_throughput_columns
+from localperf.core.utils import create_dir, remove_file, run_in_new_process
+from localperf.core.config import default_n_measures_torch_cpu, default_log2_max_batch_size_torch_cpu, default_width_torch_cpu, default_depth_torch_cpu
+
+
+num_cores = get_effective_cpu_count()
+
+
+if __name__ == "__main__":
+    # Parser
+    parser = ArgumentParser()
+    parser.add_argument("--log_dir", type=str, default=None, help="Directory where to save the logs. No saving by default")
+    parser.add_argument("--plot", action="store_true", default=False, help="Plot the results. No plotting by default")
+    parser.add_argument("--image_dir", type=str, default=None, help="Directory where to save the images. No saving by default")
+    parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+    parser.add_argument("--formats", type=str, nargs="+", default=[], choices=output_formats, help="Also save the results of the run, with its parameters, run id and raw measured times, in these structured formats, in --log_dir (or the current directory). None by default")
+    parser.add_argument("--db", type=str, default=None, help="SQLite database in which the results of the run are also stored, to be compared with other runs with localperf.compare. No database by default")
+
+    parser.add_argument("--width", type=int, default=default_width_torch_cpu, help=f"Number of neurons of each layer of the model. Default: {default_width_torch_cpu}")
+    parser.add_argument("--depth", type=int, default=default_depth_torch_cpu, help=f"Number of linear layers of the model. Default: {default_depth_torch_cpu}")
+    parser.add_argument("--log2_max_batch_size", type=int, default=default_log2_max_batch_size_torch_cpu, help=f"Value (in log2 scale) of the maximum batch size. Default: {default_log2_max_batch_size_torch_cpu} ({2**default_log2_max_batch_size_torch_cpu} samples)")
+    parser.add_argument("--modes", type=str, nargs="+", default=torch_modes, choices=torch_modes, help=f"Execution modes of the forward pass to compare. Default: {torch_modes}")
+    parser.add_argument("--dtypes", type=str, nargs="+", default=list(torch_dtypes), choices=list(torch_dtypes), help=f"Data types of the model and inputs to compare. Default: {list(torch_dtypes)}")
+    parser.add_argument("--threads", type=int, nargs="+", default=None, help=f"Numbers of intra-op threads (torch.set_num_threads) of the thread sweep. Default: the powers of 2 up to your effective number of cores ({num_cores})")
+    parser.add_argument("--interop_threads", type=int, nargs="+", default=[1], help="Numbers of inter-op threads (torch.set_num_interop_threads) of the thread sweep. Default: 1")
+    parser.add_argument("--threads_mode", type=str, default="inference_mode", choices=torch_modes, help="Execution mode of the thread sweep. Default: inference_mode")
+    parser.add_argument("--threads_batch_size", type=int, default=None, help="Batch size of the thread sweep. Default: the maximum batch size")
+    parser.add_argument("--profile", type=str, default=None, choices=profilers, help="Profile selected points with cProfile (cprofile) or with a low-overhead stack sampler (sampling), in separate runs from the timed measures. The profiles are saved in --log_dir (or the current directory) as .pstats (cprofile only) and .collapsed flamegraph stacks. No profiling by default")
+    parser.add_argument("--profile_points", type=int, nargs="+", default=None, help="Batch sizes to profile, for each mode and dtype. Default: the largest one")
+    parser.add_argument("--n_measures", type=int, default=default_n_measures_torch_cpu, help=f"Number of measures to be made for each batch size. Default: {default_n_measures_torch_cpu}")
+
+    args = parser.parse_args()
+    # torch is imported once the arguments are parsed, since it is slow to import
+    import torch
+
+    image_dir = args.image_dir
+    log_dir = args.log_dir
+    do_plot = args.plot
+    n_measures = args.n_measures
+    show_progress_bar = not args.no_progress
+    width, depth = args.width, args.depth
+    list_batch_size = [2**k for k in range(0, args.log2_max_batch_size + 1)]
+    list_n_threads = args.threads if args.threads is not None else [2**k for k in range(0, num_cores.bit_length()) if 2**k <= num_cores]
+    threads_batch_size = args.threads_batch_size if args.threads_batch_size is not None else list_batch_size[-1]
+
+    # Setup
+    print(get_machine_summary())
+    print(
+f"===== Torch CPU measurement ===== \n\
+Inference throughput of a MLP of depth {depth} and width {width} will be measured on the CPU with torch {torch.__version__}, \n\
+for batch sizes in range [1, 2^{args.log2_max_batch_size}], with the modes {args.modes} and the dtypes {args.dtypes}. \n\
+Then for {list_n_threads} intra-op threads and {args.interop_threads} inter-op threads ({args.threads_mode}, batch size {threads_batch_size}). \n\
+With {n_measures} measures for each point. \n\
+=================================\n\
+        ")
+    log_filename = log_dir + "/torch_cpu.txt" if log_dir is not None else None
+    image_filename = image_dir + "/torch_cpu.png" if image_dir is not None else None
+    create_dir(log_dir)
+    start_run("torch_cpu", vars(args), log_dir, args.formats, args.db)
+    create_dir(image_dir)
+    remove_file(log_filename)
+
+
+
+    # Measure the batch size sweep, for each dtype and mode. The batches are generated before the measures.
+    list_mean_time_reference = None
+    for dtype in args.dtypes:
+        dict_batch = {batch_size : get_batch(batch_size, width, dtype) for batch_size in list_batch_size}
+        for mode in args.modes:
+            title = f"Torch CPU inference ({mode}, {dtype})"
+            print(title)
+            try:
+                inference = get_inference_function(get_mlp(width, depth, dtype), mode)
+                # Untimed first call of each batch size, which compiles the model for this shape with torch.compile
+                for batch_size in list_batch_size:
+                    inference(dict_batch[batch_size])
+            except Exception as e:
+                print(f"WARNING : {mode} with {dtype} is not supported here ({type(e).__name__}: {e}). Skipping it.")
+                continue
+
+            def torch_inference(batch_size : int):
+                inference(dict_batch[batch_size])
+
+            list_mean_time, list_std_time, list_samples = measure_time(
+                func = torch_inference,
+                list_inputs = list_batch_size,
+                n_measures = n_measures,
+                show_progress_bar = show_progress_bar,
+                )
+            if args.profile is not None:
+                profile_points(torch_inference, args.profile_points or list_batch_size[-1:], args.profile, log_dir, f"torch_cpu_{mode}_{dtype}")
+            # The speed-up is relative to the first mode and dtype measured (eager fp32 by default)
+            if list_mean_time_reference is None:
+                list_mean_time_reference = list_mean_time
+
+            deal_with_results(
+                list_inputs=list_batch_size,
+                list_mean_time=list_mean_time,
+                list_std_time=list_std_time,
+                list_speed_up=[list_mean_time_reference[i] / list_mean_time[i] for i in range(len(list_mean_time))],
+                dict_extra_columns=get_throughput_columns(list_batch_size, list_mean_time),
+                do_print=True,
+                do_plot=False,
+                log_filename=log_filename,
+                image_filename=image_filename,
+                title=title,
+                list_samples=list_samples,
+            )
+
+
+
+    # Measure the thread sweep. Each point is measured in a new process, since the inter-op threads of torch can only be set once.
+    for n_interop_threads in args.interop_threads:
+        title = f"Torch CPU threads ({n_interop_threads} inter-op threads, {args.threads_mode}, fp32, batch size {threads_batch_size})"
+        print(title)
+        list_mean_time, list_std_time, list_samples = [], [], []
+        for n_threads in list_n_threads:
+            mean_time, std_time, list_time = run_in_new_process(measure_threads_point, n_threads, n_interop_threads, width, depth, args.threads_mode, "fp32", threads_batch_size, n_measures)
+            list_mean_time.append(mean_time)
+            list_std_time.append(std_time)
+            list_samples.append(list_time)
+
+        deal_with_results(
+            list_inputs=list_n_threads,
+            list_mean_time=list_mean_time,
+            list_std_time=list_std_time,
+            list_speed_up=[list_mean_time[0] / mean_time for mean_time in list_mean_time],
+            dict_extra_columns=get_throughput_columns([threads_batch_size] * len(list_n_threads), list_mean_time),
+            do_print=True,
+            do_plot=do_plot if n_interop_threads == args.interop_threads[-1] else False,
+            log_filename=log_filename,
+            image_filename=image_filename,
+            title=title,
+            list_samples=list_samples,
+        )
@@ -7,9 +7,13 @@ setup(
     author_email="timothe.boulet0@gmail.com",
     
     packages=find_namespace_packages(),
+    entry_points={
+        "console_scripts": ["localperf = localperf.cli:main"],
+    },
     requires=[
         "numpy",
-        "joblib",
+        "joblib>=1.4",
+        "threadpoolctl",
         "matplotlib",
         "tqdm",
     ],